@@ -0,0 +1,82 @@
+"""
+Revenue by client straight from the tasks and items against the summary
+tables, and what keeping the summary fresh costs: the full rebuild and the
+incremental refresh of the month touched by one saved task.
+
+    python -m benchmarks.analytics --clients 200 --tasks 200000 --items 50000
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.utils import setup_django, test_database, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--tasks', type=int, default=200_000)
+    parser.add_argument('--items', type=int, default=50_000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db.models import Sum
+    from django.utils.timezone import make_aware
+
+    from todo.apps.core import analytics, models
+    from todo.apps.core.synthetic import bulk_insert
+    from todo.apps.custom_account.models import User
+
+    rnd = random.Random(0)
+    statuses = [status for status, _ in models.Task.STATUS_CHOICES]
+    with test_database():
+        users = User.objects.bulk_create(User(email=f'bench{i}@example.com') for i in range(args.users))
+        clients = models.Client.objects.bulk_create(models.Client(title=f'Заказчик {i}') for i in range(args.clients))
+        projects = models.Project.objects.bulk_create(
+            models.Project(title=f'Проект {i}', client=client, location='', status='', price=0)
+            for i, client in enumerate(clients)
+        )
+        categories = [models.Category.objects.create(title=f'Категория {i}') for i in range(10)]
+        jobs = [models.Job.objects.create(category=category, title='Работа', type='м2', price=100)
+                for category in categories]
+        # Every project has its own crew and a few kinds of work, as real ones do.
+        crews = {project.pk: (rnd.sample(users, 3), rnd.sample(jobs, 3)) for project in projects}
+        year_start = make_aware(datetime(2024, 1, 1))
+
+        def task():
+            project = rnd.choice(projects)
+            crew, project_jobs = crews[project.pk]
+            return models.Task(project=project, job=rnd.choice(project_jobs), quantity=1,
+                               total=rnd.randint(1, 1000), executor=rnd.choice(crew), status=rnd.choice(statuses),
+                               expired_at=year_start + timedelta(minutes=rnd.randrange(366 * 24 * 60)))
+
+        bulk_insert(models.Task, (task() for _ in range(args.tasks)), 5000)
+        bulk_insert(models.Item, (
+            models.Item(project=rnd.choice(projects), title='Материал', quantity=1, price=100, total=100)
+            for _ in range(args.items)
+        ), 5000)
+
+        results = {}
+        with timer(results, 'from tasks and items'):
+            tasks = dict(models.Task.objects.order_by().values_list('project__client').annotate(Sum('total')))
+            items = dict(models.Item.objects.order_by().values_list('project__client').annotate(Sum('total')))
+            {client: (tasks.get(client) or 0) + (items.get(client) or 0) for client in tasks.keys() | items.keys()}
+        with timer(results, 'full refresh'):
+            analytics.refresh(full=True)
+        with timer(results, 'from summary'):
+            analytics.summary('client')
+        task = models.Task.objects.order_by('pk').first()
+        task.quantity = 2
+        task.save()
+        with timer(results, 'refresh of one month'):
+            analytics.refresh()
+        rows = models.RevenueSummary.objects.count()
+
+    print(f'{args.tasks} tasks and {args.items} items of {args.clients} clients, {rows} summary rows')
+    for name, seconds in results.items():
+        print(f'{name:>22}: {seconds * 1000:9.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+A year of per-day task counts for the whole team: month by month from
+loaded tasks, as ``get_tasks`` builds its calendar, against one grouped
+query of ``heatmap.task_counts``, cold and with the past months cached.
+
+    python -m benchmarks.heatmap --users 50 --tasks 200000
+"""
+import argparse
+import random
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from benchmarks.utils import setup_django, test_database, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--tasks', type=int, default=200_000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.cache import cache
+    from django.utils.timezone import localtime, make_aware
+
+    from todo.apps.core import heatmap, models, views
+    from todo.apps.core.synthetic import bulk_insert
+    from todo.apps.custom_account.models import User
+
+    rnd = random.Random(0)
+    statuses = [status for status, _ in models.Task.STATUS_CHOICES]
+    with test_database():
+        users = [User.objects.create(email=f'bench{i}@example.com') for i in range(args.users)]
+        job = models.Job.objects.create(category=models.Category.objects.create(title='Отделка'),
+                                        title='Покраска', type='м2', price=100)
+        year_start = make_aware(datetime(2024, 1, 1))
+        bulk_insert(models.Task, (
+            models.Task(job=job, quantity=1, executor=rnd.choice(users), status=rnd.choice(statuses),
+                        expired_at=year_start + timedelta(minutes=rnd.randrange(366 * 24 * 60)))
+            for _ in range(args.tasks)
+        ), 5000)
+        start, end, today = date(2024, 1, 1), date(2024, 12, 31), date(2024, 12, 15)
+
+        def per_month():
+            counts = Counter()
+            for user in users:
+                for month in range(1, 13):
+                    for task in views.calendar_tasks(user, 2024, month):
+                        counts[user.pk, localtime(task.expired_at).date(), task.status] += 1
+            return counts
+
+        results = {}
+        with timer(results, 'month by month'):
+            per_month()
+        cache.clear()
+        with timer(results, 'grouped, cold cache'):
+            heatmap.task_counts([user.pk for user in users], start, end, today)
+        with timer(results, 'grouped, past months cached'):
+            heatmap.task_counts([user.pk for user in users], start, end, today)
+
+    print(f'{args.tasks} tasks of {args.users} executors, {args.users * 12} month requests before')
+    for name, seconds in results.items():
+        print(f'{name:>28}: {seconds * 1000:9.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
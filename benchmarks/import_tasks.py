@@ -0,0 +1,50 @@
+"""
+Rows per second of ``importers.import_tasks`` against one ``Task.save()`` per row.
+
+    python -m benchmarks.import_tasks --rows 5000
+"""
+import argparse
+from datetime import timedelta
+from decimal import Decimal
+
+from benchmarks.utils import setup_django, test_database, timer
+
+
+def make_rows(jobs, count):
+    return [{'job': jobs[i % len(jobs)].pk, 'quantity': i % 10 + 1, 'coefficient': '1.5',
+             'expired_at': '2024-03-01 12:00'} for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.utils.timezone import now
+
+    from todo.apps.core import importers, models
+
+    with test_database():
+        category = models.Category.objects.create(title='Категория')
+        jobs = [models.Job.objects.create(category=category, title=f'Работа {i}', type='шт', price=100 + i)
+                for i in range(50)]
+        rows = make_rows(jobs, args.rows)
+        timings = {}
+
+        with timer(timings, 'save'):
+            expired_at = now() + timedelta(days=30)
+            for row in rows:
+                models.Task(job_id=row['job'], quantity=row['quantity'], coefficient=Decimal(row['coefficient']),
+                            expired_at=expired_at).save()
+
+        with timer(timings, 'import_tasks'):
+            result = importers.import_tasks(rows)
+        assert result.created == args.rows and not result.errors
+
+    for name, seconds in timings.items():
+        print(f'{name:>12}: {args.rows / seconds:10.0f} rows/s ({seconds:.2f} s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Concurrent GET load against a running server, to compare the sync
+(gunicorn) and async (gunicorn + uvicorn workers) deployment modes.
+
+    python -m benchmarks.load_test http://127.0.0.1:8000/api/tasks/ \\
+        --session <sessionid cookie> --clients 200 --requests 5000
+
+Run it once against each mode on the same machine and compare the
+throughput and the latency percentiles.
+"""
+import argparse
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def fetch(url, headers):
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=60) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError:
+        status = None
+    return status, time.perf_counter() - start
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('url')
+    parser.add_argument('--session', help='значение cookie sessionid авторизованного пользователя')
+    parser.add_argument('--clients', type=int, default=100, help='одновременных клиентов')
+    parser.add_argument('--requests', type=int, default=2000, help='всего запросов')
+    args = parser.parse_args()
+
+    headers = {'HX-Request': 'true'}
+    if args.session:
+        headers['Cookie'] = f'sessionid={args.session}'
+
+    lock = threading.Lock()
+    results = []
+
+    def worker(_):
+        result = fetch(args.url, headers)
+        with lock:
+            results.append(result)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        list(pool.map(worker, range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for status, latency in results if status == 200)
+    failed = len(results) - len(latencies)
+    print(f'{len(results)} requests, {args.clients} clients, {elapsed:.2f} s, {len(results) / elapsed:.0f} req/s')
+    if latencies:
+        print(f'latency ms: p50 {percentile(latencies, 0.5) * 1000:.1f}, '
+              f'p95 {percentile(latencies, 0.95) * 1000:.1f}, '
+              f'p99 {percentile(latencies, 0.99) * 1000:.1f}, '
+              f'mean {statistics.mean(latencies) * 1000:.1f}')
+    print(f'failed: {failed}')
+
+
+if __name__ == '__main__':
+    main()
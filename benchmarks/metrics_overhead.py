@@ -0,0 +1,77 @@
+"""
+Cost of ``todo.metrics`` on the hottest views: the same requests with the
+instrumentation middleware and template backend off and on.
+
+    python -m benchmarks.metrics_overhead --requests 500
+"""
+import argparse
+from datetime import timedelta
+
+from benchmarks.utils import setup_django, test_database, timer
+
+VIEWS = ('account', 'get-tasks', 'reports', 'vacations')
+
+
+def run(client, urls, count):
+    for _ in range(count):
+        for url in urls:
+            client.get(url)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=500, help='requests per view')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.core.cache import cache
+    from django.test import Client, override_settings
+    from django.urls import reverse
+    from django.utils.timezone import now
+
+    from todo.apps.core import models
+    from todo.apps.custom_account.models import User
+
+    with test_database():
+        user = User.objects.create_user(email='bench@example.com', password='12345')
+        client_obj = models.Client.objects.create(title='Заказчик')
+        project = models.Project.objects.create(title='Дом', client=client_obj, location='Город',
+                                                status='new', price=0)
+        job = models.Job.objects.create(category=models.Category.objects.create(title='Отделка'),
+                                        title='Покраска', type='м2', price=100)
+        models.Task.objects.bulk_create(
+            models.Task(project=project, job=job, quantity=1, total=100, executor=user,
+                        expired_at=now() + timedelta(days=i % 30)) for i in range(200)
+        )
+        models.Report.objects.bulk_create(
+            models.Report(creator=user, theme='Тема', content='Текст', updated_at=now()) for _ in range(100)
+        )
+
+        # The dashboard and calendar are cached; a dummy cache measures the full views.
+        dummy_cache = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        instrumented = {
+            'MIDDLEWARE': ['todo.metrics.MetricsMiddleware', *settings.MIDDLEWARE],
+            'TEMPLATES': [{**settings.TEMPLATES[0], 'BACKEND': 'todo.metrics.MetricsDjangoTemplates'}],
+        }
+        urls = [reverse(name) for name in VIEWS]
+        results = {}
+        for name, overrides in (('off', {}), ('on', instrumented), ('off again', {}), ('on again', instrumented)):
+            with override_settings(CACHES=dummy_cache, **overrides):
+                cache.clear()
+                client = Client()
+                client.login(email='bench@example.com', password='12345')
+                run(client, urls, 20)
+                with timer(results, name):
+                    run(client, urls, args.requests)
+
+    total = args.requests * len(VIEWS)
+    for name, seconds in results.items():
+        print(f'{name:>10}: {total / seconds:8.0f} req/s')
+    off = min(results['off'], results['off again'])
+    on = min(results['on'], results['on again'])
+    print(f'  overhead: {(on - off) / off:+.1%}')
+
+
+if __name__ == '__main__':
+    main()
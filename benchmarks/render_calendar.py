@@ -0,0 +1,66 @@
+"""
+Build time of the calendar HTMX fragment's context and render time of
+``htmx/task_calendar.html`` for a month with many tasks, with the Django
+template engine and, when installed, Jinja2.
+
+    python -m benchmarks.render_calendar --tasks 300 --renders 200
+"""
+import argparse
+from datetime import datetime, timedelta
+from importlib.util import find_spec
+
+from benchmarks.utils import BASE_DIR, setup_django, test_database, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--tasks', type=int, default=300)
+    parser.add_argument('--renders', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.template.loader import render_to_string
+    from django.test import override_settings
+    from django.utils.timezone import make_aware
+
+    from todo.apps.core import models, views
+    from todo.apps.custom_account.models import User
+
+    with test_database():
+        user = User.objects.create(email='bench@example.com')
+        job = models.Job.objects.create(category=models.Category.objects.create(title='Отделка'),
+                                        title='Покраска', type='м2', price=100)
+        month_start = make_aware(datetime(2024, 3, 1))
+        models.Task.objects.bulk_create(
+            models.Task(job=job, quantity=1, executor=user, expired_at=month_start + timedelta(hours=i * 720 // args.tasks))
+            for i in range(args.tasks)
+        )
+        params = {'year': 2024, 'month': 3, 'previous_year': 2024, 'next_year': 2024,
+                  'previous_month': 2, 'next_month': 4}
+        tasks = list(views.calendar_tasks(user, 2024, 3))
+
+        results = {}
+        with timer(results, 'context'):
+            for _ in range(args.renders):
+                views.calendar_context(params, tasks)
+        context = views.calendar_context(params, tasks)
+
+        engines = {'django': None}
+        if find_spec('jinja2'):
+            engines['jinja2'] = 'jinja2'
+        jinja2 = {'BACKEND': 'django.template.backends.jinja2.Jinja2', 'DIRS': [BASE_DIR / 'jinja2'],
+                  'OPTIONS': {'environment': 'todo.jinja2.environment'}}
+        with override_settings(TEMPLATES=[*settings.TEMPLATES, jinja2]):
+            for name, using in engines.items():
+                render_to_string('htmx/task_calendar.html', context, using=using)
+                with timer(results, name):
+                    for _ in range(args.renders):
+                        render_to_string('htmx/task_calendar.html', context, using=using)
+
+    for name, seconds in results.items():
+        print(f'{name:>8}: {seconds / args.renders * 1000:7.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
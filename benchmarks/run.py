@@ -0,0 +1,150 @@
+"""
+Repeatable timings of the hottest pages on synthetic data, saved as JSON
+so that two commits can be compared.
+
+    python -m benchmarks.run --scale small --repeat 20
+    python -m benchmarks.run --compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+
+Every run fills a throwaway database with ``generate_data`` at the given
+scale and requests each page ``--repeat`` times with the cache disabled,
+as the user with the most tasks (a superuser, for the admin pages).
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict, replace
+from datetime import datetime, timezone
+
+from benchmarks.utils import BASE_DIR, setup_django, test_database, timer
+
+RESULTS_DIR = BASE_DIR / 'benchmarks' / 'results'
+
+SCENARIOS = {
+    'calendar': ('get-tasks', {}),
+    'account': ('account', {}),
+    'reports': ('reports', {}),
+    'project_changelist': ('admin:core_project_changelist', {}),
+    'task_changelist': ('admin:core_task_changelist', {}),
+}
+
+
+def git_revision():
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=BASE_DIR, capture_output=True, text=True).stdout.strip()
+    return {'commit': git('rev-parse', 'HEAD'), 'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+
+
+def measure(client, url, params, repeat, warmup=2):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    for _ in range(warmup):
+        client.get(url, params)
+    timings = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = client.get(url, params)
+            timings.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f'{url}: HTTP {response.status_code}')
+    timings.sort()
+    return {
+        'median_ms': statistics.median(timings) * 1000,
+        'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000,
+        'min_ms': timings[0] * 1000,
+        'queries': len(queries),
+        'response_bytes': len(response.content),
+    }
+
+
+def run(args):
+    setup_django()
+    import django
+    from django.core.cache import cache
+    from django.db.models import Count
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    from todo.apps.core import synthetic
+    from todo.apps.custom_account.models import User
+
+    scale = replace(synthetic.SCALES[args.scale], **({'tasks': args.tasks} if args.tasks else {}))
+    report = {
+        **git_revision(),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'scale_name': args.scale,
+        'scale': asdict(scale),
+        'repeat': args.repeat,
+        'timings': {},
+        'results': {},
+    }
+
+    with test_database() as connection:
+        report['database'] = connection.vendor
+        with timer(report['timings'], 'generate_seconds'):
+            synthetic.generate(scale, seed=args.seed, log=lambda message: print(message, file=sys.stderr))
+
+        user = User.objects.annotate(task_count=Count('executors')).order_by('-task_count').first()
+        user.is_staff = user.is_superuser = True
+        user.set_password('benchmark')
+        user.save()
+
+        dummy_cache = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        with override_settings(CACHES=dummy_cache):
+            cache.clear()
+            client = Client()
+            client.force_login(user)
+            for name, (url_name, params) in SCENARIOS.items():
+                if args.only and name not in args.only:
+                    continue
+                report['results'][name] = measure(client, reverse(url_name), params, args.repeat)
+                print(f'{name:>20}: {report["results"][name]["median_ms"]:8.1f} ms', file=sys.stderr)
+
+    output = args.output or RESULTS_DIR / f'{report["commit"][:10] or "unknown"}-{args.scale}.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(output)
+
+
+def compare(base_path, head_path, threshold):
+    base, head = (json.loads(open(path, encoding='utf-8').read()) for path in (base_path, head_path))
+    if base['scale'] != head['scale']:
+        print('Внимание: результаты получены на разных объёмах данных', file=sys.stderr)
+    regressions = 0
+    print(f'{"":>20} {base["commit"][:10]:>10} {head["commit"][:10]:>10}   change')
+    for name in sorted(base['results'].keys() & head['results'].keys()):
+        old, new = base['results'][name]['median_ms'], head['results'][name]['median_ms']
+        change = (new - old) / old
+        slower = change > threshold
+        regressions += slower
+        queries = f'  queries {base["results"][name]["queries"]} -> {head["results"][name]["queries"]}'
+        print(f'{name:>20} {old:8.1f}ms {new:8.1f}ms {change:+8.1%}{queries}{"  <-- регрессия" if slower else ""}')
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', default='small', choices=('tiny', 'small', 'medium', 'large'))
+    parser.add_argument('--tasks', type=int, help='переопределить число задач')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', choices=SCENARIOS)
+    parser.add_argument('--output', type=lambda path: BASE_DIR / path)
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'HEAD'))
+    parser.add_argument('--threshold', type=float, default=0.1, help='допустимое замедление медианы, доля')
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+    run(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Full-text search over many reports against the ``icontains`` scans the
+admin used to run.
+
+    python -m benchmarks.search --reports 300000 --queries 50
+
+Reports are made of Zipf-distributed pseudo-words in random Russian forms and indexed with
+``search.rebuild``; every query is two words looked up in the index and,
+for comparison, with ``content__icontains`` on both words.
+"""
+import argparse
+import random
+import statistics
+import time
+from itertools import accumulate
+
+from benchmarks.utils import setup_django, test_database, timer
+
+SYLLABLES = ['ка', 'ро', 'ми', 'ст', 'на', 'ле', 'во', 'ту', 'пре', 'дом', 'кр', 'ша', 'бе', 'тон', 'ре', 'мон']
+ENDINGS = ['', 'а', 'у', 'е', 'ы', 'ом', 'ами', 'ах']
+
+
+def vocabulary(rnd, size):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rnd.choices(SYLLABLES, k=rnd.randint(2, 4))))
+    return sorted(words)
+
+
+def phrase(rnd, words, weights, length):
+    # Word frequencies follow Zipf's law, as in a real text.
+    return ' '.join(word + rnd.choice(ENDINGS) for word in rnd.choices(words, cum_weights=weights, k=length))
+
+
+def median_ms(run, queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        run(query)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reports', type=int, default=300_000)
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db.models import Q
+
+    from todo.apps.core import models, search
+    from todo.apps.core.synthetic import bulk_insert
+    from todo.apps.custom_account.models import User
+
+    rnd = random.Random(0)
+    words = vocabulary(rnd, 20_000)
+    weights = list(accumulate(1 / rank for rank in range(1, len(words) + 1)))
+    with test_database():
+        user = User.objects.create(email='bench@example.com')
+        timings = {}
+        with timer(timings, 'insert'):
+            bulk_insert(models.Report, (
+                models.Report(creator=user, theme=phrase(rnd, words, weights, 3),
+                               content=phrase(rnd, words, weights, 40))
+                for _ in range(args.reports)
+            ), 5000)
+        with timer(timings, 'index'):
+            search.rebuild(log=lambda message: None)
+
+        queries = [phrase(rnd, words, weights, 2) for _ in range(args.queries)]
+
+        def full_text(query):
+            return search.search(query, limit=20)
+
+        def icontains(query):
+            first, second = query.split()
+            return list(models.Report.objects.filter(Q(content__icontains=first) & Q(content__icontains=second))
+                        .order_by('-updated_at')[:20])
+
+        print(f'reports: {args.reports}, indexed in {timings["index"]:.1f} s')
+        print(f'full-text search: {median_ms(full_text, queries):8.2f} ms')
+        print(f'icontains:        {median_ms(icontains, queries):8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Writer and reader throughput of a file-backed SQLite database with the
+tuned pragmas of ``todo.db.backends.sqlite3`` on and off.
+
+    python -m benchmarks.sqlite_concurrency --writers 4 --readers 4 --seconds 5
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from todo.db.backends.sqlite3.base import PRAGMAS
+
+
+def connect(path, tuned):
+    conn = sqlite3.connect(path, timeout=20, isolation_level=None)
+    if tuned:
+        for name, value in PRAGMAS.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+
+def writer(path, tuned, deadline, done, locked):
+    conn = connect(path, tuned)
+    while time.time() < deadline:
+        try:
+            # A send_report-like write: read, then insert in the same transaction.
+            conn.execute('BEGIN IMMEDIATE' if tuned else 'BEGIN')
+            conn.execute('SELECT count(*) FROM report WHERE creator = ?', (os.getpid(),)).fetchone()
+            conn.execute('INSERT INTO report (creator, content) VALUES (?, ?)', (os.getpid(), 'x' * 200))
+            conn.execute('COMMIT')
+            with done.get_lock():
+                done.value += 1
+        except sqlite3.OperationalError:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            with locked.get_lock():
+                locked.value += 1
+
+
+def reader(path, tuned, deadline, done, locked):
+    conn = connect(path, tuned)
+    while time.time() < deadline:
+        try:
+            conn.execute('SELECT id, content FROM report ORDER BY id DESC LIMIT 25').fetchall()
+            with done.get_lock():
+                done.value += 1
+        except sqlite3.OperationalError:
+            with locked.get_lock():
+                locked.value += 1
+
+
+def run(tuned, args):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.sqlite3')
+        conn = connect(path, tuned)
+        conn.execute('CREATE TABLE report (id INTEGER PRIMARY KEY, creator INTEGER, content TEXT)')
+        conn.close()
+
+        counters = {role: (multiprocessing.Value('i', 0), multiprocessing.Value('i', 0))
+                    for role in ('writes', 'reads')}
+        deadline = time.time() + args.seconds
+        processes = [multiprocessing.Process(target=writer, args=(path, tuned, deadline, *counters['writes']))
+                     for _ in range(args.writers)]
+        processes += [multiprocessing.Process(target=reader, args=(path, tuned, deadline, *counters['reads']))
+                      for _ in range(args.readers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+    label = 'on' if tuned else 'off'
+    for role, (done, locked) in counters.items():
+        print(f'pragmas {label:>3}: {role:>6} {done.value / args.seconds:10.0f}/s, locked errors: {locked.value}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    run(False, args)
+    run(True, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Container start-up time: how long until a fresh process answers /health/.
+
+    python -m benchmarks.startup --runs 5
+
+Measures on a throwaway SQLite database:
+
+* the import of the project (``django.setup()`` and the URLconf);
+* ``entrypoint.prod.sh`` + gunicorn until the first 200, with and without
+  the lock-guarded ``init_deployment`` step;
+* the per-boot work the old entrypoint did before starting the server
+  (migrate, collectstatic, superuser shell), for comparison.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from benchmarks.utils import BASE_DIR
+
+IMPORT = ("import django, os; os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todo.settings'); "
+          "django.setup(); import todo.urls")
+SUPERUSER = ("from django.contrib.auth import get_user_model\n"
+             "try:\n    get_user_model().objects.create_superuser('admin@example.com', '1')\n"
+             "except Exception:\n    print('Superuser already exist!')\n")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def timed(command, env, **kwargs):
+    start = time.perf_counter()
+    subprocess.run(command, cwd=BASE_DIR, env=env, check=True, capture_output=True, **kwargs)
+    return time.perf_counter() - start
+
+
+def time_to_ready(env, timeout=30):
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        ['sh', 'entrypoint.prod.sh', 'gunicorn', 'todo.wsgi:application', '--bind', f'127.0.0.1:{port}',
+         '--workers', '2'],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/health/', timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError('сервер не ответил')
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'todo.settings',
+               'SQL_DATABASE': os.path.join(directory, 'db.sqlite3'), 'DEBUG': '0',
+               'ALLOWED_HOSTS': '127.0.0.1', 'SECRET_KEY': 'benchmark'}
+        manage = [sys.executable, 'manage.py']
+        timed([*manage, 'init_deployment'], env)
+
+        results = {
+            'import': [timed([sys.executable, '-c', IMPORT], env) for _ in range(args.runs)],
+            'ready, INIT_ON_START=0': [time_to_ready({**env, 'INIT_ON_START': '0'}) for _ in range(args.runs)],
+            'ready, INIT_ON_START=1': [time_to_ready({**env, 'INIT_ON_START': '1'}) for _ in range(args.runs)],
+            'old per-boot steps': [
+                timed([*manage, 'migrate', '--run-syncdb'], env)
+                + timed([*manage, 'collectstatic', '--no-input', '--dry-run'], env)
+                + timed([*manage, 'shell'], env, input=SUPERUSER.encode())
+                for _ in range(args.runs)
+            ],
+        }
+
+    for name, values in results.items():
+        print(f'{name:>24}: {statistics.median(values):6.2f} s (min {min(values):.2f} s)')
+
+
+if __name__ == '__main__':
+    main()
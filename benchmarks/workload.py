@@ -0,0 +1,67 @@
+"""
+The workload plan of a large team over a year: the queries, the array math
+on the executor × day grid, and the suggestion of the least loaded executor.
+
+    python -m benchmarks.workload --users 500 --tasks 100000 --runs 5
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from benchmarks.utils import setup_django, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--tasks', type=int, default=100_000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.utils.timezone import localdate, now
+
+    from todo.apps.core import models, workload
+    from todo.apps.core.synthetic import UNITS, bulk_insert
+    from todo.apps.custom_account.models import User
+
+    rnd = random.Random(0)
+    today = localdate()
+    with test_database():
+        users = User.objects.bulk_create(User(email=f'bench{i}@example.com') for i in range(args.users))
+        category = models.Category.objects.create(title='Отделка')
+        jobs = [models.Job.objects.create(category=category, title=f'Работа {unit}', type=unit, price=100)
+                for unit in UNITS]
+        bulk_insert(models.Task, (
+            models.Task(job=rnd.choice(jobs), quantity=rnd.randint(1, 100), executor=rnd.choice(users),
+                        status=rnd.choice(('created', 'processed')),
+                        expired_at=now() + timedelta(days=rnd.randrange(-30, 365)))
+            for _ in range(args.tasks)
+        ), 5000)
+        bulk_insert(models.Vacation, (
+            models.Vacation(user=user, status='planned', start_date=start, end_date=start + timedelta(days=13))
+            for user in users for start in [today + timedelta(days=rnd.randrange(365))]
+        ), 5000)
+
+        end = today + timedelta(days=364)
+        timings = {'plan': [], 'weekly': [], 'least loaded': []}
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            plan = workload.Workload.plan(today, end)
+            timings['plan'].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            plan.weekly()
+            timings['weekly'].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            plan.least_loaded(today, today + timedelta(days=30))
+            timings['least loaded'].append(time.perf_counter() - start)
+
+    print(f'{args.users} executors, {args.tasks} open tasks, grid {plan.load.shape[0]} × {plan.load.shape[1]}')
+    for name, values in timings.items():
+        print(f'{name:>13}: {statistics.median(values) * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,8 @@
 #!/bin/sh
+# Static files are collected and the code byte-compiled when the image is built,
+# the schema is prepared by `manage.py init_deployment`, see docs/deployment.md.
+set -e
+
 if [ "$DATABASE" = "postgres" ]
 then
     echo "Waiting for postgres..."
@@ -10,21 +14,10 @@ then
     echo "PostgreSQL started"
 fi
 
-python manage.py migrate photologue
-python manage.py migrate sites
-python manage.py makemigrations services store customuser
-python manage.py migrate
-python manage.py collectstatic --no-input
-
-echo "import os
-from django.contrib.auth import get_user_model
-# os.environ.get('SUPERUSER_NAME', default='admin')
-try:
-	User = get_user_model()
-	User.objects.create_superuser(os.environ.get('SUPERUSER_EMAIL', default='admin@example.com'), os.environ.get('SUPERUSER_PASSWORD', default='1'))
-except Exception:
-    print('Superuser already exist!')
-exit()
-" | python manage.py shell
+# Replicas started next to a separate init job set INIT_ON_START=0 and start serving at once.
+if [ "${INIT_ON_START:-1}" = "1" ]
+then
+    python manage.py init_deployment
+fi
 
 exec "$@"
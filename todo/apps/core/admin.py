@@ -1,20 +1,47 @@
 from django.contrib import admin
-from django.core import serializers
-from django.http import HttpResponse
-from django.utils.timezone import now
+from django.utils.timezone import localdate, now
+from mptt.admin import DraggableMPTTAdmin
 
-from todo.apps.core import models
+from todo.apps.core import analytics, exports, forms, jobs, models, search
+
+
+class ExportMixin:
+    export = None
+
+    @admin.action(description='Выгрузить в CSV')
+    def export_csv(self, request, queryset):
+        return exports.export_response(self.export(), 'csv', queryset)
+
+    @admin.action(description='Выгрузить в XLSX')
+    def export_xlsx(self, request, queryset):
+        return exports.export_response(self.export(), 'xlsx', queryset)
+
+
+class FullTextSearchMixin:
+    """
+    Answers the search box and the autocomplete from the full-text index (see ``search``)
+    instead of ``icontains`` scans over ``search_fields``.
+    """
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        ids = search.matching_ids(self.model, search_term, using=queryset.db)
+        return (queryset.filter(pk__in=ids) if ids is not None else queryset.none()), False
 
 
 @admin.register(models.Client)
-class ClientAdmin(admin.ModelAdmin):
+class ClientAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('id', 'title',)
     search_fields = ('title',)
 
 
 @admin.register(models.Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(FullTextSearchMixin, ExportMixin, admin.ModelAdmin):
     list_display = ('id', 'title', 'status', 'total')
+    search_fields = ('title', 'client__title', 'location')
+    actions = ('export_csv', 'export_xlsx')
+    export = exports.ProjectExport
     readonly_fields = ('total_items', 'total_tasks', 'total', 'created_at', 'updated_at', 'creator',)
     autocomplete_fields = ('client',)
     fieldsets = [
@@ -40,19 +67,30 @@ class ProjectAdmin(admin.ModelAdmin):
         ),
     ]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_grand_total()
+
+    @admin.display(description='итого', ordering='grand_total')
+    def total(self, obj):
+        if not hasattr(obj, 'grand_total'):
+            return obj.get_total()
+        return f'{int(obj.grand_total)} руб'
+
     def save_model(self, request, obj, form, change):
         obj.creator = request.user
         super().save_model(request, obj, form, change)
 
 
 @admin.register(models.Category)
-class CategoryAdmin(admin.ModelAdmin):
-    list_display = ('id', 'title', )
+class CategoryAdmin(DraggableMPTTAdmin):
+    list_display = ('tree_actions', 'indented_title', 'id')
+    list_display_links = ('indented_title',)
 
 
 @admin.register(models.Job)
 class JobAdmin(admin.ModelAdmin):
     list_display = ('id', 'category', 'title', 'price', 'type')
+    list_select_related = ('category',)
 
 
 class ExpiredListFilter(admin.SimpleListFilter):
@@ -66,22 +104,23 @@ class ExpiredListFilter(admin.SimpleListFilter):
         ]
 
     def queryset(self, request, queryset):
+        moment = now()
         if self.value() == "yes":
-            return queryset.filter(
-                expired_at__lte=now(),
-            )
+            return queryset.overdue(moment)
         elif self.value() == "no":
-            return queryset.filter(
-                expired_at__gte=now(),
-            )
+            # Everything "yes" leaves out: closed tasks and the open ones still in time.
+            return queryset.exclude(status__in=queryset.open_statuses, expired_at__lte=moment)
 
 
 @admin.register(models.Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(FullTextSearchMixin, ExportMixin, admin.ModelAdmin):
     list_display = ('id', 'project', 'job', 'created_at', 'expired_at', 'executor', 'status')
+    search_fields = ('job__title', 'project__title', 'extra')
+    list_select_related = ('project', 'job__category', 'executor')
     readonly_fields = ('total', 'created_at', 'updated_at', 'creator',)
     list_filter = (ExpiredListFilter, 'created_at', 'updated_at', 'status')
-    actions = ('close_expired_tasks',)
+    actions = ('close_expired_tasks', 'export_csv', 'export_xlsx')
+    export = exports.TaskExport
 
     fieldsets = [
         (
@@ -108,8 +147,26 @@ class TaskAdmin(admin.ModelAdmin):
 
     @admin.action(description='Закрыть просроченные задачи')
     def close_expired_tasks(self, request, queryset):
-        selected_tasks = queryset.filter(expired_at__lte=now())
-        selected_tasks.update(status='cancelled', total=0, extra='Задача просрочена и закрыта.')
+        sweep = jobs.sweep_expired_tasks(queryset)
+        self.message_user(request, f'Закрыто просроченных задач: {sweep.closed}')
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'job':
+            kwargs['form_class'] = forms.JobChoiceField
+        elif db_field.name == 'executor':
+            kwargs['form_class'] = forms.ExecutorChoiceField
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changeform_initial_data(self, request):
+        initial = super().get_changeform_initial_data(request)
+        if 'executor' not in initial:
+            # Imported here so that NumPy only loads with the task form.
+            from todo.apps.core.workload import Workload, crew
+
+            # The least loaded member of the crew who is not on leave for the whole coming month.
+            workload = Workload.plan(end=localdate() + forms.ExecutorChoiceField.horizon, executor_ids=crew())
+            initial['executor'] = workload.least_loaded()
+        return initial
 
     def save_model(self, request, obj, form, change):
         obj.creator = request.user
@@ -119,22 +176,76 @@ class TaskAdmin(admin.ModelAdmin):
 @admin.register(models.Vacation)
 class VacationAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'start_date', 'end_date', 'status')
+    list_select_related = ('user',)
+    list_filter = ('status', 'start_date')
 
 
 @admin.register(models.Report)
-class MessageAdmin(admin.ModelAdmin):
+class MessageAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('id', 'theme', 'created_at', 'updated_at', 'creator', 'is_answered')
+    search_fields = ('theme', 'content', 'answer')
+    list_select_related = ('creator',)
     readonly_fields = ('created_at', 'updated_at', 'creator', 'is_answered',)
     list_filter = ('created_at', 'updated_at', 'is_answered',)
 
 
 @admin.register(models.Item)
-class ItemAdmin(admin.ModelAdmin):
+class ItemAdmin(FullTextSearchMixin, ExportMixin, admin.ModelAdmin):
     list_display = ('id', 'project', 'title', 'quantity', 'price', 'total')
+    actions = ('export_csv', 'export_xlsx')
+    export = exports.ItemExport
+    list_select_related = ('project',)
     list_filter = ('project',)
-    search_fields = ('project__title', 'title',)
+    search_fields = ('title', 'project__title', 'note')
     readonly_fields = ('total', 'created_at', 'updated_at', 'creator',)
 
     def save_model(self, request, obj, form, change):
         obj.creator = request.user
         super().save_model(request, obj, form, change)
+
+
+@admin.register(models.TaskSweep)
+class TaskSweepAdmin(admin.ModelAdmin):
+    list_display = ('id', 'started_at', 'finished_at', 'status', 'closed')
+    list_filter = ('started_at', 'status')
+    readonly_fields = ('started_at', 'finished_at', 'status', 'closed', 'tasks', 'projects')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(models.RevenueSummary)
+class RevenueSummaryAdmin(ExportMixin, admin.ModelAdmin):
+    """The summary tables with charts of revenue per month and the top clients; filled by ``analytics.refresh``."""
+    list_display = ('month', 'client', 'category', 'executor', 'revenue', 'tasks_total', 'items_total',
+                    'completed_total', 'cancelled_total', 'tasks', 'items')
+    list_select_related = ('client', 'category', 'executor')
+    list_filter = ('client',)
+    date_hierarchy = 'month'
+    actions = ('export_csv', 'export_xlsx')
+    export = exports.RevenueExport
+    chart_months = 12
+    chart_clients = 10
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        months = analytics.summary('month')[-self.chart_months:]
+        clients = analytics.summary('client')[:self.chart_clients]
+        charts = []
+        for title, rows in (('Выручка по месяцам', months), ('Крупнейшие заказчики', clients)):
+            peak = max((row['revenue'] for row in rows), default=0)
+            charts.append({'title': title, 'rows': [
+                {**row, 'share': round(row['revenue'] / peak * 100) if peak else 0} for row in rows
+            ]})
+        return super().changelist_view(request, {**(extra_context or {}), 'charts': charts})
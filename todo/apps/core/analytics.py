@@ -0,0 +1,160 @@
+"""
+Revenue by client, month, category and executor from summary tables.
+
+``RevenueSummary`` holds the totals of tasks and items per month, client,
+category and executor, so a report across all projects reads a few
+hundred summary rows instead of aggregating every project. Every write to
+a task or an item (saves, deletes, bulk writes) appends its month to the
+``AnalyticsChange`` log; ``refresh`` recomputes the logged months with one
+grouped query per model and month and empties the log. It runs every
+``ANALYTICS_REFRESH_INTERVAL`` seconds in the scheduler, and
+``refresh_analytics --full`` rebuilds everything, e.g. nightly or after
+changes made around the ORM.
+"""
+from datetime import date, datetime
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.utils.timezone import localtime, make_aware
+
+from todo.apps.core import categories, heatmap, models
+from todo.apps.custom_account.models import User
+from todo.db.locks import database_lock
+
+TOTALS = ('tasks_total', 'items_total', 'completed_total', 'cancelled_total', 'tasks', 'items')
+
+# dimension -> (title, model labelling its values)
+DIMENSIONS = {
+    'client': ('Заказчики', models.Client),
+    'month': ('Месяцы', None),
+    'category': ('Категории', models.Category),
+    'executor': ('Исполнители', User),
+}
+
+
+def _month_start(month):
+    return make_aware(datetime(month.year, month.month, 1))
+
+
+def _all_months():
+    """First days of every month with a task deadline or an item."""
+    bounds = [models.Task.objects.aggregate(first=Min('expired_at'), last=Max('expired_at')),
+              models.Item.objects.aggregate(first=Min('created_at'), last=Max('created_at'))]
+    moments = [localtime(moment) for pair in bounds for moment in pair.values() if moment]
+    if not moments:
+        return []
+    return [date(year, month, 1) for year, month in heatmap.months(min(moments), max(moments))]
+
+
+def summary_rows(months=None):
+    """
+    Unsaved ``RevenueSummary`` rows of ``months`` (first days of months), all
+    of them when None. Every month is grouped on its own over a range of
+    ``expired_at`` / ``created_at``: a ``TruncMonth`` per row is a Python
+    function call on SQLite and costs more than the grouping itself.
+    """
+    rows = []
+    for month in _all_months() if months is None else months:
+        start, end = (_month_start(day) for day in heatmap.month_bounds(month.year, month.month))
+        per_group = {}
+
+        def row(client_id, category_id=None, executor_id=None):
+            key = (client_id, category_id, executor_id)
+            if key not in per_group:
+                per_group[key] = models.RevenueSummary(month=month, client_id=client_id, category_id=category_id,
+                                                       executor_id=executor_id)
+            return per_group[key]
+
+        tasks = (models.Task.objects.filter(expired_at__gte=start, expired_at__lt=end).order_by()
+                 .values_list('project__client', 'job__category', 'executor')
+                 .annotate(revenue=Sum('total'), completed=Sum('total', filter=Q(status='completed')),
+                           cancelled=Sum('total', filter=Q(status='cancelled')), count=Count('pk')))
+        for client_id, category_id, executor_id, revenue, completed, cancelled, count in tasks:
+            summary = row(client_id, category_id, executor_id)
+            summary.tasks_total, summary.tasks = revenue or 0, count
+            summary.completed_total, summary.cancelled_total = completed or 0, cancelled or 0
+
+        items = (models.Item.objects.filter(created_at__gte=start, created_at__lt=end).order_by()
+                 .values_list('project__client').annotate(revenue=Sum('total'), count=Count('pk')))
+        for client_id, revenue, count in items:
+            summary = row(client_id)
+            summary.items_total, summary.items = revenue or 0, count
+
+        rows.extend(per_group.values())
+    return rows
+
+
+def refresh(full=False, batch_size=1000):
+    """
+    Recomputes the summary of the months in the change log, or of every
+    month when ``full``, and returns them.
+
+    Every month is grouped outside any transaction and swapped in by a short
+    one of its own: the tuned SQLite backend takes the write lock at BEGIN,
+    and grouping a large table under it would make concurrent writers give
+    up with "database is locked".
+    """
+    with database_lock('analytics'):
+        changes = models.AnalyticsChange.objects.order_by()
+        last_change = changes.aggregate(last=Max('pk'))['last']
+        if full:
+            months = _all_months()
+        elif last_change is None:
+            return []
+        else:
+            months = sorted(set(changes.filter(pk__lte=last_change).values_list('month', flat=True)))
+
+        for month in months:
+            rows = summary_rows([month])
+            with transaction.atomic():
+                models.RevenueSummary.objects.filter(month=month).delete()
+                models.RevenueSummary.objects.bulk_create(rows, batch_size=batch_size)
+        with transaction.atomic():
+            if full:
+                models.RevenueSummary.objects.exclude(month__in=months).delete()
+            # Months logged meanwhile stay in the log for the next run.
+            if last_change is not None:
+                changes.filter(pk__lte=last_change).delete()
+    return months
+
+
+def summary(by, start=None, end=None):
+    """
+    The totals grouped ``by`` one of ``DIMENSIONS`` from the month of ``start``
+    to the month of ``end``, each row with its ``label`` and ``revenue``;
+    months come in order, the other groups by revenue, highest first.
+    """
+    rows = models.RevenueSummary.objects.order_by()
+    if start:
+        rows = rows.filter(month__gte=start.replace(day=1))
+    if end:
+        rows = rows.filter(month__lte=end.replace(day=1))
+    # Aggregates can't take the names of the fields they sum.
+    rows = [{by: row[by], **{total: row[f'sum_{total}'] for total in TOTALS}}
+            for row in rows.values(by).annotate(**{f'sum_{total}': Sum(total) for total in TOTALS})]
+
+    labels = {}
+    if by == 'category':
+        # The cached category tree labels categories with their whole path.
+        labels = categories.get_category_paths()
+    elif by != 'month':
+        model = DIMENSIONS[by][1]
+        labels = {pk: str(obj) for pk, obj in model.objects.in_bulk([row[by] for row in rows if row[by]]).items()}
+    for row in rows:
+        row['revenue'] = row['tasks_total'] + row['items_total']
+        if by == 'month':
+            row['label'] = f'{row[by]:%m.%Y}'
+        else:
+            row['label'] = labels.get(row[by], 'Не указан')
+
+    if by == 'month':
+        return sorted(rows, key=lambda row: row['month'])
+    return sorted(rows, key=lambda row: row['revenue'], reverse=True)
+
+
+def parse_month(value):
+    """``YYYY-MM`` as the first day of that month, None when empty; ValueError when malformed."""
+    if not value:
+        return None
+    year, month = value.split('-')
+    return date(int(year), int(month), 1)
@@ -1,7 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'todo.apps.core'
     verbose_name = 'Информационная система'
+
+    def ready(self):
+        from todo.apps.core import search, signals  # noqa: F401
+
+        post_migrate.connect(search.install, sender=self)
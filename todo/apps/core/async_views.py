@@ -0,0 +1,81 @@
+"""
+Async versions of the most frequent read-only views, served when the
+project runs under ASGI with ``ASYNC_VIEWS=1`` (see docs/deployment.md).
+
+Database access goes through the async ORM; template rendering stays in
+a worker thread because context processors may still touch the session.
+"""
+from contextlib import nullcontext
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, HttpResponseNotFound, JsonResponse
+from django.shortcuts import render
+from django.template.loader import render_to_string
+
+from todo.apps.core import caching, models, views
+from todo.apps.core.pagination import KeysetPaginator
+from todo.db.routers import primary_reads, use_replica
+
+
+def login_required(view):
+    """``login_required`` for coroutine views; Django 4.2 only ships the sync one."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # Resolves the lazy user (and the session behind it) outside the event loop.
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@login_required
+async def account(request):
+    version = await caching.adashboard_version(request.user.pk)
+    # The lazy querysets run in the render thread, and only if the cached fragment is gone.
+    context = views.dashboard_context(request.user, version)
+    return await sync_to_async(render)(request, 'account/account.html', context)
+
+
+@login_required
+async def get_tasks(request):
+    params = views.calendar_params(request)
+    cache_key = caching.calendar_key(request.user.pk, params['year'], params['month'])
+    content = await cache.aget(cache_key)
+    if content is None:
+        tasks = views.calendar_tasks(request.user, params['year'], params['month'])
+        tasks = [task async for task in tasks.aiterator()]
+        content = await sync_to_async(render_to_string)(
+            'htmx/task_calendar.html', views.calendar_context(params, tasks), request,
+            using=settings.FRAGMENT_TEMPLATE_ENGINE)
+        await cache.aset(cache_key, content, caching.CALENDAR_TIMEOUT)
+    return HttpResponse(content)
+
+
+@login_required
+async def report_detail(request):
+    try:
+        _id = int(request.GET.get('id', None))
+    except (TypeError, ValueError):
+        return HttpResponseNotFound('Объект не найден!')
+    report = await models.Report.objects.filter(id=_id, creator=request.user).afirst()
+    if report is None:
+        raise Http404('Объект не найден!')
+    if request.GET.get('format') == 'json':
+        return JsonResponse(views.report_as_dict(report))
+    context = {'obj': report}
+    return await sync_to_async(render)(request, 'reports/report_detail.html', context)
+
+
+@login_required
+@use_replica
+async def report_list(request):
+    reports = models.Report.objects.filter(creator=request.user)
+    sent = await sync_to_async(request.session.pop)(views.REPORT_SENT_SESSION_KEY, False)
+    with primary_reads() if sent else nullcontext():
+        page_obj = await KeysetPaginator(reports, views.REPORTS_PER_PAGE).aget_page(request.GET.get('cursor'))
+        return await sync_to_async(views.reports_page_response)(request, page_obj)
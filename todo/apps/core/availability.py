@@ -0,0 +1,86 @@
+"""
+Who is on leave when: vacations of the whole staff loaded in one query and
+indexed in memory.
+
+``Availability`` keeps every user's vacations sorted by start date, so
+"is the user away on this day" is a binary search, and "who is free
+between two dates" or "which tasks fall on a vacation" is a single pass
+over the loaded intervals instead of a query per user.
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, datetime
+
+from django.utils.timezone import localdate
+
+from todo.apps.core import models
+
+# Cancelled and completed vacations no longer keep anyone from work.
+BLOCKING_STATUSES = ('planned', 'processed')
+
+
+class Availability:
+    def __init__(self, vacations):
+        self._starts = defaultdict(list)
+        self._vacations = defaultdict(list)
+        for vacation in sorted(vacations, key=lambda vacation: (vacation.user_id, vacation.start_date)):
+            self._starts[vacation.user_id].append(vacation.start_date)
+            self._vacations[vacation.user_id].append(vacation)
+
+    @classmethod
+    def for_period(cls, start, end, users=None):
+        """Loads the blocking vacations that touch ``start``..``end`` (inclusive) in one query."""
+        vacations = models.Vacation.objects.filter(status__in=BLOCKING_STATUSES, start_date__lte=end,
+                                                   end_date__gte=start)
+        if users is not None:
+            vacations = vacations.filter(user__in=users)
+        return cls(vacations.order_by())
+
+    def vacations(self, user_id, start, end):
+        """The user's vacations overlapping ``start``..``end``."""
+        starts, vacations = self._starts.get(user_id, ()), self._vacations.get(user_id, ())
+        # Vacations starting after the period can't overlap; the ones before are checked by end date.
+        return [vacation for vacation in vacations[:bisect_right(starts, end)] if vacation.end_date >= start]
+
+    def vacation_on(self, user_id, day):
+        """The vacation the user is on that day (a date or an aware datetime), if any."""
+        if isinstance(day, datetime):
+            day = localdate(day)
+        vacations = self.vacations(user_id, day, day)
+        return vacations[0] if vacations else None
+
+    def is_free(self, user_id, start, end=None):
+        return not self.vacations(user_id, start, end or start)
+
+    def busy_users(self, start, end):
+        return {user_id for user_id in self._vacations if self.vacations(user_id, start, end)}
+
+    def free_users(self, user_ids, start, end):
+        busy = self.busy_users(start, end)
+        return [user_id for user_id in user_ids if user_id not in busy]
+
+    def task_conflicts(self, tasks):
+        """``(task, vacation)`` for every task due on a day its executor is on leave."""
+        conflicts = []
+        for task in tasks:
+            if task.executor_id and task.expired_at:
+                vacation = self.vacation_on(task.executor_id, task.expired_at)
+                if vacation is not None:
+                    conflicts.append((task, vacation))
+        return conflicts
+
+    def days_away(self, user_id, start, end):
+        """The days of ``start``..``end`` the user spends on leave."""
+        days = set()
+        for vacation in self.vacations(user_id, start, end):
+            first, last = max(vacation.start_date, start), min(vacation.end_date, end)
+            days.update(range(first.toordinal(), last.toordinal() + 1))
+        return {date.fromordinal(day) for day in days}
+
+
+def overlapping_vacations(vacation):
+    """Other blocking vacations of the same user that share a day with ``vacation``."""
+    return (models.Vacation.objects
+            .filter(user_id=vacation.user_id, status__in=BLOCKING_STATUSES,
+                    start_date__lte=vacation.end_date, end_date__gte=vacation.start_date)
+            .exclude(pk=vacation.pk))
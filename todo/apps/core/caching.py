@@ -0,0 +1,80 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.timezone import localtime
+
+CALENDAR_TIMEOUT = 60 * 60 * 24
+DASHBOARD_TIMEOUT = 60 * 60 * 24
+# Past months of the heatmap only change when a task of theirs is edited, which drops the entry.
+TASK_COUNTS_TIMEOUT = 60 * 60 * 24 * 30
+# The counter is adjusted on every change; the timeout only bounds the drift left by a lost update.
+UNANSWERED_REPORTS_KEY = 'core:reports:unanswered'
+UNANSWERED_REPORTS_TIMEOUT = 60 * 10
+
+
+def calendar_key(user_id, year, month):
+    return f'core:calendar:{user_id}:{year}:{month}'
+
+
+def task_counts_key(user_id, year, month):
+    return f'core:task-counts:{user_id}:{year}:{month}'
+
+
+def dashboard_version_key(user_id):
+    return f'core:dashboard-version:{user_id}'
+
+
+def dashboard_version(user_id):
+    """
+    A token that takes part in the key of the user's cached dashboard
+    fragment; dropping it orphans the cached fragment.
+    """
+    return cache.get_or_set(dashboard_version_key(user_id), lambda: uuid4().hex, None)
+
+
+async def adashboard_version(user_id):
+    return await cache.aget_or_set(dashboard_version_key(user_id), lambda: uuid4().hex, None)
+
+
+def invalidate_dashboards(user_ids, using=None):
+    """Orphans the cached dashboards of ``user_ids`` once the transaction commits, see ``invalidate_tasks``."""
+    keys = {dashboard_version_key(user_id) for user_id in user_ids if user_id}
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys), using=using)
+
+
+def invalidate_tasks(pairs, using=None):
+    """
+    Drops the cached fragments and counts built from tasks of ``(executor_id,
+    expired_at)`` pairs once the transaction commits: dropped earlier, they
+    could be refilled by a concurrent request that doesn't see the write yet.
+    """
+    keys = set()
+    for executor_id, expired_at in pairs:
+        if executor_id and expired_at:
+            expired_at = localtime(expired_at)
+            keys.add(calendar_key(executor_id, expired_at.year, expired_at.month))
+            keys.add(task_counts_key(executor_id, expired_at.year, expired_at.month))
+        if executor_id:
+            keys.add(dashboard_version_key(executor_id))
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys), using=using)
+
+
+def unanswered_reports(count):
+    """The cached number of unanswered reports; ``count`` computes it on a miss."""
+    return cache.get_or_set(UNANSWERED_REPORTS_KEY, count, UNANSWERED_REPORTS_TIMEOUT)
+
+
+def adjust_unanswered_reports(delta, using=None):
+    """Adds ``delta`` to the cached counter once the transaction commits."""
+    def apply():
+        try:
+            cache.incr(UNANSWERED_REPORTS_KEY, delta)
+        except ValueError:
+            # Not cached: the next read counts the reports.
+            pass
+
+    if delta:
+        transaction.on_commit(apply, using=using)
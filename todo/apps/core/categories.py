@@ -0,0 +1,36 @@
+from django.core.cache import cache
+from mptt.utils import get_cached_trees
+
+from todo.apps.core import models
+from todo.db.routers import primary_reads
+
+CATEGORY_TREE_KEY = 'core:category-tree'
+CATEGORY_TREE_TIMEOUT = None
+
+
+def build_category_paths():
+    """``{pk: 'Родитель > Потомок'}`` in tree order, built from a single query."""
+    paths = {}
+
+    def walk(node, prefix):
+        paths[node.pk] = f'{prefix} > {node.title}' if prefix else node.title
+        for child in node.get_children():
+            walk(child, paths[node.pk])
+
+    for root in get_cached_trees(models.Category.objects.only('title', 'parent', 'tree_id', 'lft', 'rght', 'level')):
+        walk(root, '')
+    return paths
+
+
+def get_category_paths():
+    paths = cache.get(CATEGORY_TREE_KEY)
+    if paths is None:
+        # Cached until a category changes, so never built from a lagging replica.
+        with primary_reads():
+            paths = build_category_paths()
+        cache.set(CATEGORY_TREE_KEY, paths, CATEGORY_TREE_TIMEOUT)
+    return paths
+
+
+def invalidate_category_paths():
+    cache.delete(CATEGORY_TREE_KEY)
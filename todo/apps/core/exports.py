@@ -0,0 +1,279 @@
+import csv
+import zipfile
+from datetime import datetime
+from decimal import Decimal
+
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.utils.timezone import localtime, now
+
+from todo.apps.core import categories, models
+
+CHUNK_SIZE = 2000
+FLUSH_SIZE = 64 * 1024
+
+
+class Echo:
+    """A pseudo-buffer that hands the written value straight back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+class ZipSink:
+    """An unseekable file object collecting what ``zipfile`` writes until it is drained."""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks, self.size = [], 0
+        return data
+
+
+class Export:
+    """
+    Flat rows of ``model`` for invoicing.
+
+    ``columns`` are ``(header, lookup)`` pairs; a ``format_<lookup>`` method,
+    if defined, converts the raw value of that column.
+    """
+    name = None
+    model = None
+    columns = ()
+    # The lookup the ``project`` parameter of the export view filters on, None to ignore it.
+    project_lookup = 'project'
+
+    def get_queryset(self, queryset=None):
+        if queryset is None:
+            queryset = self.model.objects.all()
+        return queryset.order_by('pk')
+
+    @property
+    def header(self):
+        return [header for header, _ in self.columns]
+
+    def rows(self, queryset=None):
+        lookups = [lookup for _, lookup in self.columns]
+        formatters = [getattr(self, f'format_{lookup}', None) for lookup in lookups]
+        values = self.get_queryset(queryset).values_list(*lookups)
+        for row in values.iterator(chunk_size=CHUNK_SIZE):
+            yield [formatter(value) if formatter else value for formatter, value in zip(formatters, row)]
+
+
+class TaskExport(Export):
+    name = 'tasks'
+    model = models.Task
+    columns = (
+        ('№', 'pk'),
+        ('Проект', 'project__title'),
+        ('Заказчик', 'project__client__title'),
+        ('Категория', 'job__category'),
+        ('Работа', 'job__title'),
+        ('Ед. изм.', 'job__type'),
+        ('Кол-во', 'quantity'),
+        ('Цена', 'job__price'),
+        ('Коэффициент', 'coefficient'),
+        ('Итого', 'total'),
+        ('Статус', 'status'),
+        ('Создана', 'created_at'),
+        ('Срок', 'expired_at'),
+        ('Исполнитель', 'executor__email'),
+    )
+
+    def rows(self, queryset=None):
+        self.category_paths = categories.get_category_paths()
+        return super().rows(queryset)
+
+    def format_job__category(self, value):
+        return self.category_paths.get(value)
+
+    def format_status(self, value):
+        return dict(models.Task.STATUS_CHOICES).get(value, value)
+
+
+class ItemExport(Export):
+    name = 'items'
+    model = models.Item
+    columns = (
+        ('№', 'pk'),
+        ('Проект', 'project__title'),
+        ('Заказчик', 'project__client__title'),
+        ('Название', 'title'),
+        ('Кол-во', 'quantity'),
+        ('Цена', 'price'),
+        ('Итого', 'total'),
+        ('Примечание', 'note'),
+        ('Создана', 'created_at'),
+    )
+
+
+class ProjectExport(Export):
+    name = 'projects'
+    model = models.Project
+    project_lookup = 'pk'
+    columns = (
+        ('№', 'pk'),
+        ('Проект', 'title'),
+        ('Заказчик', 'client__title'),
+        ('Местоположение', 'location'),
+        ('Статус', 'status'),
+        ('Цена', 'price'),
+        ('Задачи', 'tasks_total'),
+        ('Смета', 'items_total'),
+        ('Итого', 'export_total'),
+        ('Создан', 'created_at'),
+    )
+
+    def get_queryset(self, queryset=None):
+        return super().get_queryset(queryset).annotate(
+            export_total=F('price') + F('tasks_total') + F('items_total'),
+        )
+
+
+class RevenueExport(Export):
+    """The revenue summary (see ``analytics``) for finance, one row per month, client, category and executor."""
+    name = 'revenue'
+    model = models.RevenueSummary
+    project_lookup = None
+    columns = (
+        ('Месяц', 'month'),
+        ('Заказчик', 'client__title'),
+        ('Категория', 'category'),
+        ('Исполнитель', 'executor__email'),
+        ('Сумма задач', 'tasks_total'),
+        ('Сумма сметы', 'items_total'),
+        ('Завершено', 'completed_total'),
+        ('Отменено', 'cancelled_total'),
+        ('Задач', 'tasks'),
+        ('Позиций', 'items'),
+    )
+
+    def get_queryset(self, queryset=None):
+        if queryset is None:
+            queryset = self.model.objects.all()
+        return queryset.order_by('month', 'pk')
+
+    def rows(self, queryset=None):
+        self.category_paths = categories.get_category_paths()
+        return super().rows(queryset)
+
+    def format_category(self, value):
+        return self.category_paths.get(value)
+
+
+EXPORTS = {export.name: export for export in (TaskExport, ItemExport, ProjectExport, RevenueExport)}
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return localtime(value).strftime('%Y-%m-%d %H:%M')
+    return str(value)
+
+
+def stream_csv(export, queryset=None):
+    writer = csv.writer(Echo())
+    # The BOM lets Excel detect UTF-8 in the Cyrillic headers.
+    yield '\ufeff' + writer.writerow(export.header)
+    for row in export.rows(queryset):
+        yield writer.writerow([_text(value) for value in row])
+
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" Type="http://schemas.openxmlformats.org/'
+        'officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" Type="http://schemas.openxmlformats.org/'
+        'officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+XLSX_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+XLSX_SHEET_TAIL = '</sheetData></worksheet>'
+
+# Control characters other than tab and newlines are not allowed in XML 1.0.
+XML_ILLEGAL = dict.fromkeys(i for i in range(32) if i not in (9, 10, 13))
+# The same as xml.sax.saxutils.escape, which would pull urllib into every process at startup.
+XML_ESCAPES = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'})
+
+
+def _xlsx_cell(value):
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    text = _text(value).translate(XML_ILLEGAL).translate(XML_ESCAPES)
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def stream_xlsx(export, queryset=None):
+    """
+    A single-sheet workbook written row by row into a streamed zip archive,
+    so memory stays flat whatever the number of rows.
+    """
+    sink = ZipSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content.replace('{name}', export.name))
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(XLSX_SHEET_HEAD.encode())
+            sheet.write(('<row>' + ''.join(map(_xlsx_cell, export.header)) + '</row>').encode())
+            for row in export.rows(queryset):
+                sheet.write(('<row>' + ''.join(map(_xlsx_cell, row)) + '</row>').encode())
+                if sink.size >= FLUSH_SIZE:
+                    yield sink.drain()
+            sheet.write(XLSX_SHEET_TAIL.encode())
+    yield sink.drain()
+
+
+FORMATS = {
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'xlsx': (stream_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+def export_response(export, file_format='csv', queryset=None):
+    stream, content_type = FORMATS[file_format]
+    response = StreamingHttpResponse(stream(export, queryset), content_type=content_type)
+    filename = f'{export.name}-{now():%Y%m%d}.{file_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -1,6 +1,57 @@
+from datetime import timedelta
+
 from django import forms
+from django.utils.timezone import localdate
+
+from todo.apps.core import categories, models
+from todo.apps.core.availability import Availability
+
+
+class JobChoiceField(forms.ModelChoiceField):
+    """
+    Jobs grouped by their category path.
+
+    The labels come from the cached category tree, so rendering costs a
+    single query however many jobs there are.
+    """
+
+    def _get_choices(self):
+        if hasattr(self, '_choices'):
+            return self._choices
+        jobs = self.queryset.order_by('title').values_list('pk', 'category_id', 'title')
+        paths = categories.get_category_paths()
+        if any(category_id not in paths for _, category_id, _ in jobs):
+            categories.invalidate_category_paths()
+            paths = categories.get_category_paths()
+        groups = {path: [] for path in paths.values()}
+        for pk, category_id, title in jobs:
+            groups[paths[category_id]].append((pk, title))
+        choices = [(path, jobs) for path, jobs in groups.items() if jobs]
+        if self.empty_label is not None:
+            choices.insert(0, ('', self.empty_label))
+        return choices
+
+    choices = property(_get_choices, forms.ChoiceField._set_choices)
+
+
+class ExecutorChoiceField(forms.ModelChoiceField):
+    """
+    Users labelled with their vacations of the coming weeks.
+
+    The vacations of all the users are loaded in one query, whatever the
+    size of the staff.
+    """
+    horizon = timedelta(days=30)
 
-from todo.apps.core import models
+    def label_from_instance(self, user):
+        if not hasattr(self, '_availability'):
+            self._period = localdate(), localdate() + self.horizon
+            self._availability = Availability.for_period(*self._period)
+        vacations = self._availability.vacations(user.pk, *self._period)
+        if not vacations:
+            return str(user)
+        vacation = vacations[0]
+        return f'{user} (отпуск {vacation.start_date:%d.%m}–{vacation.end_date:%d.%m})'
 
 
 class ReportForm(forms.ModelForm):
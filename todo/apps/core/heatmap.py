@@ -0,0 +1,110 @@
+"""
+Per-day task counts by status for the calendar heatmaps.
+
+``task_counts`` answers any date range for any executors with one grouped
+``TruncDate`` query over the ``(executor, expired_at)`` index instead of
+loading the tasks. Whole past months are cached per executor: a year of the
+whole team is mostly cache hits, and only the months that are missing or
+not over yet reach the database, the primary one even under
+``use_replica``, so that a lagging replica is never cached. Saving, moving
+or deleting a task drops the entries of its months together with its
+calendar fragments once the write commits (``caching.invalidate_tasks``).
+"""
+import operator
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from functools import reduce
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils.timezone import localdate, make_aware
+
+from todo.apps.core import caching, models
+from todo.db.routers import primary_reads
+
+
+def months(start, end):
+    """``(year, month)`` of every month touching ``start``..``end`` (inclusive)."""
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def month_bounds(year, month):
+    """The first day of the month and of the next one."""
+    return date(year, month, 1), date(year + month // 12, month % 12 + 1, 1)
+
+
+def merge(periods):
+    """Half-open ``(start, end)`` date pairs with the adjacent and overlapping ones joined."""
+    merged = []
+    for start, end in sorted(periods):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _midnight(day):
+    return make_aware(datetime.combine(day, time()))
+
+
+def count_rows(executor_ids, periods):
+    """``(executor id, day, status, count)`` of the tasks due in the half-open date ``periods``, in one query."""
+    due = reduce(operator.or_, (Q(expired_at__gte=_midnight(start), expired_at__lt=_midnight(end))
+                                for start, end in merge(periods)))
+    return (models.Task.objects.filter(due, executor__in=executor_ids)
+            .annotate(day=TruncDate('expired_at')).order_by()
+            .values_list('executor', 'day', 'status').annotate(count=Count('pk')))
+
+
+def task_counts(executor_ids, start, end, today=None):
+    """
+    ``{executor id: {day: {status: count}}}`` of the tasks due from ``start``
+    to ``end`` (inclusive); days without tasks are left out.
+    """
+    executor_ids = list(executor_ids)
+    today = today or localdate()
+    current_month = date(today.year, today.month, 1)
+    counts = {executor_id: {} for executor_id in executor_ids}
+
+    past = [(year, month) for year, month in months(start, end) if month_bounds(year, month)[1] <= current_month]
+    keys = {caching.task_counts_key(executor_id, year, month): (executor_id, (year, month))
+            for executor_id in executor_ids for year, month in past}
+    cached = cache.get_many(keys)
+    for key, days in cached.items():
+        counts[keys[key][0]].update(days)
+    missing = [keys[key] for key in keys.keys() - cached.keys()]
+
+    # Missing past months are counted whole, to be cached; the current and future ones only over the range.
+    periods = {month_bounds(year, month) for _, (year, month) in missing}
+    queried = {executor_id for executor_id, _ in missing}
+    if end >= current_month:
+        periods.add((max(start, current_month), end + timedelta(days=1)))
+        queried = executor_ids
+    if periods and queried:
+        with primary_reads():
+            for executor_id, day, status, count in count_rows(queried, periods):
+                counts[executor_id].setdefault(day, {})[status] = count
+        entries = {}
+        for executor_id, (year, month) in missing:
+            first, following = month_bounds(year, month)
+            entries[caching.task_counts_key(executor_id, year, month)] = {
+                day: statuses for day, statuses in counts[executor_id].items() if first <= day < following
+            }
+        cache.set_many(entries, caching.TASK_COUNTS_TIMEOUT)
+
+    return {executor_id: {day: days[day] for day in sorted(days) if start <= day <= end}
+            for executor_id, days in counts.items()}
+
+
+def totals(counts):
+    """The per-executor ``counts`` summed into ``{day: {status: count}}``."""
+    days = {}
+    for per_day in counts.values():
+        for day, statuses in per_day.items():
+            days.setdefault(day, Counter()).update(statuses)
+    return {day: dict(days[day]) for day in sorted(days)}
@@ -0,0 +1,111 @@
+import csv
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.timezone import is_naive, make_aware
+
+from todo.apps.core import models, search
+from todo.apps.custom_account.models import User
+
+BATCH_SIZE = 1000
+
+TASK_FIELDS = ('job', 'quantity', 'expired_at', 'project', 'executor',
+               'coefficient', 'is_fixed_price', 'price', 'status', 'extra')
+REQUIRED_TASK_FIELDS = ('job', 'quantity', 'expired_at')
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+
+    def add_error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+
+def read_rows(file, file_format='csv'):
+    """Rows of a CSV file with a header line or of a JSON array of objects."""
+    if file_format == 'json':
+        return json.load(file)
+    return csv.DictReader(file)
+
+
+def _clean_task_row(row):
+    """Converts the raw values with the same rules the model fields apply on save."""
+    if not isinstance(row, dict):
+        raise ValidationError('строка должна быть объектом')
+    cleaned = {}
+    for name in TASK_FIELDS:
+        value = row.get(name)
+        if value is None or value == '':
+            if name in REQUIRED_TASK_FIELDS:
+                raise ValidationError(f'не заполнено поле «{name}»')
+            continue
+        field = models.Task._meta.get_field(name)
+        if name == 'executor':
+            value = User.objects.normalize_email(str(value).strip())
+        elif field.is_relation:
+            value = field.target_field.to_python(value)
+        else:
+            value = field.clean(value, None)
+        cleaned[name] = value
+    # Checked here, so that the row is reported instead of failing the batch on task_quantity_non_negative.
+    if cleaned['quantity'] < 0:
+        raise ValidationError('количество не может быть отрицательным')
+    if is_naive(cleaned['expired_at']):
+        cleaned['expired_at'] = make_aware(cleaned['expired_at'])
+    return cleaned
+
+
+def import_tasks(rows, creator=None, batch_size=BATCH_SIZE):
+    """
+    Creates tasks from ``rows`` with ``bulk_create`` in a single transaction.
+
+    Invalid rows are reported in ``ImportResult.errors`` and skipped, the
+    rest of the batch is still imported. ``total`` is priced exactly as
+    ``Task.save`` would do it.
+    """
+    result = ImportResult()
+    cleaned_rows = []
+    for number, row in enumerate(rows, start=1):
+        try:
+            cleaned_rows.append((number, _clean_task_row(row)))
+        except ValidationError as e:
+            result.add_error(number, '; '.join(e.messages))
+
+    job_prices = dict(models.Job.objects.filter(
+        pk__in={row['job'] for _, row in cleaned_rows}).values_list('pk', 'price'))
+    project_ids = set(models.Project.objects.filter(
+        pk__in={row['project'] for _, row in cleaned_rows if 'project' in row}).values_list('pk', flat=True))
+    executor_ids = dict(User.objects.filter(
+        email__in={row['executor'] for _, row in cleaned_rows if 'executor' in row}).values_list('email', 'pk'))
+
+    tasks = []
+    for number, row in cleaned_rows:
+        if row['job'] not in job_prices:
+            result.add_error(number, f'работа №{row["job"]} не найдена')
+            continue
+        if 'project' in row and row['project'] not in project_ids:
+            result.add_error(number, f'проект №{row["project"]} не найден')
+            continue
+        if 'executor' in row and row['executor'] not in executor_ids:
+            result.add_error(number, f'исполнитель {row["executor"]} не найден')
+            continue
+        job_id, project_id = row.pop('job'), row.pop('project', None)
+        executor_id = executor_ids.get(row.pop('executor', None))
+        tasks.append(models.Task(job_id=job_id, project_id=project_id, executor_id=executor_id,
+                                 creator=creator, **row))
+
+    # Priced in memory with the rule of Task.save(), without a save() and a job lookup per task.
+    for task in tasks:
+        task.total = models.Task.calculate_total(job_prices[task.job_id], task.quantity, task.coefficient,
+                                                 task.is_fixed_price, task.price)
+
+    with transaction.atomic():
+        models.Task.objects.bulk_create(tasks, batch_size=batch_size)
+        # bulk_create sends no post_save, so the tasks are indexed for search here.
+        for start in range(0, len(tasks), batch_size):
+            search.reindex(models.Task.objects.filter(pk__in=[task.pk for task in tasks[start:start + batch_size]]))
+    result.created = len(tasks)
+    return result
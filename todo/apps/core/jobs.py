@@ -0,0 +1,77 @@
+"""
+Periodic jobs run by the ``run_scheduler`` management command.
+
+The scheduler is a plain loop in its own process, no broker is needed.
+Every job must be safe to run concurrently with itself in case two
+schedulers are started by mistake.
+"""
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils.timezone import now
+
+from todo.apps.core import analytics, models
+
+logger = logging.getLogger(__name__)
+
+EXPIRED_NOTE = 'Задача просрочена и закрыта.'
+
+
+def sweep_expired_tasks(queryset=None, moment=None, status=None, batch_size=500):
+    """
+    Closes open tasks whose deadline has passed and records the run as a ``TaskSweep``.
+
+    Tasks are taken in ``expired_at`` order in batches of ``batch_size`` rows,
+    each batch in its own transaction. The bulk update refreshes the totals of
+    the touched projects and drops the cached calendars of their executors.
+    Empty runs are not recorded.
+    """
+    status = status or settings.TASK_EXPIRED_STATUS
+    if status in models.TaskQuerySet.open_statuses:
+        raise ImproperlyConfigured(f'TASK_EXPIRED_STATUS не может быть открытым статусом: {status}')
+    queryset = models.Task.objects.all() if queryset is None else queryset
+    moment = moment or now()
+
+    sweep = models.TaskSweep(started_at=now(), status=status)
+    projects = set()
+    while True:
+        with transaction.atomic():
+            batch = list(
+                queryset.overdue(moment).order_by('expired_at', 'pk')
+                .select_for_update(skip_locked=True).values_list('pk', 'project_id')[:batch_size]
+            )
+            if not batch:
+                break
+            ids = [pk for pk, _ in batch]
+            models.Task.objects.filter(pk__in=ids).update(status=status, total=0, extra=EXPIRED_NOTE)
+        sweep.tasks.extend(ids)
+        projects.update(project_id for _, project_id in batch if project_id)
+
+    sweep.closed = len(sweep.tasks)
+    sweep.projects = sorted(projects)
+    sweep.finished_at = now()
+    if sweep.closed:
+        sweep.save()
+        logger.info('Закрыто просроченных задач: %s', sweep.closed)
+    return sweep
+
+
+def refresh_analytics():
+    """Summarizes the months changed since the last run, see ``analytics``."""
+    months = analytics.refresh()
+    if months:
+        logger.info('Пересчитано месяцев в сводке выручки: %s', len(months))
+    return f'месяцев пересчитано: {len(months)}'
+
+
+# name -> (job, setting with the interval in seconds)
+JOBS = {
+    'sweep_expired_tasks': (sweep_expired_tasks, 'TASK_SWEEP_INTERVAL'),
+    'refresh_analytics': (refresh_analytics, 'ANALYTICS_REFRESH_INTERVAL'),
+}
+
+
+def get_schedule():
+    return {name: (job, getattr(settings, interval)) for name, (job, interval) in JOBS.items()}
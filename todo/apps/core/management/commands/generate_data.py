@@ -0,0 +1,26 @@
+from dataclasses import fields, replace
+
+from django.core.management.base import BaseCommand
+
+from todo.apps.core import synthetic
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическими данными для нагрузочного тестирования'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=synthetic.SCALES, default='small',
+                            help='готовый набор размеров (по умолчанию small)')
+        for field in fields(synthetic.Scale):
+            parser.add_argument(f'--{field.name.replace("_", "-")}', type=int, dest=field.name,
+                                help='переопределяет значение из --scale')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        overrides = {field.name: options[field.name] for field in fields(synthetic.Scale)
+                     if options[field.name] is not None}
+        scale = replace(synthetic.SCALES[options['scale']], **overrides)
+        counts = synthetic.generate(scale, batch_size=options['batch_size'], seed=options['seed'],
+                                    log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(f'Создано записей: {sum(counts.values())}'))
@@ -0,0 +1,36 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from todo.apps.core import importers
+from todo.apps.custom_account.models import User
+
+
+class Command(BaseCommand):
+    help = 'Импортирует задачи из CSV или JSON файла'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='путь к файлу с задачами')
+        parser.add_argument('--format', choices=('csv', 'json'),
+                            help='формат файла, по умолчанию определяется по расширению')
+        parser.add_argument('--creator', help='почта пользователя, от имени которого создаются задачи')
+        parser.add_argument('--batch-size', type=int, default=importers.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or ('json' if options['path'].endswith('.json') else 'csv')
+        creator = None
+        if options['creator']:
+            creator = User.objects.filter(email=options['creator']).first()
+            if creator is None:
+                raise CommandError(f'Пользователь {options["creator"]} не найден')
+
+        with open(options['path'], encoding='utf-8', newline='') as file:
+            try:
+                rows = importers.read_rows(file, file_format)
+            except json.JSONDecodeError as e:
+                raise CommandError(f'Файл не является JSON: {e}')
+            result = importers.import_tasks(rows, creator=creator, batch_size=options['batch_size'])
+
+        for number, message in result.errors:
+            self.stderr.write(f'Строка {number}: {message}')
+        self.stdout.write(self.style.SUCCESS(f'Создано задач: {result.created}, ошибок: {len(result.errors)}'))
@@ -0,0 +1,48 @@
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from todo.apps.core import models, search
+from todo.db.locks import database_lock
+
+
+class Command(BaseCommand):
+    help = ('Готовит базу к запуску: применяет миграции, создаёт суперпользователя, поисковый индекс '
+            'и сводку выручки. '
+            'Безопасно запускать одновременно из нескольких контейнеров.')
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        with database_lock('init-deployment'):
+            self.stdout.write(f'Блокировка получена за {time.monotonic() - start:.1f} с')
+            call_command('migrate', interactive=False, verbosity=0)
+            self.create_superuser()
+            self.build_search_index()
+            self.build_revenue_summary()
+        self.stdout.write(self.style.SUCCESS(f'Готово за {time.monotonic() - start:.1f} с'))
+
+    def create_superuser(self):
+        email, password = os.environ.get('SUPERUSER_EMAIL'), os.environ.get('SUPERUSER_PASSWORD')
+        if not email or not password:
+            return
+        User = get_user_model()
+        if User.objects.filter(email=email).exists():
+            return
+        User.objects.create_superuser(email, password)
+        self.stdout.write(f'Создан суперпользователь {email}')
+
+    def build_search_index(self):
+        # Rows that predate the search index are indexed by the first deployment that has it.
+        if models.SearchDocument.objects.exists() or not any(model.objects.exists() for model in search.INDEXES):
+            return
+        call_command('rebuild_search_index', stdout=self.stdout)
+
+    def build_revenue_summary(self):
+        # Tasks and items that predate the change log are summarized by the first deployment that has it.
+        if models.RevenueSummary.objects.exists() or not (models.Task.objects.exists()
+                                                          or models.Item.objects.exists()):
+            return
+        call_command('refresh_analytics', full=True, stdout=self.stdout)
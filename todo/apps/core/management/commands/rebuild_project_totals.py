@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from todo.apps.core import models
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает суммы задач и сметы проектов и сообщает о расхождениях'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='только показать расхождения, ничего не сохраняя')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = list(models.Project.objects.with_drift().order_by('pk'))
+            for project in drifted:
+                self.stdout.write(
+                    f'Проект №{project.pk} «{project.title}»: '
+                    f'задачи {project.tasks_total} -> {project.actual_tasks_total}, '
+                    f'смета {project.items_total} -> {project.actual_items_total}'
+                )
+            if not options['check']:
+                models.Project.objects.refresh_totals()
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('Расхождений не найдено'))
+        elif options['check']:
+            self.stdout.write(self.style.WARNING(f'Расхождений: {len(drifted)}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Исправлено проектов: {len(drifted)}'))
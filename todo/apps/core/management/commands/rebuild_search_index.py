@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from todo.apps.core import search
+
+
+class Command(BaseCommand):
+    help = 'Заново строит полнотекстовый индекс сообщений, задач, сметы, проектов и клиентов'
+
+    def handle(self, *args, **options):
+        search.install()
+        with transaction.atomic():
+            counts = search.rebuild(log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано объектов: {sum(counts.values())}'))
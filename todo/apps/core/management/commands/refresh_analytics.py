@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from todo.apps.core import analytics
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводку выручки по изменённым месяцам или целиком'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='пересчитать все месяцы, а не только изменённые')
+
+    def handle(self, *args, **options):
+        months = analytics.refresh(full=options['full'])
+        if months:
+            self.stdout.write(self.style.SUCCESS(
+                f'Пересчитано месяцев: {len(months)} ({months[0]:%m.%Y}–{months[-1]:%m.%Y})'
+            ))
+        else:
+            self.stdout.write('Изменений нет')
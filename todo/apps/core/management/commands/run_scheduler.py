@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from todo.apps.core import jobs
+
+
+class Command(BaseCommand):
+    help = 'Запускает периодические задачи (закрытие просроченных задач и т. д.)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('jobs', nargs='*', help='запустить только эти задачи')
+        parser.add_argument('--once', action='store_true', help='выполнить задачи один раз и выйти')
+
+    def handle(self, *args, **options):
+        schedule = jobs.get_schedule()
+        unknown = set(options['jobs']) - schedule.keys()
+        if unknown:
+            raise CommandError(f'Неизвестные задачи: {", ".join(sorted(unknown))}')
+        if options['jobs']:
+            schedule = {name: schedule[name] for name in options['jobs']}
+
+        next_run = dict.fromkeys(schedule, 0.0)
+        while True:
+            for name, (job, interval) in schedule.items():
+                if time.monotonic() < next_run[name]:
+                    continue
+                close_old_connections()
+                try:
+                    result = job()
+                except Exception as error:
+                    self.stderr.write(f'{name}: {error!r}')
+                else:
+                    self.stdout.write(f'{name}: {result}')
+                next_run[name] = time.monotonic() + interval
+            if options['once']:
+                return
+            time.sleep(max(0.0, min(next_run.values()) - time.monotonic()))
@@ -0,0 +1,204 @@
+# Generated by Django 4.2.11 on 2026-10-18 09:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import mptt.fields
+
+
+class Migration(migrations.Migration):
+
+    replaces = [('core', '0001_initial'), ('core', '0002_initial'), ('core', '0003_task_executor_alter_task_creator'), ('core', '0004_alter_task_price'), ('core', '0005_alter_task_status'), ('core', '0006_message'), ('core', '0007_message_theme'), ('core', '0008_report_delete_message'), ('core', '0009_remove_vacation_staff_task_extra_task_project_and_more'), ('core', '0010_alter_vacation_options_task_completed_at_and_more'), ('core', '0011_vacation_is_canceled'), ('core', '0012_alter_task_options_remove_vacation_is_canceled_and_more'), ('core', '0013_report_answer_report_updated_at'), ('core', '0014_alter_report_options_alter_report_answer_and_more'), ('core', '0015_alter_report_options_item_project'), ('core', '0016_project_price_alter_project_total'), ('core', '0017_alter_item_options_alter_project_options_and_more'), ('core', '0018_alter_item_creator_alter_item_total_and_more'), ('core', '0019_alter_project_creator'), ('core', '0020_remove_project_total_alter_project_client_and_more')]
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=128, verbose_name='название')),
+                ('lft', models.PositiveIntegerField(editable=False)),
+                ('rght', models.PositiveIntegerField(editable=False)),
+                ('tree_id', models.PositiveIntegerField(db_index=True, editable=False)),
+                ('level', models.PositiveIntegerField(editable=False)),
+            ],
+            options={
+                'verbose_name': 'категория',
+                'verbose_name_plural': 'категории',
+            },
+        ),
+        migrations.CreateModel(
+            name='Client',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200, verbose_name='название')),
+            ],
+            options={
+                'verbose_name': 'клиент',
+                'verbose_name_plural': 'клиенты',
+            },
+        ),
+        migrations.CreateModel(
+            name='Item',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200, verbose_name='название')),
+                ('quantity', models.IntegerField(default=1, verbose_name='кол-во')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='цена')),
+                ('total', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='итого')),
+                ('note', models.TextField(blank=True, null=True, verbose_name='примечание')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='создано')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='обновлено')),
+            ],
+            options={
+                'verbose_name': 'позиция сметы',
+                'verbose_name_plural': 'позиции сметы',
+            },
+        ),
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200, verbose_name='название')),
+                ('type', models.CharField(max_length=200, verbose_name='тип')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='цена')),
+            ],
+            options={
+                'verbose_name': 'работа',
+                'verbose_name_plural': 'работы',
+            },
+        ),
+        migrations.CreateModel(
+            name='Project',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200, verbose_name='название')),
+                ('location', models.CharField(max_length=200, verbose_name='местоположение')),
+                ('status', models.CharField(max_length=200, verbose_name='статус')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='цена')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='создано')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='обновлено')),
+            ],
+            options={
+                'verbose_name': 'проект',
+                'verbose_name_plural': 'проекты',
+            },
+        ),
+        migrations.CreateModel(
+            name='Report',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='создано')),
+                ('updated_at', models.DateTimeField(blank=True, null=True, verbose_name='обновлено')),
+                ('theme', models.CharField(max_length=200, verbose_name='тема')),
+                ('content', models.TextField(verbose_name='содержание')),
+                ('answer', models.TextField(blank=True, null=True, verbose_name='ответ')),
+                ('is_answered', models.BooleanField(blank=True, default=False, null=True, verbose_name='ответ?')),
+            ],
+            options={
+                'verbose_name': 'сообщение',
+                'verbose_name_plural': 'сообщения',
+                'ordering': ['-updated_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(verbose_name='количество')),
+                ('coefficient', models.DecimalField(decimal_places=2, default=1.0, max_digits=10, verbose_name='коэффициент')),
+                ('is_fixed_price', models.BooleanField(default=False, verbose_name='фикс. цена')),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='цена')),
+                ('total', models.DecimalField(decimal_places=2, default=0.0, max_digits=10, verbose_name='итого')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='создание')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='обновление')),
+                ('expired_at', models.DateTimeField(verbose_name='завершение')),
+                ('completed_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('status', models.CharField(choices=[('created', 'Создана'), ('processed', 'Обработана'), ('completed', 'Завершена'), ('cancelled', 'Отменена')], default='created', max_length=200, verbose_name='статус')),
+                ('extra', models.TextField(blank=True, null=True, verbose_name='дополнительно')),
+            ],
+            options={
+                'verbose_name': 'Задача',
+                'verbose_name_plural': 'Задачи',
+            },
+        ),
+        migrations.CreateModel(
+            name='Vacation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField(verbose_name='начало')),
+                ('end_date', models.DateField(verbose_name='окончание')),
+                ('status', models.CharField(choices=[('planned', 'Запланирован'), ('processed', 'В процессе'), ('completed', 'Завершен'), ('cancelled', 'Отменен')], max_length=200, verbose_name='статус')),
+            ],
+            options={
+                'verbose_name': 'отпуск',
+                'verbose_name_plural': 'отпуска',
+                'ordering': ['-start_date'],
+            },
+        ),
+        migrations.AddField(
+            model_name='vacation',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='сотрудник'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='creator',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='creators', to=settings.AUTH_USER_MODEL, verbose_name='создатель'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='executor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='executors', to=settings.AUTH_USER_MODEL, verbose_name='исполнитель'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='job',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='job', to='core.job', verbose_name='работа'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='project',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='core.project', verbose_name='проект'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='creator',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sender', to=settings.AUTH_USER_MODEL, verbose_name='отправитель'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='client',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='client', to='core.client', verbose_name='заказчик'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='creator',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='creator', to=settings.AUTH_USER_MODEL, verbose_name='создатель'),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.category', verbose_name='категория'),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='creator',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='создатель'),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='project',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='core.project', verbose_name='проект'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='parent',
+            field=mptt.fields.TreeForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='core.category', verbose_name='родитель'),
+        ),
+    ]
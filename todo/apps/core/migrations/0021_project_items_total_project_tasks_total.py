@@ -0,0 +1,41 @@
+# Generated by Django 4.2.11 on 2026-10-18 09:49
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_totals(apps, schema_editor):
+    """Fills the new stored totals of existing projects, as ``ProjectQuerySet.refresh_totals`` does."""
+    db = schema_editor.connection.alias
+    Project, Task, Item = (apps.get_model('core', name) for name in ('Project', 'Task', 'Item'))
+
+    def total(model):
+        totals = (model.objects.using(db).filter(project=OuterRef('pk')).order_by()
+                  .values('project').annotate(sum=Sum('total')).values('sum'))
+        return Coalesce(Subquery(totals), Value(Decimal(0)), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+    Project.objects.using(db).update(tasks_total=total(Task), items_total=total(Item))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_squashed_0020_remove_project_total_alter_project_client_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='items_total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14, verbose_name='сумма сметы'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14, verbose_name='сумма задач'),
+        ),
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
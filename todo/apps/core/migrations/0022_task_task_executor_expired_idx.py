@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-18 09:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_project_items_total_project_tasks_total'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['executor', 'expired_at'], name='task_executor_expired_idx'),
+        ),
+    ]
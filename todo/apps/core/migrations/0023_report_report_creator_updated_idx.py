@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-18 09:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_task_task_executor_expired_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['creator', 'updated_at', 'id'], name='report_creator_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.11 on 2026-10-18 09:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_report_report_creator_updated_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskSweep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(verbose_name='начало')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='окончание')),
+                ('status', models.CharField(max_length=200, verbose_name='новый статус')),
+                ('closed', models.PositiveIntegerField(default=0, verbose_name='закрыто задач')),
+                ('tasks', models.JSONField(blank=True, default=list, verbose_name='задачи')),
+                ('projects', models.JSONField(blank=True, default=list, verbose_name='проекты')),
+            ],
+            options={
+                'verbose_name': 'закрытие просроченных задач',
+                'verbose_name_plural': 'закрытия просроченных задач',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status__in', ('created', 'processed'))), fields=['expired_at'], name='task_open_expired_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.11 on 2026-10-18 09:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_tasksweep_task_task_open_expired_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_open_expired_idx',
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['title'], name='client_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['title'], name='project_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['executor', 'status', '-created_at'], name='task_executor_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'expired_at'], name='task_status_expired_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vacation',
+            index=models.Index(fields=['user', 'status', 'start_date'], name='vacation_user_status_start_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='item',
+            constraint=models.CheckConstraint(check=models.Q(('quantity__gte', 0)), name='item_quantity_non_negative'),
+        ),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.CheckConstraint(check=models.Q(('quantity__gte', 0)), name='task_quantity_non_negative'),
+        ),
+        migrations.AddConstraint(
+            model_name='vacation',
+            constraint=models.CheckConstraint(check=models.Q(('end_date__gte', models.F('start_date'))), name='vacation_dates_ordered'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-18 09:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_searchdocument_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(condition=models.Q(('is_answered', False)), fields=['created_at', 'id'], name='report_unanswered_idx'),
+        ),
+    ]
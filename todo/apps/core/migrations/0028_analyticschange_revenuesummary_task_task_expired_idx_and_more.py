@@ -0,0 +1,68 @@
+# Generated by Django 4.2.11 on 2026-10-18 09:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0027_report_report_unanswered_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='месяц')),
+            ],
+            options={
+                'verbose_name': 'изменение для сводки',
+                'verbose_name_plural': 'изменения для сводки',
+            },
+        ),
+        migrations.CreateModel(
+            name='RevenueSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='месяц')),
+                ('tasks_total', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='сумма задач')),
+                ('items_total', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='сумма сметы')),
+                ('completed_total', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='завершено')),
+                ('cancelled_total', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='отменено')),
+                ('tasks', models.PositiveIntegerField(default=0, verbose_name='задач')),
+                ('items', models.PositiveIntegerField(default=0, verbose_name='позиций')),
+            ],
+            options={
+                'verbose_name': 'сводка выручки',
+                'verbose_name_plural': 'сводка выручки',
+                'ordering': ['-month'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['expired_at'], name='task_expired_idx'),
+        ),
+        migrations.AddField(
+            model_name='revenuesummary',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.category', verbose_name='категория'),
+        ),
+        migrations.AddField(
+            model_name='revenuesummary',
+            name='client',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.client', verbose_name='заказчик'),
+        ),
+        migrations.AddField(
+            model_name='revenuesummary',
+            name='executor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='исполнитель'),
+        ),
+        migrations.AddIndex(
+            model_name='revenuesummary',
+            index=models.Index(fields=['month'], name='revenue_month_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils.timezone import localdate
+
+
+def reprice_fixed_price_tasks(apps, schema_editor):
+    """
+    Bills the existing fixed-price tasks at their own price, as ``Task.save``
+    does since the task import, and brings the project totals and the revenue
+    summary in line with it.
+    """
+    db = schema_editor.connection.alias
+    Project, Task, AnalyticsChange = (apps.get_model('core', name) for name in ('Project', 'Task', 'AnalyticsChange'))
+
+    changed = []
+    for task in Task.objects.using(db).filter(is_fixed_price=True, price__isnull=False).iterator():
+        total = task.price * task.quantity * task.coefficient
+        if task.total != total:
+            task.total = total
+            changed.append(task)
+    if not changed:
+        return
+    Task.objects.using(db).bulk_update(changed, ['total'], batch_size=500)
+
+    totals = (Task.objects.using(db).filter(project=OuterRef('pk')).order_by()
+              .values('project').annotate(sum=Sum('total')).values('sum'))
+    Project.objects.using(db).filter(pk__in={task.project_id for task in changed if task.project_id}).update(
+        tasks_total=Coalesce(Subquery(totals), Value(Decimal(0)),
+                             output_field=DecimalField(max_digits=14, decimal_places=2)))
+    months = {localdate(task.expired_at).replace(day=1) for task in changed}
+    AnalyticsChange.objects.using(db).bulk_create([AnalyticsChange(month=month) for month in sorted(months)])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_analyticschange_revenuesummary_task_task_expired_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(reprice_fixed_price_tasks, migrations.RunPython.noop),
+    ]
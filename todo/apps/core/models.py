@@ -1,14 +1,59 @@
+from collections import defaultdict
+from decimal import Decimal
+
 from django.contrib.admin import display
-from django.db import models
-from django.db.models import Sum
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round, TruncMonth
 from django.urls import reverse
-from django.utils.timezone import now
+from django.utils.timezone import localdate, now
 
+from todo.apps.core import caching
 from todo.apps.custom_account.models import User
 from mptt.models import MPTTModel, TreeForeignKey
 
 
-class Client(models.Model):
+class LoadedStateMixin:
+    """Remembers the values of ``tracked_fields`` as they were loaded from the database."""
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_state = {f: instance.__dict__[f] for f in cls.tracked_fields if f in instance.__dict__}
+        return instance
+
+    def get_loaded_state(self):
+        """The ``tracked_fields`` values currently stored in the database."""
+        if self._state.adding:
+            return {}
+        state = getattr(self, '_loaded_state', {})
+        missing = [f for f in self.tracked_fields if f not in state]
+        if missing:
+            state.update(type(self)._base_manager.filter(pk=self.pk).values(*missing).first() or {})
+            self._loaded_state = state
+        return state
+
+    def remember_loaded_state(self):
+        self._loaded_state = {f: getattr(self, f) for f in self.tracked_fields}
+
+    def state_changed(self, old_state):
+        """Called inside the saving transaction with the values that were replaced."""
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            old_state = self.get_loaded_state()
+            super().save(*args, **kwargs)
+            self.state_changed(old_state)
+        self.remember_loaded_state()
+
+
+class Client(LoadedStateMixin, models.Model):
+    # The title is part of the search documents of the client's projects.
+    tracked_fields = ('title',)
+
     title = models.CharField(max_length=200, verbose_name='название')
 
     def __str__(self):
@@ -17,9 +62,47 @@ class Client(models.Model):
     class Meta:
         verbose_name = 'клиент'
         verbose_name_plural = 'клиенты'
+        indexes = [
+            models.Index(fields=['title'], name='client_title_idx'),
+        ]
+
+
+class ProjectQuerySet(models.QuerySet):
+    def with_actual_totals(self):
+        """Annotates the totals recomputed from the ``Task`` and ``Item`` rows."""
+        return self.annotate(actual_tasks_total=_total_subquery(Task), actual_items_total=_total_subquery(Item))
+
+    def with_drift(self):
+        """Projects whose stored totals differ from the recomputed ones."""
+        # SQLite sums decimals as floats, so compare to the cent.
+        return self.with_actual_totals().exclude(
+            tasks_total=Round('actual_tasks_total', 2), items_total=Round('actual_items_total', 2),
+        )
+
+    def refresh_totals(self):
+        """Rebuilds the stored totals from scratch with a single UPDATE."""
+        return self.update(tasks_total=_total_subquery(Task), items_total=_total_subquery(Item))
+
+    def with_grand_total(self):
+        """Annotates ``grand_total``, the number behind ``Project.get_total``, to sort and sum by."""
+        return self.annotate(grand_total=F('price') + F('tasks_total') + F('items_total'))
+
+    def add_to_totals(self, field, delta):
+        if not delta:
+            return 0
+        return self.update(**{field: F(field) + delta})
+
+
+def _total_subquery(model):
+    totals = (model.objects.filter(project=OuterRef('pk')).order_by()
+              .values('project').annotate(sum=Sum('total')).values('sum'))
+    return Coalesce(Subquery(totals), Value(Decimal(0)), output_field=DecimalField(max_digits=14, decimal_places=2))
+
 
+class Project(LoadedStateMixin, models.Model):
+    # The title is part of the search documents of the project's tasks and items.
+    tracked_fields = ('title',)
 
-class Project(models.Model):
     title = models.CharField(max_length=200, verbose_name='название')
     client = models.ForeignKey(Client, on_delete=models.CASCADE, verbose_name='заказчик', related_name='client')
     location = models.CharField(max_length=200, verbose_name='местоположение')
@@ -31,21 +114,26 @@ class Project(models.Model):
     creator = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True,
                                 verbose_name='создатель', related_name='creator')
 
+    # Denormalized sums of Task.total and Item.total, kept in sync by ProjectRollupMixin.
+    tasks_total = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False,
+                                      verbose_name='сумма задач')
+    items_total = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False,
+                                      verbose_name='сумма сметы')
+
+    objects = ProjectQuerySet.as_manager()
+
     def get_total_tasks(self):
-        return self.tasks.aggregate(Sum('total')).get('total__sum')
+        return self.tasks_total
 
     def get_total_items(self):
-        return self.items.aggregate(Sum('total')).get('total__sum')
+        return self.items_total
+
+    def get_total_amount(self):
+        """The price of the project with its tasks and items, as a number."""
+        return self.price + self.tasks_total + self.items_total
 
     def get_total(self):
-        total = self.price
-        total_items = self.get_total_items()
-        total_tasks = self.get_total_tasks()
-        if total_items:
-            total += total_items
-        if total_tasks:
-            total += total_tasks
-        return f'{int(total)} руб'
+        return f'{int(self.get_total_amount())} руб'
 
     @property
     @display(description='смета', )
@@ -65,19 +153,96 @@ class Project(models.Model):
     class Meta:
         verbose_name = 'проект'
         verbose_name_plural = 'проекты'
+        indexes = [
+            # Exact and prefix lookups by title from the admin and Item search.
+            models.Index(fields=['title'], name='project_title_idx'),
+        ]
 
     def __str__(self):
         return f'{self.title}'
 
 
+class RollupQuerySet(models.QuerySet):
+    """Refreshes the totals of every touched project on bulk writes."""
+    rollup_fields = {'project', 'project_id', 'total'}
+
+    def _touched_projects(self):
+        return set(self.order_by().exclude(project=None).values_list('project_id', flat=True).distinct())
+
+    def update(self, **kwargs):
+        if not self.rollup_fields & kwargs.keys():
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            project_ids = self._touched_projects()
+            rows = super().update(**kwargs)
+            project = kwargs.get('project', kwargs.get('project_id'))
+            if project is not None:
+                project_ids.add(getattr(project, 'pk', project))
+            Project.objects.filter(pk__in=project_ids).refresh_totals()
+        return rows
+
+    update.alters_data = True
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        if not self.rollup_fields & set(fields):
+            return super().bulk_update(objs, fields, batch_size=batch_size)
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            project_ids = self.filter(pk__in=[obj.pk for obj in objs])._touched_projects()
+            rows = super().bulk_update(objs, fields, batch_size=batch_size)
+            project_ids.update(obj.project_id for obj in objs if obj.project_id)
+            Project.objects.filter(pk__in=project_ids).refresh_totals()
+        for obj in objs:
+            obj.remember_loaded_state()
+        return rows
+
+    bulk_update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            deltas = defaultdict(Decimal)
+            for obj in objs:
+                if obj.project_id and obj.total:
+                    deltas[obj.project_id] += obj.total
+                obj.remember_loaded_state()
+            for project_id, delta in deltas.items():
+                Project.objects.filter(pk=project_id).add_to_totals(self.model.rollup_field, delta)
+        return objs
+
+    bulk_create.alters_data = True
+
+
+class ProjectRollupMixin(LoadedStateMixin):
+    """
+    Applies the change of ``total`` to ``Project.<rollup_field>`` on save.
+
+    Deletions are handled by the ``post_delete`` receiver in ``signals``,
+    bulk writes by ``RollupQuerySet``.
+    """
+    rollup_field = None
+    tracked_fields = ('project_id', 'total')
+
+    def state_changed(self, old_state):
+        super().state_changed(old_state)
+        old_project, old_total = old_state.get('project_id'), old_state.get('total') or 0
+        new_total = self.total or 0
+        projects = Project.objects
+        if old_project == self.project_id:
+            if old_project:
+                projects.filter(pk=old_project).add_to_totals(self.rollup_field, new_total - old_total)
+        else:
+            if old_project:
+                projects.filter(pk=old_project).add_to_totals(self.rollup_field, -old_total)
+            if self.project_id:
+                projects.filter(pk=self.project_id).add_to_totals(self.rollup_field, new_total)
+
+
 class Category(MPTTModel):
     title = models.CharField(max_length=128, verbose_name='название')
     parent = TreeForeignKey('self', on_delete=models.CASCADE, null=True, blank=True,
                             related_name='children', verbose_name='родитель')
 
-    class MPTTMeta:
-        order_insertion_by = ['title']
-
     def __str__(self):
         return self.title
 
@@ -86,7 +251,10 @@ class Category(MPTTModel):
         verbose_name_plural = 'категории'
 
 
-class Job(models.Model):
+class Job(LoadedStateMixin, models.Model):
+    # The title is part of the search documents of the job's tasks.
+    tracked_fields = ('title',)
+
     category = models.ForeignKey(Category, on_delete=models.CASCADE, verbose_name='категория')
     title = models.CharField(max_length=200, verbose_name='название')
     type = models.CharField(max_length=200, verbose_name='тип')
@@ -100,7 +268,73 @@ class Job(models.Model):
         verbose_name_plural = 'работы'
 
 
-class Task(models.Model):
+class TaskQuerySet(RollupQuerySet):
+    """Also drops the cached calendars of every executor touched by a bulk write."""
+    calendar_fields = {'executor', 'executor_id', 'expired_at'}
+    # What the cached calendars and dashboards show or the revenue summary sums;
+    # bulk writes of other fields skip the invalidation and the analytics log.
+    tracked_update_fields = calendar_fields | RollupQuerySet.rollup_fields | {'status', 'job', 'job_id'}
+    open_statuses = ('created', 'processed')
+
+    def open(self):
+        return self.filter(status__in=self.open_statuses)
+
+    def overdue(self, moment=None):
+        """Open tasks past their deadline, served by the ``task_status_expired_idx`` index."""
+        return self.open().filter(expired_at__lte=moment or now())
+
+    def _month_pairs(self):
+        """The distinct ``(executor_id, month)`` pairs of the tasks, grouped by the database."""
+        return list(self.order_by().values_list('executor_id', TruncMonth('expired_at')).distinct())
+
+    def update(self, **kwargs):
+        if not self.tracked_update_fields & kwargs.keys():
+            return super().update(**kwargs)
+        moved = {name: kwargs[name] for name in self.calendar_fields & kwargs.keys()}
+        # Expressions only have their values once written: follow the rows themselves.
+        followed = (list(self.order_by().values_list('pk', flat=True))
+                    if any(hasattr(value, 'resolve_expression') for value in moved.values()) else None)
+        before = self._month_pairs()
+        rows = super().update(**kwargs)
+        if followed is not None:
+            after = self.model.objects.filter(pk__in=followed)._month_pairs()
+        elif moved:
+            executor = moved.get('executor', moved.get('executor_id'))
+            new_executor = 'executor' in moved or 'executor_id' in moved
+            after = [(getattr(executor, 'pk', executor) if new_executor else executor_id,
+                      moved.get('expired_at', month)) for executor_id, month in before]
+        else:
+            after = []
+        pairs = before + after
+        caching.invalidate_tasks(pairs, using=self.db)
+        AnalyticsChange.objects.using(self.db).log(month for _, month in pairs)
+        return rows
+
+    update.alters_data = True
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        if not self.tracked_update_fields & set(fields):
+            return super().bulk_update(objs, fields, batch_size=batch_size)
+        objs = list(objs)
+        before = self.filter(pk__in=[obj.pk for obj in objs])._month_pairs()
+        rows = super().bulk_update(objs, fields, batch_size=batch_size)
+        pairs = before + list({(obj.executor_id, obj.expired_at) for obj in objs})
+        caching.invalidate_tasks(pairs, using=self.db)
+        AnalyticsChange.objects.using(self.db).log(expired_at for _, expired_at in pairs)
+        return rows
+
+    bulk_update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        caching.invalidate_tasks([(obj.executor_id, obj.expired_at) for obj in objs], using=self.db)
+        AnalyticsChange.objects.using(self.db).log(obj.expired_at for obj in objs)
+        return objs
+
+    bulk_create.alters_data = True
+
+
+class Task(ProjectRollupMixin, models.Model):
     STATUS_CHOICES = [
         ('created', 'Создана'),
         ('processed', 'Обработана'),
@@ -113,7 +347,8 @@ class Task(models.Model):
     job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='job', verbose_name='работа')
     quantity = models.IntegerField(verbose_name='количество')
 
-    coefficient = models.DecimalField(max_digits=10, decimal_places=2, default=1.0, verbose_name='коэффициент')
+    coefficient = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('1.0'),
+                                      verbose_name='коэффициент')
     is_fixed_price = models.BooleanField(default=False, verbose_name='фикс. цена')
     price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, verbose_name='цена')
     total = models.DecimalField(max_digits=10, decimal_places=2, default=0.0, verbose_name='итого')
@@ -132,22 +367,92 @@ class Task(models.Model):
 
     extra = models.TextField(blank=True, null=True, verbose_name='дополнительно')
 
+    objects = TaskQuerySet.as_manager()
+    rollup_field = 'tasks_total'
+    tracked_fields = ProjectRollupMixin.tracked_fields + ('executor_id', 'expired_at')
+
     def get_absolute_url(self, *args, **kwargs):
         return reverse('task-detail', kwargs={'uuid': self.id})
 
+    @staticmethod
+    def calculate_total(job_price, quantity, coefficient, is_fixed_price=False, price=None):
+        """A fixed-price task is billed at its own price instead of the job's one."""
+        unit_price = price if is_fixed_price and price is not None else job_price
+        return unit_price * quantity * coefficient
+
     def save(self, *args, **kwargs):
-        self.total = self.job.price * self.quantity * self.coefficient
+        self.total = self.calculate_total(self.job.price, self.quantity, self.coefficient,
+                                          self.is_fixed_price, self.price)
         super().save(*args, **kwargs)
 
+    def clean(self):
+        from todo.apps.core.availability import Availability
+
+        if self.executor_id and self.expired_at and self.status in TaskQuerySet.open_statuses:
+            day = localdate(self.expired_at)
+            vacation = Availability.for_period(day, day, users=[self.executor_id]).vacation_on(self.executor_id, day)
+            if vacation is not None:
+                raise ValidationError({'executor': f'Исполнитель в отпуске с {vacation.start_date:%d.%m.%Y} '
+                                                   f'по {vacation.end_date:%d.%m.%Y}'})
+
+    def state_changed(self, old_state):
+        super().state_changed(old_state)
+        caching.invalidate_tasks([
+            (old_state.get('executor_id'), old_state.get('expired_at')),
+            (self.executor_id, self.expired_at),
+        ], using=self._state.db)
+        AnalyticsChange.objects.using(self._state.db).log([old_state.get('expired_at'), self.expired_at])
+
     class Meta:
         verbose_name = 'Задача'
         verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(fields=['executor', 'expired_at'], name='task_executor_expired_idx'),
+            # The dashboard lists: open tasks of an executor, newest first.
+            models.Index(fields=['executor', 'status', '-created_at'], name='task_executor_status_idx'),
+            # The expiry sweep seeks straight to the overdue open tasks of each status. A partial
+            # index on open tasks is not used by SQLite, which compares the bound status parameters
+            # with the index condition only after planning.
+            models.Index(fields=['status', 'expired_at'], name='task_status_expired_idx'),
+            # The revenue summary regroups a month of deadlines at a time.
+            models.Index(fields=['expired_at'], name='task_expired_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(check=Q(quantity__gte=0), name='task_quantity_non_negative'),
+        ]
 
     def __str__(self):
         return f'Задача №{self.id}'
 
 
-class Item(models.Model):
+class ItemQuerySet(RollupQuerySet):
+    """Also logs the months of the items whose project or total a bulk write changes, see ``analytics``."""
+
+    def update(self, **kwargs):
+        if self.rollup_fields & kwargs.keys():
+            AnalyticsChange.objects.using(self.db).log(self.order_by().values_list('created_at', flat=True))
+        return super().update(**kwargs)
+
+    update.alters_data = True
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        objs = list(objs)
+        rows = super().bulk_update(objs, fields, batch_size=batch_size)
+        if self.rollup_fields & set(fields):
+            AnalyticsChange.objects.using(self.db).log(obj.created_at for obj in objs)
+        return rows
+
+    bulk_update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        AnalyticsChange.objects.using(self.db).log(obj.created_at for obj in objs)
+        return objs
+
+    bulk_create.alters_data = True
+
+
+class Item(ProjectRollupMixin, models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='items',
                                 blank=True, null=True, verbose_name='проект')
     title = models.CharField(max_length=200, verbose_name='название')
@@ -160,16 +465,26 @@ class Item(models.Model):
     updated_at = models.DateTimeField(auto_now=True, verbose_name='обновлено')
     creator = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True, verbose_name='создатель')
 
+    objects = ItemQuerySet.as_manager()
+    rollup_field = 'items_total'
+
     def save(self, *args, **kwargs):
         self.total = self.quantity * self.price
         super().save(*args, **kwargs)
 
+    def state_changed(self, old_state):
+        super().state_changed(old_state)
+        AnalyticsChange.objects.using(self._state.db).log([self.created_at])
+
     class Meta:
         verbose_name = 'позиция сметы'
         verbose_name_plural = 'позиции сметы'
+        constraints = [
+            models.CheckConstraint(check=Q(quantity__gte=0), name='item_quantity_non_negative'),
+        ]
 
 
-class Vacation(models.Model):
+class Vacation(LoadedStateMixin, models.Model):
     STATUS_CHOICES = [
         ('planned', 'Запланирован'),
         ('processed', 'В процессе'),
@@ -182,13 +497,71 @@ class Vacation(models.Model):
     end_date = models.DateField(verbose_name='окончание')
     status = models.CharField(max_length=200, choices=STATUS_CHOICES, verbose_name='статус')
 
+    tracked_fields = ('user_id',)
+
+    def clean(self):
+        from todo.apps.core.availability import BLOCKING_STATUSES, overlapping_vacations
+
+        if self.start_date and self.end_date and self.end_date < self.start_date:
+            raise ValidationError({'end_date': 'Отпуск не может закончиться раньше, чем начался'})
+        if self.user_id and self.start_date and self.end_date and self.status in BLOCKING_STATUSES:
+            other = overlapping_vacations(self).order_by('start_date').first()
+            if other is not None:
+                raise ValidationError(f'Пересекается с отпуском с {other.start_date:%d.%m.%Y} '
+                                      f'по {other.end_date:%d.%m.%Y}')
+
+    def state_changed(self, old_state):
+        super().state_changed(old_state)
+        caching.invalidate_dashboards([old_state.get('user_id'), self.user_id], using=self._state.db)
+
     class Meta:
         verbose_name = 'отпуск'
         verbose_name_plural = 'отпуска'
         ordering = ['-start_date']
-
-
-class Report(models.Model):
+        indexes = [
+            models.Index(fields=['user', 'status', 'start_date'], name='vacation_user_status_start_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(check=Q(end_date__gte=F('start_date')), name='vacation_dates_ordered'),
+        ]
+
+
+class ReportQuerySet(models.QuerySet):
+    def unanswered(self):
+        """Served by the partial ``report_unanswered_idx`` index."""
+        return self.filter(is_answered=False)
+
+    def answer(self, answers, batch_size=500):
+        """
+        Saves ``{report id: answer}`` with one bulk UPDATE per batch, setting
+        ``is_answered`` and ``updated_at`` the way ``Report.save`` does.
+        Returns the updated reports.
+        """
+        from todo.apps.core import search
+
+        reports = list(self.filter(pk__in=answers).order_by('pk'))
+        moment = now()
+        delta = 0
+        for report in reports:
+            delta -= report.is_answered is False
+            report.answer = answers[report.pk] or None
+            report.is_answered = bool(report.answer)
+            report.updated_at = moment
+            delta += not report.is_answered
+        with transaction.atomic(using=self.db):
+            self.model.objects.using(self.db).bulk_update(reports, ['answer', 'is_answered', 'updated_at'],
+                                                          batch_size=batch_size)
+            for report in reports:
+                report.remember_loaded_state()
+            caching.adjust_unanswered_reports(delta, using=self.db)
+            # bulk_update sends no post_save, the answers are indexed for search here.
+            search.index_objects(self.model, reports)
+        return reports
+
+    answer.alters_data = True
+
+
+class Report(LoadedStateMixin, models.Model):
     creator = models.ForeignKey(User, related_name="sender", on_delete=models.CASCADE, verbose_name='отправитель')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='создано')
     updated_at = models.DateTimeField(blank=True, null=True, verbose_name='обновлено')
@@ -197,12 +570,136 @@ class Report(models.Model):
     answer = models.TextField(blank=True, null=True, verbose_name='ответ')
     is_answered = models.BooleanField(blank=True, null=True, default=False, verbose_name='ответ?')
 
+    objects = ReportQuerySet.as_manager()
+    tracked_fields = ('is_answered',)
+
     def save(self, *args, **kwargs):
         self.updated_at = now()
         self.is_answered = True if self.answer else False
         super().save(*args, **kwargs)
 
+    def state_changed(self, old_state):
+        super().state_changed(old_state)
+        was_unanswered = old_state.get('is_answered') is False
+        caching.adjust_unanswered_reports((self.is_answered is False) - was_unanswered,
+                                          using=self._state.db)
+
     class Meta:
         verbose_name = 'сообщение'
         verbose_name_plural = 'сообщения'
         ordering = ['-updated_at']
+        indexes = [
+            # Keyset pagination of a user's reports, see pagination.KeysetPaginator.
+            models.Index(fields=['creator', 'updated_at', 'id'], name='report_creator_updated_idx'),
+            # The staff inbox. Django compiles is_answered=False to NOT "is_answered", without
+            # a bound parameter, so SQLite matches the query against the index condition.
+            models.Index(fields=['created_at', 'id'], condition=Q(is_answered=False), name='report_unanswered_idx'),
+        ]
+
+
+class TaskSweep(models.Model):
+    """One run of ``jobs.sweep_expired_tasks``."""
+    started_at = models.DateTimeField(verbose_name='начало')
+    finished_at = models.DateTimeField(blank=True, null=True, verbose_name='окончание')
+    status = models.CharField(max_length=200, verbose_name='новый статус')
+    closed = models.PositiveIntegerField(default=0, verbose_name='закрыто задач')
+    tasks = models.JSONField(default=list, blank=True, verbose_name='задачи')
+    projects = models.JSONField(default=list, blank=True, verbose_name='проекты')
+
+    class Meta:
+        verbose_name = 'закрытие просроченных задач'
+        verbose_name_plural = 'закрытия просроченных задач'
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f'Закрытие просроченных задач от {self.started_at:%d.%m.%Y %H:%M}'
+
+
+class SearchDocument(models.Model):
+    """The searchable text of one report, task, item, project or client, see ``search``."""
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, verbose_name='тип')
+    object_id = models.PositiveBigIntegerField(verbose_name='объект')
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True, related_name='+',
+                              verbose_name='владелец')
+    title = models.CharField(max_length=255, verbose_name='заголовок')
+    body = models.TextField(blank=True, verbose_name='текст')
+
+    class Meta:
+        verbose_name = 'поисковый документ'
+        verbose_name_plural = 'поисковые документы'
+        constraints = [
+            models.UniqueConstraint(fields=['content_type', 'object_id'], name='search_document_object_unique'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    @property
+    def label(self):
+        return ContentType.objects.get_for_id(self.content_type_id).model_class()._meta.verbose_name
+
+    def get_absolute_url(self):
+        from todo.apps.core import search
+
+        return search.url_for(self)
+
+
+class RevenueSummary(models.Model):
+    """
+    Totals of tasks and items per month, client, category and executor,
+    rebuilt from the ``AnalyticsChange`` log by ``analytics.refresh``.
+
+    Tasks count in the month of their deadline, items in the month they were
+    added; items have no category or executor.
+    """
+    month = models.DateField(verbose_name='месяц')
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, blank=True, null=True, related_name='+',
+                               verbose_name='заказчик')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, blank=True, null=True, related_name='+',
+                                 verbose_name='категория')
+    executor = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True, related_name='+',
+                                 verbose_name='исполнитель')
+
+    tasks_total = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name='сумма задач')
+    items_total = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name='сумма сметы')
+    completed_total = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name='завершено')
+    cancelled_total = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name='отменено')
+    tasks = models.PositiveIntegerField(default=0, verbose_name='задач')
+    items = models.PositiveIntegerField(default=0, verbose_name='позиций')
+
+    class Meta:
+        verbose_name = 'сводка выручки'
+        verbose_name_plural = 'сводка выручки'
+        ordering = ['-month']
+        indexes = [
+            models.Index(fields=['month'], name='revenue_month_idx'),
+        ]
+
+    def __str__(self):
+        return f'Выручка за {self.month:%m.%Y}'
+
+    @property
+    @display(description='выручка')
+    def revenue(self):
+        return self.tasks_total + self.items_total
+
+
+class AnalyticsChangeQuerySet(models.QuerySet):
+    def log(self, moments):
+        """Marks the months of ``moments`` (aware datetimes, ``None`` is skipped) for ``analytics.refresh``."""
+        months = {localdate(moment).replace(day=1) for moment in moments if moment}
+        if months:
+            self.bulk_create([self.model(month=month) for month in sorted(months)])
+
+    log.alters_data = True
+
+
+class AnalyticsChange(models.Model):
+    """A month whose ``RevenueSummary`` rows are stale; the log is append-only and emptied by the refresh."""
+    month = models.DateField(verbose_name='месяц')
+
+    objects = AnalyticsChangeQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'изменение для сводки'
+        verbose_name_plural = 'изменения для сводки'
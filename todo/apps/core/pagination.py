@@ -0,0 +1,80 @@
+import base64
+import json
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Pages a queryset newest first by ``(key, pk)``.
+
+    Each page continues from an opaque cursor holding the last row's key
+    instead of an OFFSET, so with an index on ``(..., key, id)`` every page
+    costs the same however deep it is, and no COUNT(*) is needed.
+    """
+
+    def __init__(self, queryset, per_page, key='updated_at'):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.key = key
+
+    @staticmethod
+    def encode_cursor(value, pk):
+        raw = json.dumps([value.isoformat() if value is not None else None, pk])
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return (parse_datetime(value) if value is not None else None), int(pk)
+        except (TypeError, ValueError):
+            return None
+
+    def _after(self, value, pk):
+        key = self.key
+        # DESC puts NULL keys first where NULL sorts as the largest value (PostgreSQL), last otherwise.
+        nulls_first = connections[self.queryset.db].features.nulls_order_largest
+        if value is None:
+            after = Q(**{f'{key}__isnull': True, 'pk__lt': pk})
+            return after | Q(**{f'{key}__isnull': False}) if nulls_first else after
+        # The ``key <= value`` bound lets the index range scan start at the cursor.
+        after = Q(**{f'{key}__lte': value}) & (Q(**{f'{key}__lt': value}) | Q(pk__lt=pk))
+        return after if nulls_first else after | Q(**{f'{key}__isnull': True})
+
+    def _page_queryset(self, cursor):
+        queryset = self.queryset.order_by(f'-{self.key}', '-pk')
+        position = self.decode_cursor(cursor) if cursor else None
+        if position is not None:
+            queryset = queryset.filter(self._after(*position))
+        return queryset[:self.per_page + 1]
+
+    def _page(self, rows):
+        next_cursor = None
+        if len(rows) > self.per_page:
+            rows = rows[:self.per_page]
+            next_cursor = self.encode_cursor(getattr(rows[-1], self.key), rows[-1].pk)
+        return KeysetPage(rows, next_cursor)
+
+    def get_page(self, cursor=None):
+        return self._page(list(self._page_queryset(cursor)))
+
+    async def aget_page(self, cursor=None):
+        return self._page([row async for row in self._page_queryset(cursor).aiterator()])
@@ -0,0 +1,288 @@
+"""
+Full-text search over reports, tasks, items, projects and clients.
+
+Every indexed object has a ``SearchDocument`` with its title, body and
+owner, written on save by the receivers in ``signals``. The documents are
+matched by the database's own full-text index, created by ``install``
+after ``migrate``:
+
+* SQLite: the FTS5 table ``core_searchdocument_fts`` holding the words
+  reduced to their stems by the Snowball Russian stemmer, ranked by bm25;
+* PostgreSQL: a generated ``tsvector`` column with the ``russian``
+  configuration and a GIN index, ranked by ``ts_rank``.
+
+Every word of a query must match; the last one is a prefix, so that the
+admin autocomplete finds "Заказчик" while it is still typed as "заказ".
+Bulk writes bypass the receivers: ``reindex`` a queryset after them, or
+run the ``rebuild_search_index`` command.
+"""
+import re
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import NotSupportedError, connections, router
+from django.db.models.expressions import RawSQL
+from django.urls import reverse
+
+from todo.apps.core import models
+
+FTS_TABLE = 'core_searchdocument_fts'
+# bm25 weights of the title and body columns in SQLite; PostgreSQL ranks them as weights A and B.
+TITLE_WEIGHT, BODY_WEIGHT = 10.0, 1.0
+WORD_RE = re.compile(r'\w+')
+COLUMNS = 'd.id, d.content_type_id, d.object_id, d.owner_id, d.title, d.body'
+
+_local = threading.local()
+
+
+@dataclass(frozen=True)
+class Indexed:
+    document: Callable  # instance -> (title, body, owner id)
+    url: Callable  # object id -> URL of the object
+    select_related: tuple = ()
+    # Foreign keys whose titles go into the document: saving the related object re-indexes this one.
+    follows: tuple = ()
+
+
+def _join(*parts):
+    return '\n'.join(part for part in parts if part)
+
+
+def _admin_url(name):
+    return lambda pk: reverse(f'admin:core_{name}_change', args=[pk])
+
+
+INDEXES = {
+    models.Report: Indexed(
+        document=lambda report: (report.theme, _join(report.content, report.answer), report.creator_id),
+        url=lambda pk: f'{reverse("report-detail")}?id={pk}',
+    ),
+    models.Task: Indexed(
+        document=lambda task: (task.job.title, _join(task.project and task.project.title, task.extra),
+                               task.executor_id),
+        url=lambda pk: reverse('task-detail', kwargs={'uuid': pk}),
+        select_related=('job', 'project'),
+        follows=('job', 'project'),
+    ),
+    models.Item: Indexed(
+        document=lambda item: (item.title, _join(item.project and item.project.title, item.note), None),
+        url=_admin_url('item'),
+        select_related=('project',),
+        follows=('project',),
+    ),
+    models.Project: Indexed(
+        document=lambda project: (project.title, _join(project.client.title, project.location), None),
+        url=_admin_url('project'),
+        select_related=('client',),
+        follows=('client',),
+    ),
+    models.Client: Indexed(
+        document=lambda client: (client.title, '', None),
+        url=_admin_url('client'),
+    ),
+}
+
+
+@lru_cache(maxsize=100_000)
+def stem_word(word):
+    # Texts keep repeating the same words, and without PyStemmer stemming one takes ~50 µs.
+    if not hasattr(_local, 'stemmer'):
+        import snowballstemmer
+
+        # Stemmers keep state between calls, so every thread gets its own.
+        _local.stemmer = snowballstemmer.stemmer('russian')
+    return _local.stemmer.stemWord(word)
+
+
+def stem(text):
+    """``text`` as space-separated Snowball stems, the form stored in the SQLite index."""
+    return ' '.join(map(stem_word, words(text)))
+
+
+def words(text):
+    return WORD_RE.findall((text or '').lower().replace('ё', 'е'))
+
+
+def _vendor(using):
+    return connections[using].vendor
+
+
+def install(using='default', **kwargs):
+    """Creates the full-text index of ``SearchDocument``; a ``post_migrate`` receiver."""
+    connection = connections[using]
+    if models.SearchDocument._meta.db_table not in connection.introspection.table_names():
+        return  # migrated to a state before the search index
+    if connection.vendor == 'sqlite':
+        statements = [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5(title, body, tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')",
+            # Deleting a document, by a receiver or in a cascade, drops its row in the index.
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON core_searchdocument "
+            f"BEGIN DELETE FROM {FTS_TABLE} WHERE rowid = old.id; END",
+        ]
+    elif connection.vendor == 'postgresql':
+        statements = [
+            "ALTER TABLE core_searchdocument ADD COLUMN IF NOT EXISTS vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('russian', title), 'A') || setweight(to_tsvector('russian', body), 'B')"
+            ") STORED",
+            "CREATE INDEX IF NOT EXISTS core_searchdocument_vector_idx ON core_searchdocument USING gin (vector)",
+        ]
+    else:
+        return
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def index_objects(model, objects):
+    """Creates or refreshes the documents of the loaded ``objects``, all instances of ``model``."""
+    if not objects:
+        return
+    indexed = INDEXES[model]
+    content_type = ContentType.objects.get_for_model(model)
+    documents = []
+    for obj in objects:
+        title, body, owner_id = indexed.document(obj)
+        documents.append(models.SearchDocument(content_type=content_type, object_id=obj.pk, owner_id=owner_id,
+                                               title=title[:255], body=body))
+    using = router.db_for_write(models.SearchDocument)
+    models.SearchDocument.objects.using(using).bulk_create(
+        documents, update_conflicts=True, unique_fields=('content_type', 'object_id'),
+        update_fields=('owner', 'title', 'body'),
+    )
+    if _vendor(using) != 'sqlite':
+        return
+
+    ids = dict(models.SearchDocument.objects.using(using)
+               .filter(content_type=content_type, object_id__in=[obj.pk for obj in objects])
+               .values_list('object_id', 'id'))
+    rows = [(ids[document.object_id], stem(document.title), stem(document.body)) for document in documents]
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({", ".join(["%s"] * len(rows))})',
+                       [row[0] for row in rows])
+        cursor.executemany(f'INSERT INTO {FTS_TABLE} (rowid, title, body) VALUES (%s, %s, %s)', rows)
+
+
+def index(instance):
+    index_objects(type(instance), [instance])
+
+
+def unindex(instance):
+    models.SearchDocument.objects.filter(
+        content_type=ContentType.objects.get_for_model(type(instance)), object_id=instance.pk,
+    ).delete()
+
+
+def reindex(queryset, batch_size=2000):
+    """Refreshes the documents of every object of ``queryset``, ``batch_size`` objects per write."""
+    queryset = queryset.select_related(*INDEXES[queryset.model].select_related).order_by('pk')
+    count, batch = 0, []
+    while batch := list(queryset.filter(pk__gt=batch[-1].pk)[:batch_size] if batch else queryset[:batch_size]):
+        index_objects(queryset.model, batch)
+        count += len(batch)
+    return count
+
+
+def dependents(instance):
+    """Querysets of the indexed objects whose documents include ``instance``'s text."""
+    for model, indexed in INDEXES.items():
+        for field in indexed.follows:
+            if model._meta.get_field(field).related_model is type(instance):
+                yield model.objects.filter(**{field: instance})
+
+
+def followed_models():
+    return {model._meta.get_field(field).related_model for model, indexed in INDEXES.items()
+            for field in indexed.follows}
+
+
+def rebuild(log=print):
+    """Drops every document and indexes all the objects again."""
+    using = router.db_for_write(models.SearchDocument)
+    models.SearchDocument.objects.using(using).all().delete()
+    counts = {}
+    for model in INDEXES:
+        counts[model._meta.verbose_name_plural] = reindex(model.objects.using(using))
+        log(f'{model._meta.verbose_name_plural}: {counts[model._meta.verbose_name_plural]}')
+    if _vendor(using) == 'sqlite':
+        with connections[using].cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return counts
+
+
+def _fts_query(query):
+    """The stems of ``query`` as an FTS5 query, the last one as a prefix; None when there is nothing to search."""
+    stems = [f'"{word}"' for word in stem(query).split()]
+    return ' '.join(stems) + '*' if stems else None
+
+
+def _ts_query(query):
+    terms = words(query)
+    return ' & '.join(terms) + ':*' if terms else None
+
+
+def matching_ids(model, query, using='default'):
+    """
+    An expression for ``pk__in`` selecting the objects of ``model`` that match ``query``,
+    or None when the query has no words.
+    """
+    content_type = ContentType.objects.get_for_model(model)
+    vendor = _vendor(using)
+    if vendor == 'sqlite':
+        match = _fts_query(query)
+        return match and RawSQL(
+            f'SELECT d.object_id FROM {FTS_TABLE} f JOIN core_searchdocument d ON d.id = f.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s AND d.content_type_id = %s', [match, content_type.pk],
+        )
+    if vendor == 'postgresql':
+        match = _ts_query(query)
+        return match and RawSQL(
+            "SELECT object_id FROM core_searchdocument WHERE content_type_id = %s "
+            "AND vector @@ to_tsquery('russian', %s)", [content_type.pk, match],
+        )
+    raise NotSupportedError(f'Полнотекстовый поиск не поддерживается для {vendor}')
+
+
+def search(query, owner=None, restrict_to=None, limit=20, using=None):
+    """
+    The documents matching ``query``, best first, each with a ``score``.
+
+    ``owner`` limits the results to the documents of that user, ``restrict_to``
+    to the given indexed models.
+    """
+    conditions, params = [], []
+    if owner is not None:
+        conditions.append('d.owner_id = %s')
+        params.append(owner.pk)
+    if restrict_to:
+        content_types = ContentType.objects.get_for_models(*restrict_to).values()
+        conditions.append(f'd.content_type_id IN ({", ".join(["%s"] * len(content_types))})')
+        params += [content_type.pk for content_type in content_types]
+    where = ''.join(f' AND {condition}' for condition in conditions)
+
+    using = using or router.db_for_read(models.SearchDocument)
+    vendor = _vendor(using)
+    if vendor == 'sqlite':
+        match = _fts_query(query)
+        sql = (f'SELECT {COLUMNS}, -bm25({FTS_TABLE}, {TITLE_WEIGHT}, {BODY_WEIGHT}) AS score '
+               f'FROM {FTS_TABLE} f JOIN core_searchdocument d ON d.id = f.rowid '
+               f'WHERE {FTS_TABLE} MATCH %s{where} ORDER BY score DESC LIMIT %s')
+    elif vendor == 'postgresql':
+        match = _ts_query(query)
+        sql = (f"SELECT {COLUMNS}, ts_rank(d.vector, q) AS score "
+               f"FROM core_searchdocument d, to_tsquery('russian', %s) q "
+               f"WHERE d.vector @@ q{where} ORDER BY score DESC LIMIT %s")
+    else:
+        raise NotSupportedError(f'Полнотекстовый поиск не поддерживается для {vendor}')
+
+    if match is None:
+        return []
+    return list(models.SearchDocument.objects.using(using).raw(sql, [match, *params, limit]))
+
+
+def url_for(document):
+    model = ContentType.objects.get_for_id(document.content_type_id).model_class()
+    return INDEXES[model].url(document.object_id)
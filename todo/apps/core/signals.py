@@ -0,0 +1,98 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from mptt.signals import node_moved
+
+from todo.apps.core import caching, categories, models, search
+from todo.apps.custom_account.models import User
+
+
+def _deletes_projects(origin):
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model in (models.Project, models.Client)
+
+
+@receiver(post_delete, sender=models.Task)
+@receiver(post_delete, sender=models.Item)
+def subtract_from_project_rollup(sender, instance, origin=None, **kwargs):
+    # The project goes away together with its rows, there is nothing to keep in sync.
+    if _deletes_projects(origin):
+        return
+    state = instance.get_loaded_state()
+    project_id, total = state.get('project_id'), state.get('total')
+    if project_id and total:
+        models.Project.objects.filter(pk=project_id).add_to_totals(sender.rollup_field, -total)
+
+
+@receiver(post_delete, sender=models.Task)
+def invalidate_task_calendar(sender, instance, using, **kwargs):
+    caching.invalidate_tasks([(instance.executor_id, instance.expired_at)], using=using)
+
+
+@receiver(post_delete, sender=models.Task)
+@receiver(post_delete, sender=models.Item)
+def log_deleted_for_analytics(sender, instance, **kwargs):
+    moment = instance.expired_at if sender is models.Task else instance.created_at
+    models.AnalyticsChange.objects.using(instance._state.db).log([moment])
+
+
+@receiver(post_save, sender=models.Project)
+@receiver(post_save, sender=models.Job)
+def log_regrouped_for_analytics(sender, instance, created=False, raw=False, **kwargs):
+    # A project may have moved to another client, a job to another category: every month
+    # with its rows is summarized again.
+    if raw or created:
+        return
+    changes = models.AnalyticsChange.objects.using(instance._state.db)
+    tasks = models.Task.objects.filter(**{sender._meta.model_name: instance})
+    changes.log(tasks.datetimes('expired_at', 'month'))
+    if sender is models.Project:
+        changes.log(models.Item.objects.filter(project=instance).datetimes('created_at', 'month'))
+
+
+@receiver(post_save, sender=models.Category)
+@receiver(post_delete, sender=models.Category)
+@receiver(node_moved, sender=models.Category)
+def invalidate_category_tree(sender, **kwargs):
+    categories.invalidate_category_paths()
+
+
+@receiver(post_delete, sender=models.Report)
+def count_deleted_report(sender, instance, **kwargs):
+    if instance.is_answered is False:
+        caching.adjust_unanswered_reports(-1, using=instance._state.db)
+
+
+@receiver(post_delete, sender=models.Vacation)
+def invalidate_vacation_dashboard(sender, instance, **kwargs):
+    caching.invalidate_dashboards([instance.user_id], using=instance._state.db)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_dashboard(sender, instance, **kwargs):
+    caching.invalidate_dashboards([instance.pk], using=instance._state.db)
+
+
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index(instance)
+
+
+def update_dependent_search_documents(sender, instance, created=False, raw=False, **kwargs):
+    # The documents that include the title of the saved object, e.g. the items of a renamed project;
+    # the loaded state still holds the title from before the save.
+    if raw or created or instance.get_loaded_state().get('title') == instance.title:
+        return
+    for queryset in search.dependents(instance):
+        search.reindex(queryset)
+
+
+def remove_from_search_index(sender, instance, **kwargs):
+    search.unindex(instance)
+
+
+for _model in search.INDEXES:
+    post_save.connect(update_search_index, sender=_model)
+    post_delete.connect(remove_from_search_index, sender=_model)
+for _model in search.followed_models():
+    post_save.connect(update_dependent_search_documents, sender=_model)
@@ -0,0 +1,188 @@
+"""
+Synthetic data for benchmarks and manual load testing, see the
+``generate_data`` management command.
+
+Everything is written with ``bulk_create`` in batches and generated lazily,
+so even the largest scales keep a flat memory profile. The category tree is
+laid out as nested sets in Python and inserted level by level, instead of
+one ``MPTTModel.save()`` (and one tree update) per node.
+"""
+import random
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Max
+from django.utils.timezone import now
+
+from todo.apps.core import categories, models
+from todo.apps.custom_account.models import User
+
+STATUSES = [status for status, _ in models.Task.STATUS_CHOICES]
+PROJECT_STATUSES = ('new', 'active', 'done')
+VACATION_STATUSES = [status for status, _ in models.Vacation.STATUS_CHOICES]
+UNITS = ('шт', 'м2', 'м', 'ч')
+
+
+@dataclass
+class Scale:
+    users: int = 50
+    clients: int = 100
+    projects: int = 10_000
+    tasks: int = 1_000_000
+    items_per_project: int = 3
+    category_depth: int = 5
+    category_fanout: int = 3
+    jobs_per_category: int = 2
+    reports_per_user: int = 20
+    vacations_per_user: int = 4
+
+
+SCALES = {
+    'tiny': Scale(users=3, clients=2, projects=5, tasks=50, category_depth=2, category_fanout=2,
+                  reports_per_user=3, vacations_per_user=2),
+    'small': Scale(users=20, clients=10, projects=500, tasks=20_000),
+    'medium': Scale(users=50, clients=50, projects=2_000, tasks=200_000),
+    'large': Scale(),
+}
+
+
+def batched(objects, size):
+    objects = iter(objects)
+    while batch := list(islice(objects, size)):
+        yield batch
+
+
+def bulk_insert(model, objects, batch_size):
+    count = 0
+    for batch in batched(objects, batch_size):
+        model.objects.bulk_create(batch)
+        count += len(batch)
+    return count
+
+
+def category_tree(depth, fanout, first_tree_id):
+    """
+    ``(level, index of the parent in the previous level, node)`` for a full tree per root,
+    with lft/rght computed in a depth-first walk.
+    """
+    levels = [[] for _ in range(depth)]
+
+    def walk(level, parent_index, tree_id, lft, path):
+        node = models.Category(title=f'Категория {path}', tree_id=tree_id, level=level, lft=lft)
+        levels[level].append((parent_index, node))
+        index = len(levels[level]) - 1
+        right = lft + 1
+        if level + 1 < depth:
+            for child in range(fanout):
+                right = walk(level + 1, index, tree_id, right, f'{path}.{child + 1}') + 1
+        node.rght = right
+        return right
+
+    for root in range(fanout):
+        walk(0, None, first_tree_id + root, 1, str(root + 1))
+    return levels
+
+
+def generate_categories(scale, batch_size):
+    first_tree_id = (models.Category.objects.aggregate(max=Max('tree_id'))['max'] or 0) + 1
+    created = []
+    previous = []
+    for level in category_tree(scale.category_depth, scale.category_fanout, first_tree_id):
+        for parent_index, node in level:
+            if parent_index is not None:
+                node.parent = previous[parent_index]
+        previous = [node for _, node in level]
+        for batch in batched(previous, batch_size):
+            models.Category.objects.bulk_create(batch)
+        created += previous
+    categories.invalidate_category_paths()
+    return created
+
+
+def generate(scale, batch_size=5000, seed=0, log=print):
+    """Adds ``scale`` worth of data to the database and returns the created row counts."""
+    rnd = random.Random(seed)
+    today = now()
+    counts = {}
+
+    with transaction.atomic():
+        offset = User.objects.count()
+        password = make_password(None)
+        counts['users'] = bulk_insert(User, (
+            User(email=f'user{offset + i}@synthetic.example', password=password, first_name=f'Сотрудник {i}',
+                 position=rnd.choice(('Мастер', 'Прораб', 'Отделочник')))
+            for i in range(scale.users)
+        ), batch_size)
+        users = list(User.objects.order_by('-pk').values_list('pk', flat=True)[:scale.users])
+        log(f'Пользователи: {counts["users"]}')
+
+        nodes = generate_categories(scale, batch_size)
+        leaves = [node for node in nodes if node.level == scale.category_depth - 1]
+        counts['categories'] = len(nodes)
+        counts['jobs'] = bulk_insert(models.Job, (
+            models.Job(category=leaf, title=f'Работа {j + 1}', type=rnd.choice(UNITS),
+                       price=Decimal(rnd.randrange(100, 10_000)))
+            for leaf in leaves for j in range(scale.jobs_per_category)
+        ), batch_size)
+        jobs = list(models.Job.objects.order_by('-pk').values_list('pk', 'price')[:counts['jobs']])
+        log(f'Категории: {counts["categories"]}, работы: {counts["jobs"]}')
+
+        counts['clients'] = bulk_insert(models.Client, (
+            models.Client(title=f'Заказчик {i + 1}') for i in range(scale.clients)
+        ), batch_size)
+        clients = list(models.Client.objects.order_by('-pk').values_list('pk', flat=True)[:scale.clients])
+        counts['projects'] = bulk_insert(models.Project, (
+            models.Project(title=f'Проект {i + 1}', client_id=rnd.choice(clients), location=f'Участок {i + 1}',
+                           status=rnd.choice(PROJECT_STATUSES), price=Decimal(rnd.randrange(0, 1_000_000)))
+            for i in range(scale.projects)
+        ), batch_size)
+        projects = sorted(models.Project.objects.order_by('-pk').values_list('pk', flat=True)[:scale.projects])
+        log(f'Заказчики: {counts["clients"]}, проекты: {counts["projects"]}')
+
+        def tasks():
+            # Tasks come grouped by project, so every batch refreshes the totals of few projects.
+            for i in range(scale.tasks):
+                job, job_price = rnd.choice(jobs)
+                quantity = rnd.randrange(1, 20)
+                coefficient = Decimal(rnd.choice(('1.0', '1.2', '1.5')))
+                yield models.Task(
+                    project_id=projects[i * len(projects) // scale.tasks], job_id=job, quantity=quantity,
+                    coefficient=coefficient, total=models.Task.calculate_total(job_price, quantity, coefficient),
+                    expired_at=today + timedelta(days=rnd.randrange(-365, 365), hours=rnd.randrange(24)),
+                    status=rnd.choice(STATUSES), executor_id=rnd.choice(users),
+                )
+        counts['tasks'] = bulk_insert(models.Task, tasks(), batch_size)
+
+        def items():
+            for project in projects:
+                for i in range(scale.items_per_project):
+                    quantity, price = rnd.randrange(1, 50), Decimal(rnd.randrange(10, 5000))
+                    yield models.Item(project_id=project, title=f'Материал {i + 1}', quantity=quantity,
+                                      price=price, total=quantity * price)
+        counts['items'] = bulk_insert(models.Item, items(), batch_size)
+        log(f'Задачи: {counts["tasks"]}, позиции сметы: {counts["items"]}')
+
+        counts['reports'] = bulk_insert(models.Report, (
+            models.Report(creator_id=user, theme=f'Сообщение {i + 1}', content='Текст сообщения',
+                          answer='Ответ' if i % 2 else None, is_answered=bool(i % 2),
+                          updated_at=today - timedelta(hours=rnd.randrange(24 * 365)))
+            for user in users for i in range(scale.reports_per_user)
+        ), batch_size)
+
+        def vacations():
+            for user in users:
+                start = (today - timedelta(days=365)).date()
+                for _ in range(scale.vacations_per_user):
+                    start += timedelta(days=rnd.randrange(30, 90))
+                    end = start + timedelta(days=rnd.randrange(3, 21))
+                    yield models.Vacation(user_id=user, start_date=start, end_date=end,
+                                          status=rnd.choice(VACATION_STATUSES))
+                    start = end
+        counts['vacations'] = bulk_insert(models.Vacation, vacations(), batch_size)
+        log(f'Сообщения: {counts["reports"]}, отпуска: {counts["vacations"]}')
+
+    return counts
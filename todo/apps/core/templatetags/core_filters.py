@@ -15,5 +15,5 @@ def get_count(dictionary, key):
 
 
 @register.filter
-def days_left(d):
-    return (d - now().date()).days
+def days_left(d, today=None):
+    return (d - (today or now().date())).days
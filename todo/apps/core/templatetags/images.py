@@ -0,0 +1,24 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from todo import staticfiles
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(path, sizes='100vw', css_class='', alt='', style='', loading='lazy'):
+    """
+    Renders ``<picture>`` for a static image, with its WEBP variants in ``srcset``.
+
+    Images without variants (see ``STATIC_IMAGE_VARIANTS``) get a plain ``<img>``.
+    """
+    img = format_html('<img src="{}" class="{}" alt="{}" style="{}" loading="{}" decoding="async">',
+                      static(path), css_class, alt, style, loading)
+    variants = staticfiles.variants(path)
+    if not variants:
+        return img
+    srcset = ', '.join(f'{static(name)} {width}w' for width, name in variants)
+    return format_html('<picture><source type="image/webp" srcset="{}" sizes="{}">{}</picture>',
+                       srcset, sizes, img)
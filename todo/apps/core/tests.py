@@ -1,8 +1,69 @@
-from django.test import TestCase, Client
+import csv
+import fcntl
+import os
+import re
+import tempfile
+import zipfile
+from datetime import date, datetime, timedelta
+from importlib.util import find_spec
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-from django.urls import reverse
-from todo.apps.core import models
+from PIL import Image
+
+from django.conf import settings
+from django.contrib.admin import site
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.exceptions import ValidationError
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import F
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from django.urls import get_script_prefix, reverse, set_script_prefix
+from django.utils.timezone import localdate, make_aware, now
+
+from todo.apps.core import (analytics, async_views, caching, categories, forms, heatmap, importers, jobs, models, search,
+                            synthetic, views, workload)
+from todo.apps.core.availability import Availability
+from todo.apps.core.admin import ExpiredListFilter, ItemAdmin, TaskAdmin
+from todo.apps.core.pagination import KeysetPaginator
+from todo import metrics, staticfiles
+from todo.apps.custom_account import avatars, views as account_views
 from todo.apps.custom_account.models import User
+from todo.apps.core.templatetags.images import picture
+from todo.apps.custom_account.templatetags.avatars import avatar
+from todo.db.locks import database_lock
+from todo.db.routers import ReplicaRouter, primary_reads, use_replica
+
+
+class TaskFixtures:
+    """
+    The category and the job the tasks of a test are made of. ``task_defaults``
+    holds the fields a test class wants on every task it creates.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.category = models.Category.objects.create(title='Отделка')
+        self.job = models.Job.objects.create(category=self.category, title='Покраска', type='м2', price=100)
+        self.task_defaults = {}
+
+    def create_project(self, client=None, **kwargs):
+        if client is None:
+            client = models.Client.objects.get_or_create(title='Заказчик')[0]
+        fields = {'title': 'Дом', 'location': 'Город', 'status': 'new', 'price': 0, **kwargs}
+        return models.Project.objects.create(client=client, **fields)
+
+    def create_task(self, expired_at=None, **kwargs):
+        fields = {'job': self.job, 'quantity': 1, 'expired_at': now(), **self.task_defaults, **kwargs}
+        if expired_at is not None:
+            fields['expired_at'] = expired_at
+        return models.Task.objects.create(**fields)
 
 
 class TestViews(TestCase):
@@ -49,3 +110,1330 @@ class TestViews(TestCase):
 
         self.assertEquals(response.status_code, 302)
         self.assertEquals(models.Report.objects.first().theme, 'Test theme')
+
+    def test_sent_report_is_listed_from_primary(self):
+        self.client.post(self.send_report_url, {'theme': 'Test theme', 'content': 'Test content'})
+        databases = []
+        db_for_read = ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            databases.append(db_for_read(router, model, **hints))
+            return None  # the test database has no replica
+
+        with self.settings(DATABASES={**settings.DATABASES, 'replica': {}}), \
+                mock.patch.object(ReplicaRouter, 'db_for_read', record):
+            self.assertContains(self.client.get(self.report_list_url), 'Test theme')
+            self.assertNotIn('replica', databases)
+            self.client.get(self.report_list_url)
+            self.assertIn('replica', databases)
+
+
+
+class TestProjectRollups(TaskFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(email='test@example.com', password='12345')
+        self.project = self.create_project(price=1000)
+        self.other_project = self.create_project(title='Баня')
+        self.task_defaults = {'project': self.project, 'quantity': 2}
+
+    def assertTotals(self, project, tasks_total, items_total):
+        project.refresh_from_db()
+        self.assertEqual(project.tasks_total, tasks_total)
+        self.assertEqual(project.items_total, items_total)
+
+    def test_save_and_delete_update_totals(self):
+        task = self.create_task()
+        item = models.Item.objects.create(project=self.project, title='Краска', quantity=3, price=50)
+        self.assertTotals(self.project, 200, 150)
+
+        task.quantity = 5
+        task.save()
+        self.assertTotals(self.project, 500, 150)
+
+        item.delete()
+        self.assertTotals(self.project, 500, 0)
+        self.assertEqual(self.project.get_total(), '1500 руб')
+        self.assertEqual(self.project.get_total_amount(), 1500)
+        self.assertEqual(list(models.Project.objects.with_grand_total().order_by('-grand_total')
+                              .values_list('grand_total', flat=True)), [1500, 0])
+
+    def test_reassign_task_to_other_project(self):
+        task = self.create_task()
+        task.project = self.other_project
+        task.save()
+
+        self.assertTotals(self.project, 0, 0)
+        self.assertTotals(self.other_project, 200, 0)
+
+    def test_bulk_update_refreshes_totals(self):
+        self.create_task(expired_at=now() - timedelta(days=1))
+        self.create_task(expired_at=now() + timedelta(days=1))
+
+        request = RequestFactory().post('/')
+        request._messages = CookieStorage(request)
+        TaskAdmin(models.Task, site).close_expired_tasks(request, models.Task.objects.all())
+        self.assertTotals(self.project, 200, 0)
+
+    def test_rebuild_command_reports_and_fixes_drift(self):
+        self.create_task()
+        models.Project.objects.filter(pk=self.project.pk).update(tasks_total=0)
+
+        out = StringIO()
+        call_command('rebuild_project_totals', '--check', stdout=out)
+        self.assertIn(f'Проект №{self.project.pk}', out.getvalue())
+        self.assertTotals(self.project, 0, 0)
+
+        call_command('rebuild_project_totals', stdout=StringIO())
+        self.assertTotals(self.project, 200, 0)
+        self.assertFalse(models.Project.objects.with_drift().exists())
+
+
+class TestAdminChangelists(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email='admin@example.com', password='12345')
+        self.client.login(email='admin@example.com', password='12345')
+        self.customer = models.Client.objects.create(title='Заказчик')
+
+    def create_rows(self, count):
+        start = models.Project.objects.count()
+        for i in range(start, start + count):
+            project = models.Project.objects.create(title=f'Проект {i}', client=self.customer, location='Город',
+                                                    status='new', price=100)
+            category = models.Category.objects.create(title=f'Категория {i}')
+            job = models.Job.objects.create(category=category, title=f'Работа {i}', type='шт', price=10)
+            executor = User.objects.create(email=f'executor{i}@example.com')
+            models.Task.objects.create(project=project, job=job, quantity=1, expired_at=now(), executor=executor)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, url, budget):
+        self.create_rows(2)
+        few = self.count_queries(url)
+        self.create_rows(20)
+        many = self.count_queries(url)
+        self.assertEqual(few, many)
+        self.assertLessEqual(many, budget)
+
+    def test_project_changelist(self):
+        self.assertConstantQueries(reverse('admin:core_project_changelist'), 8)
+
+    def test_task_changelist(self):
+        self.assertConstantQueries(reverse('admin:core_task_changelist'), 8)
+
+    def test_project_changelist_total_column(self):
+        self.create_rows(1)
+        response = self.client.get(reverse('admin:core_project_changelist'))
+        self.assertContains(response, '110 руб')
+
+
+class TestTaskCalendar(TaskFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(email='test@example.com', password='12345')
+        self.client.login(email='test@example.com', password='12345')
+        self.task_defaults = {'executor': self.user}
+        self.url = reverse('get-tasks')
+        cache.clear()
+
+    def get_month(self, year, month):
+        return self.client.get(self.url, {'year': year, 'month': month})
+
+    def test_month_range(self):
+        self.create_task(make_aware(datetime(2024, 3, 31, 23, 0)))
+        self.create_task(make_aware(datetime(2024, 4, 1)))
+        self.create_task(make_aware(datetime(2024, 12, 31)))
+
+        self.assertContains(self.get_month(2024, 3), 'Покраска', count=1)
+        self.assertContains(self.get_month(2024, 12), 'Покраска', count=1)
+
+    def test_cached_month_is_served_without_queries(self):
+        self.create_task(make_aware(datetime(2024, 3, 10)))
+        self.get_month(2024, 3)
+        with self.assertNumQueries(2):  # session and user lookups only
+            response = self.get_month(2024, 3)
+        self.assertContains(response, 'Покраска', count=1)
+
+    def test_task_changes_invalidate_month(self):
+        task = self.create_task(make_aware(datetime(2024, 3, 10)))
+        self.get_month(2024, 3)
+
+        task.expired_at = make_aware(datetime(2024, 4, 10))
+        with self.captureOnCommitCallbacks(execute=True):
+            task.save()
+        self.assertNotContains(self.get_month(2024, 3), 'Покраска')
+        self.assertContains(self.get_month(2024, 4), 'Покраска', count=1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            models.Task.objects.filter(pk=task.pk).update(status='completed')
+        self.assertContains(self.get_month(2024, 4), 'Завершена')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task.delete()
+        self.assertNotContains(self.get_month(2024, 4), 'Покраска')
+
+    def test_context_is_precomputed_per_day(self):
+        task = self.create_task(make_aware(datetime(2024, 2, 29, 12)))
+        self.create_task(make_aware(datetime(2024, 2, 29, 15)))
+        params = views.calendar_params(RequestFactory().get('/', {'year': 2024, 'month': 2}))
+        context = views.calendar_context(params, views.calendar_tasks(self.user, 2024, 2))
+
+        self.assertEqual(len(context['days']), 29)
+        self.assertEqual(context['weeks'][0][:3], [None, None, None])
+        leap_day = context['weeks'][-1][3]
+        self.assertIs(leap_day, context['days'][-1])
+        self.assertEqual(leap_day['count'], 2)
+        self.assertEqual(leap_day['tasks'][0], {'title': 'Покраска', 'status': 'Создана',
+                                                'url': task.get_absolute_url()})
+
+    def test_url_template_matches_absolute_url(self):
+        task = self.create_task(make_aware(datetime(2024, 2, 29, 12)))
+        self.assertEqual(views.url_template('task-detail', 'uuid').format(task.pk), task.get_absolute_url())
+        self.addCleanup(set_script_prefix, get_script_prefix())
+        set_script_prefix('/9876543210/')
+        self.assertEqual(views.url_template('task-detail', 'uuid').format(10), '/9876543210/tasks/10/')
+
+    @skipUnless(find_spec('jinja2'), 'Jinja2 is not installed')
+    def test_jinja2_fragments_match_django_templates(self):
+        jinja2 = {'BACKEND': 'django.template.backends.jinja2.Jinja2', 'DIRS': [settings.BASE_DIR / 'jinja2'],
+                  'OPTIONS': {'environment': 'todo.jinja2.environment'}}
+        self.create_task(make_aware(datetime(2024, 3, 10)))
+        for i in range(30):
+            models.Report.objects.create(creator=self.user, theme=f'Тема <{i}>', content='Текст ' * 30,
+                                         answer='Ответ' if i % 2 else '')
+        cursor = KeysetPaginator(models.Report.objects.filter(creator=self.user), 25).get_page(None).next_cursor
+
+        with self.settings(TEMPLATES=[*settings.TEMPLATES, jinja2]):
+            for url, params in ((self.url, {'year': 2024, 'month': 3}),
+                                (reverse('reports'), {'cursor': cursor})):
+                cache.clear()
+                expected = self.client.get(url, params, HTTP_HX_REQUEST='true').content.decode()
+                cache.clear()
+                with self.settings(FRAGMENT_TEMPLATE_ENGINE='jinja2'):
+                    response = self.client.get(url, params, HTTP_HX_REQUEST='true')
+                self.assertEqual(response.templates, [])
+                self.assertHTMLEqual(response.content.decode(), expected)
+
+
+class TestTaskHeatmap(TaskFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(email='test@example.com', password='12345')
+        self.other = User.objects.create_user(email='other@example.com', password='12345')
+        self.client.login(email='test@example.com', password='12345')
+        self.task_defaults = {'executor': self.user}
+        self.url = reverse('task-heatmap')
+        cache.clear()
+
+    def test_counts_by_day_and_status(self):
+        self.create_task(make_aware(datetime(2024, 3, 10, 9)))
+        self.create_task(make_aware(datetime(2024, 3, 10, 18)), status='completed')
+        self.create_task(make_aware(datetime(2024, 3, 10, 20)), status='completed')
+        self.create_task(make_aware(datetime(2024, 3, 31, 23)))
+        self.create_task(make_aware(datetime(2024, 4, 1)))
+        self.create_task(make_aware(datetime(2024, 3, 10)), executor=self.other)
+
+        response = self.client.get(self.url, {'start': '2024-03-01', 'end': '2024-03-31'})
+        self.assertEqual(response.json()['days'], {
+            '2024-03-10': {'created': 1, 'completed': 2},
+            '2024-03-31': {'created': 1},
+        })
+        self.assertEqual(response.json()['statuses'], ['created', 'processed', 'completed', 'cancelled'])
+
+    def test_past_months_are_cached(self):
+        task = self.create_task(make_aware(datetime(2024, 3, 10)))
+        today = date(2024, 5, 15)
+        expected = {self.user.pk: {date(2024, 3, 10): {'created': 1}}}
+        self.assertEqual(heatmap.task_counts([self.user.pk], date(2024, 1, 1), date(2024, 4, 30), today), expected)
+
+        with self.assertNumQueries(0):
+            counts = heatmap.task_counts([self.user.pk], date(2024, 3, 5), date(2024, 4, 30), today)
+        self.assertEqual(counts, expected)
+        # The current month is always counted, in the same single query as the missing past ones.
+        with self.assertNumQueries(1):
+            heatmap.task_counts([self.user.pk, self.other.pk], date(2024, 1, 1), date(2024, 5, 31), today)
+
+        task.status = 'completed'
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            task.save()
+            # Dropped only on commit, so a concurrent reader can't cache the counts from before the write.
+            self.assertEqual(heatmap.task_counts([self.user.pk], date(2024, 3, 1), date(2024, 3, 31), today),
+                             expected)
+        self.assertTrue(callbacks)
+        self.assertEqual(heatmap.task_counts([self.user.pk], date(2024, 1, 1), date(2024, 4, 30), today),
+                         {self.user.pk: {date(2024, 3, 10): {'completed': 1}}})
+
+    def test_executors(self):
+        self.create_task(make_aware(datetime(2024, 3, 10)))
+        self.create_task(make_aware(datetime(2024, 3, 10)), executor=self.other)
+        params = {'start': '2024-03-01', 'end': '2024-03-31'}
+
+        self.assertEqual(self.client.get(self.url, {**params, 'executor': self.other.pk}).status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(self.url, {**params, 'executor': 'all', 'by': 'executor'})
+        self.assertEqual(response.json()['days'], {'2024-03-10': {'created': 2}})
+        self.assertEqual(response.json()['executors'][str(self.other.pk)], {'2024-03-10': {'created': 1}})
+        self.assertEqual(self.client.get(self.url, {**params, 'executor': 'x'}).status_code, 400)
+
+    def test_invalid_range(self):
+        for params in ({'start': '2024-13-01'}, {'start': '2024-03-01', 'end': '2024-02-01'},
+                       {'start': '2020-01-01', 'end': '2024-01-01'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400, params)
+
+
+class TestTaskImport(TaskFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.executor = User.objects.create(email='executor@example.com')
+        self.project = self.create_project()
+
+    def test_import_prices_rows_and_reports_errors(self):
+        rows = [
+            {'job': self.job.pk, 'quantity': '2', 'coefficient': '1.5', 'expired_at': '2024-03-01 12:00',
+             'project': self.project.pk, 'executor': 'executor@example.com'},
+            {'job': self.job.pk, 'quantity': '3', 'expired_at': '2024-03-01', 'is_fixed_price': True,
+             'price': '10', 'project': self.project.pk},
+            {'job': self.job.pk, 'quantity': 'много', 'expired_at': '2024-03-01'},
+            {'job': 999, 'quantity': '1', 'expired_at': '2024-03-01'},
+            {'job': self.job.pk, 'quantity': '1', 'expired_at': '2024-03-01', 'status': 'unknown'},
+        ]
+        result = importers.import_tasks(rows)
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual([number for number, _ in result.errors], [3, 5, 4])
+        self.assertEqual(sorted(models.Task.objects.values_list('total', flat=True)), [30, 300])
+        self.assertEqual(models.Task.objects.filter(executor=self.executor).count(), 1)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.tasks_total, 330)
+
+    def test_import_reports_negative_quantity(self):
+        rows = [
+            {'job': self.job.pk, 'quantity': '-1', 'expired_at': '2024-03-01'},
+            {'job': self.job.pk, 'quantity': '1', 'expired_at': '2024-03-01'},
+        ]
+        result = importers.import_tasks(rows)
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.errors, [(1, 'количество не может быть отрицательным')])
+
+    def test_import_reports_rows_that_are_not_objects(self):
+        rows = [[self.job.pk, '1', '2024-03-01'], {'job': self.job.pk, 'quantity': '1', 'expired_at': '2024-03-01'}]
+        result = importers.import_tasks(rows)
+
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.errors, [(1, 'строка должна быть объектом')])
+
+    def test_import_command_reads_csv(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as file:
+            file.write(f'job,quantity,expired_at\n{self.job.pk},4,2024-03-01 12:00\n')
+        self.addCleanup(os.remove, file.name)
+
+        out = StringIO()
+        call_command('import_tasks', file.name, stdout=out, stderr=StringIO())
+        self.assertIn('Создано задач: 1', out.getvalue())
+        self.assertEqual(models.Task.objects.get().total, 400)
+
+    def test_import_command_rejects_broken_json(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8') as file:
+            file.write(f'[{{"job": {self.job.pk},')
+        self.addCleanup(os.remove, file.name)
+
+        with self.assertRaisesMessage(CommandError, 'Файл не является JSON'):
+            call_command('import_tasks', file.name, stdout=StringIO(), stderr=StringIO())
+        self.assertFalse(models.Task.objects.exists())
+
+
+class TestExports(TestCase):
+    def setUp(self):
+        User.objects.create_superuser(email='admin@example.com', password='12345')
+        self.client.login(email='admin@example.com', password='12345')
+        customer = models.Client.objects.create(title='Заказчик')
+        self.project = models.Project.objects.create(title='Дом', client=customer, location='Город',
+                                                     status='new', price=100)
+        parent = models.Category.objects.create(title='Отделка')
+        category = models.Category.objects.create(title='Стены', parent=parent)
+        job = models.Job.objects.create(category=category, title='Покраска', type='м2', price=100)
+        models.Task.objects.create(project=self.project, job=job, quantity=2, expired_at=now())
+
+    def test_csv_export(self):
+        response = self.client.get(reverse('export', args=['tasks']))
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(b''.join(response.streaming_content).decode('utf-8-sig').splitlines()))
+        self.assertEqual(rows[0][:4], ['№', 'Проект', 'Заказчик', 'Категория'])
+        self.assertEqual(rows[1][1:5], ['Дом', 'Заказчик', 'Отделка > Стены', 'Покраска'])
+        self.assertEqual(len(rows), 2)
+
+    def test_xlsx_export(self):
+        response = self.client.get(reverse('export', args=['projects']), {'format': 'xlsx'})
+        archive = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn('<t xml:space="preserve">Дом</t>', sheet)
+        self.assertIn('<c><v>300</v></c>', sheet)
+
+    def test_admin_action(self):
+        item = models.Item.objects.create(project=self.project, title='Краска', price=10)
+        response = self.client.post(reverse('admin:core_item_changelist'), {
+            'action': 'export_csv', '_selected_action': [item.pk],
+        })
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('Краска', b''.join(response.streaming_content).decode('utf-8-sig'))
+
+    def test_export_requires_staff(self):
+        User.objects.create_user(email='test@example.com', password='12345')
+        self.client.login(email='test@example.com', password='12345')
+        response = self.client.get(reverse('export', args=['tasks']))
+        self.assertEqual(response.status_code, 302)
+
+
+class TestCategoryTree(TestCase):
+    def setUp(self):
+        User.objects.create_superuser(email='admin@example.com', password='12345')
+        self.client.login(email='admin@example.com', password='12345')
+        cache.clear()
+        self.root = models.Category.objects.create(title='Отделка')
+
+    def create_jobs(self, count):
+        start = models.Job.objects.count()
+        for i in range(start, start + count):
+            category = models.Category.objects.create(title=f'Категория {i}', parent=self.root)
+            models.Job.objects.create(category=category, title=f'Работа {i}', type='шт', price=10)
+
+    def count_queries(self):
+        self.client.get(reverse('admin:core_task_add'))  # warm up the category cache
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:core_task_add'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_paths_are_cached_and_invalidated(self):
+        child = models.Category.objects.create(title='Стены', parent=self.root)
+        self.assertEqual(categories.get_category_paths()[child.pk], 'Отделка > Стены')
+        with self.assertNumQueries(0):
+            categories.get_category_paths()
+
+        self.root.title = 'Ремонт'
+        self.root.save()
+        self.assertEqual(categories.get_category_paths()[child.pk], 'Ремонт > Стены')
+
+    def test_task_form_renders_job_groups_with_constant_queries(self):
+        self.create_jobs(3)
+        few = self.count_queries()
+        self.create_jobs(30)
+        self.assertEqual(self.count_queries(), few)
+
+        response = self.client.get(reverse('admin:core_task_add'))
+        self.assertContains(response, '<optgroup label="Отделка &gt; Категория 5">', html=False)
+
+    def test_category_changelist(self):
+        response = self.client.get(reverse('admin:core_category_changelist'))
+        self.assertContains(response, 'Отделка')
+
+
+class TestReplicaRouter(TestCase):
+    def test_marked_views_read_from_replica(self):
+        router = ReplicaRouter()
+        read = use_replica(lambda: router.db_for_read(models.Task))
+
+        self.assertIsNone(read())
+        with self.settings(DATABASES={**settings.DATABASES, 'replica': {}}):
+            self.assertEqual(read(), 'replica')
+            self.assertIsNone(router.db_for_read(models.Task))
+            self.assertEqual(use_replica(lambda: router.db_for_write(models.Task))(), 'default')
+
+    def test_primary_reads_override_marked_views(self):
+        router = ReplicaRouter()
+
+        def read():
+            with primary_reads():
+                return router.db_for_read(models.Task)
+
+        with self.settings(DATABASES={**settings.DATABASES, 'replica': {}}):
+            self.assertIsNone(use_replica(read)())
+            self.assertEqual(use_replica(lambda: router.db_for_read(models.Task))(), 'replica')
+
+
+class TestSQLiteBackend(TestCase):
+    def test_pragmas_are_applied(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], connection.settings_dict['OPTIONS']['timeout'] * 1000)
+
+
+class TestAsyncViews(TaskFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(email='test@example.com', password='12345')
+        self.create_task(make_aware(datetime(2024, 3, 10)), executor=self.user)
+        self.report = models.Report.objects.create(creator=self.user, theme='Тема', content='Текст')
+        self.factory = AsyncRequestFactory()
+        cache.clear()
+
+    def get(self, path, **params):
+        request = self.factory.get(path, params)
+        request.user = self.user
+        request.session = {}
+        return request
+
+    async def test_get_tasks(self):
+        response = await async_views.get_tasks(self.get('/api/tasks/', year=2024, month=3))
+        self.assertContains(response, 'Покраска', count=1)
+
+    async def test_account(self):
+        response = await async_views.account(self.get('/account/'))
+        self.assertContains(response, 'Задача №')
+
+    async def test_account_rows_survive_an_expired_fragment(self):
+        await models.Vacation.objects.acreate(user=self.user, status='planned', start_date=localdate(),
+                                              end_date=localdate() + timedelta(days=7))
+        await async_views.account(self.get('/account/'))
+        await cache.aclear()
+        response = await async_views.account(self.get('/account/'))
+        self.assertContains(response, 'Задача №')
+        self.assertContains(response, 'Ближайший отпуск')
+
+    async def test_reports(self):
+        response = await async_views.report_list(self.get('/reports/'))
+        self.assertContains(response, 'Тема: Тема')
+
+        response = await async_views.report_detail(self.get('/api/report/', id=self.report.pk))
+        self.assertContains(response, 'Текст')
+
+    async def test_anonymous_is_redirected(self):
+        request = self.factory.get('/account/')
+        request.user = AnonymousUser()
+        response = await async_views.account(request)
+        self.assertEqual(response.status_code, 302)
+
+
+class TestAccountDashboardCache(TaskFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(email='test@example.com', password='12345')
+        self.client.login(email='test@example.com', password='12345')
+        self.url = reverse('account')
+        cache.clear()
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        return response, len(queries)
+
+    def test_dashboard_is_cached_until_tasks_or_vacations_change(self):
+        self.client.get(self.url)
+        response, cached = self.count_queries()
+        self.assertContains(response, 'Информация отсутствует')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task = self.create_task(now() + timedelta(days=3), executor=self.user)
+        response, fresh = self.count_queries()
+        self.assertContains(response, f'Задача №{task.pk}', count=2)
+        self.assertGreater(fresh, cached)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            vacation = models.Vacation.objects.create(user=self.user, start_date=now().date(),
+                                                      end_date=now().date() + timedelta(days=7), status='planned')
+        self.assertContains(self.client.get(self.url), 'Ближайший отпуск')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            vacation.delete()
+        self.assertContains(self.client.get(self.url), 'Информация отсутствует')
+
+    def test_vacation_changes_invalidate_after_commit(self):
+        version = caching.dashboard_version(self.user.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            models.Vacation.objects.create(user=self.user, start_date=now().date(),
+                                           end_date=now().date() + timedelta(days=7), status='planned')
+            self.assertEqual(caching.dashboard_version(self.user.pk), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(caching.dashboard_version(self.user.pk), version)
+
+    def test_other_users_changes_keep_the_cache(self):
+        self.client.get(self.url)
+        other = User.objects.create(email='other@example.com')
+        self.create_task(executor=other)
+        _, cached = self.count_queries()
+        self.assertEqual(cached, 2)  # session and user lookups only
+
+
+class TestReportPagination(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='test@example.com', password='12345')
+        self.client.login(email='test@example.com', password='12345')
+        models.Report.objects.bulk_create([
+            models.Report(creator=self.user, theme=f'Тема {i}', content='Текст',
+                          updated_at=make_aware(datetime(2024, 1, 1 + i // 3)))
+            for i in range(60)
+        ])
+        # Legacy rows saved before updated_at existed.
+        models.Report.objects.filter(pk__in=models.Report.objects.order_by('pk').values('pk')[:4]) \
+            .update(updated_at=None)
+
+    def test_cursor_walks_every_report_once_in_order(self):
+        paginator = KeysetPaginator(models.Report.objects.filter(creator=self.user), 7)
+        seen, cursor = [], None
+        while True:
+            page = paginator.get_page(cursor)
+            seen += page.object_list
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+
+        reports = list(models.Report.objects.all())
+        dated = sorted((r for r in reports if r.updated_at), key=lambda r: (r.updated_at, r.pk), reverse=True)
+        undated = sorted((r for r in reports if not r.updated_at), key=lambda r: r.pk, reverse=True)
+        expected = undated + dated if connection.features.nulls_order_largest else dated + undated
+        self.assertEqual([r.pk for r in seen], [r.pk for r in expected])
+
+    def test_load_more_fragment(self):
+        response = self.client.get(reverse('reports'))
+        cursor = response.context['page_obj'].next_cursor
+        self.assertContains(response, 'Загрузить ещё')
+
+        response = self.client.get(reverse('reports'), {'cursor': cursor}, HTTP_HX_REQUEST='true')
+        self.assertTemplateUsed(response, 'reports/report_list_page.html')
+        self.assertTemplateNotUsed(response, 'reports/report_list.html')
+
+    def test_json_api(self):
+        response = self.client.get(reverse('report-api'))
+        data = response.json()
+        self.assertEqual(len(data['results']), 25)
+        data = self.client.get(reverse('report-api'), {'cursor': data['next']}).json()
+        self.assertEqual(len(data['results']), 25)
+
+        report = models.Report.objects.first()
+        data = self.client.get(reverse('report-detail'), {'id': report.pk, 'format': 'json'}).json()
+        self.assertEqual(data['theme'], report.theme)
+
+
+class TestAvatarRenditions(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.settings_override = override_settings(MEDIA_ROOT=media.name, AVATAR_WORKERS=0)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.user = User.objects.create(email='avatar@example.com')
+
+    def upload(self, color='red'):
+        buffer = BytesIO()
+        Image.new('RGB', (400, 300), color).save(buffer, 'PNG')
+        self.user.avatar = SimpleUploadedFile('me.png', buffer.getvalue(), content_type='image/png')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.user.refresh_from_db()
+
+    def test_upload_builds_renditions_once(self):
+        self.upload()
+        renditions = self.user.avatar_renditions
+        self.assertEqual(renditions['source'], self.user.avatar.name)
+        self.assertEqual(set(renditions['sizes']), {'64', '128', '256'})
+        with Image.open(os.path.join(settings.MEDIA_ROOT, renditions['sizes']['64']['webp'])) as image:
+            self.assertEqual((image.format, image.size), ('WEBP', (64, 64)))
+
+        with mock.patch.object(avatars, 'process_avatar') as process, self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        process.assert_not_called()
+
+        self.upload('blue')
+        self.assertNotEqual(self.user.avatar_renditions['sizes'], renditions['sizes'])
+
+    def test_template_tag_and_serving(self):
+        self.assertIn('images/404.png', avatar(self.user))
+        self.upload()
+        html = avatar(self.user, 64)
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('256w', html)
+
+        path = self.user.avatar_renditions['sizes']['128']['jpeg'].removeprefix(f'{avatars.RENDITIONS_DIR}/')
+        response = account_views.avatar_rendition(RequestFactory().get('/'), path)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_command_builds_missing_renditions(self):
+        self.upload()
+        User.objects.filter(pk=self.user.pk).update(avatar_renditions={})  # uploaded before the renditions
+
+        out = StringIO()
+        call_command('build_avatar_renditions', stdout=out)
+        self.assertIn('Обработано аватаров: 1', out.getvalue())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.avatar_renditions['source'], self.user.avatar.name)
+
+        call_command('build_avatar_renditions', stdout=out)
+        self.assertIn('Обработано аватаров: 0', out.getvalue())
+
+
+class TestExpiredTaskSweep(TaskFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(email='executor@example.com')
+        self.project = self.create_project()
+        self.task_defaults = {'project': self.project, 'executor': self.user}
+
+    def task(self, days, status='created'):
+        return self.create_task(now() + timedelta(days=days), status=status)
+
+    def test_sweep_closes_only_open_overdue_tasks(self):
+        overdue = [self.task(-1), self.task(-2, 'processed'), self.task(-3)]
+        completed = self.task(-1, 'completed')
+        upcoming = self.task(1)
+
+        sweep = jobs.sweep_expired_tasks(batch_size=2)
+
+        self.assertEqual(sorted(sweep.tasks), sorted(task.pk for task in overdue))
+        self.assertEqual(sweep.projects, [self.project.pk])
+        self.assertEqual(models.TaskSweep.objects.get().closed, 3)
+        self.assertEqual(set(models.Task.objects.filter(status='cancelled')), set(overdue))
+        completed.refresh_from_db()
+        self.assertEqual(completed.total, 100)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.tasks_total, 200)
+
+        self.assertEqual(jobs.sweep_expired_tasks().closed, 0)
+        self.assertEqual(models.TaskSweep.objects.count(), 1)
+        self.assertEqual(list(models.Task.objects.overdue()), [])
+        self.assertEqual(list(models.Task.objects.open()), [upcoming])
+
+    def test_admin_filter_options_split_all_tasks(self):
+        overdue = {self.task(-1), self.task(-2, 'processed')}
+        other = {self.task(-1, 'completed'), self.task(-1, 'cancelled'), self.task(1), self.task(1, 'completed')}
+
+        def filtered(value):
+            list_filter = ExpiredListFilter(None, {'expired': value}, models.Task, TaskAdmin)
+            return set(list_filter.queryset(None, models.Task.objects.all()))
+
+        self.assertEqual(filtered('yes'), overdue)
+        self.assertEqual(filtered('no'), other)
+
+    def test_status_is_configurable(self):
+        task = self.task(-1)
+        with self.settings(TASK_EXPIRED_STATUS='completed'):
+            call_command('run_scheduler', 'sweep_expired_tasks', '--once', stdout=StringIO())
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'completed')
+
+
+class TestQueryPlans(TaskFixtures, TestCase):
+    """Every hot query of the views and the admin must be served by an index."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(email='plans@example.com')
+        self.project = self.create_project()
+        models.Task.objects.bulk_create(
+            models.Task(project=self.project, job=self.job, quantity=1, executor=self.user, total=100,
+                        expired_at=now() + timedelta(days=i)) for i in range(-5, 5)
+        )
+
+    def assertIndexed(self, queryset, partial_index=None):
+        """``partial_index`` may be scanned whole: it only holds the rows the query asks for."""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+            self.assertNotIn('Seq Scan', plan, plan)
+        else:
+            plan = queryset.explain()
+            # "SCAN t USING [COVERING] INDEX i" reads the whole index: only SEARCH is a lookup.
+            scans = re.findall(r'\bSCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?', plan)
+            self.assertEqual([table for table, index in scans if not partial_index or index != partial_index], [],
+                             plan)
+
+    def test_dashboard(self):
+        tasks = models.Task.objects.filter(executor=self.user, status__in=models.TaskQuerySet.open_statuses)
+        self.assertIndexed(tasks.order_by('-created_at')[:5])
+        self.assertIndexed(tasks.order_by('expired_at')[:5])
+        self.assertIndexed(models.Vacation.objects.filter(user=self.user, status__in=['planned', 'processed']))
+
+    def test_calendar_and_sweep(self):
+        today = now()
+        self.assertIndexed(views.calendar_tasks(self.user, today.year, today.month))
+        self.assertIndexed(models.Task.objects.overdue())
+        self.assertIndexed(models.Task.objects.filter(executor=self.user, status='completed'))
+
+    def test_vacations_and_reports(self):
+        self.assertIndexed(models.Vacation.objects.filter(user=self.user, status='planned').order_by('start_date'))
+        self.assertIndexed(models.Report.objects.filter(creator=self.user).order_by('-updated_at', '-id')[:25])
+
+    def test_report_inbox(self):
+        inbox = models.Report.objects.unanswered().order_by('-created_at', '-id')[:25]
+        self.assertIndexed(inbox, partial_index='report_unanswered_idx')
+        if connection.vendor == 'sqlite':
+            self.assertIn('report_unanswered_idx', inbox.explain())
+
+    def test_admin_lookups(self):
+        self.assertIndexed(models.Item.objects.filter(project=self.project))
+        self.assertIndexed(models.Project.objects.filter(title='Дом'))
+        self.assertIndexed(models.Client.objects.filter(title='Заказчик'))
+
+
+@override_settings(MIDDLEWARE=['todo.metrics.MetricsMiddleware', *settings.MIDDLEWARE], QUERY_BUDGETS_STRICT=True,
+                   TEMPLATES=[{**settings.TEMPLATES[0], 'BACKEND': 'todo.metrics.MetricsDjangoTemplates'}])
+class TestQueryBudgets(TaskFixtures, TestCase):
+    """Runs the views with the budgets of settings.QUERY_BUDGETS enforced."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        metrics.registry.clear()
+        self.user = User.objects.create_user(email='budget@example.com', password='12345', is_staff=True)
+        self.client.login(email='budget@example.com', password='12345')
+        project = self.create_project()
+        for days in range(-3, 3):
+            self.create_task(now() + timedelta(days=days), project=project, executor=self.user)
+            self.report = models.Report.objects.create(creator=self.user, theme='Тема', content='Текст')
+        models.Vacation.objects.create(user=self.user, status='planned', start_date=now().date(),
+                                       end_date=now().date() + timedelta(days=7))
+
+    def test_views_stay_within_budgets(self):
+        for name in settings.QUERY_BUDGETS:
+            with self.subTest(name):
+                response = self.client.get(reverse(name), {'id': self.report.pk})
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(metrics.registry.views), set(settings.QUERY_BUDGETS))
+
+    def test_budget_overrun_fails(self):
+        with self.settings(QUERY_BUDGETS={'account': 0}):
+            with self.assertRaises(metrics.QueryBudgetExceeded):
+                self.client.get(reverse('account'))
+        with self.settings(QUERY_BUDGETS={'account': 0}, QUERY_BUDGETS_STRICT=False):
+            with self.assertLogs('todo.metrics', 'WARNING'):
+                self.client.get(reverse('account'))
+
+    def test_prometheus_endpoint(self):
+        self.client.get(reverse('get-tasks'))
+        response = self.client.get(reverse('metrics'))
+        self.assertContains(response, 'todo_requests_total{view="get-tasks"} 1')
+        self.assertContains(response, 'todo_db_queries_total{view="get-tasks"}')
+        self.assertEqual(metrics.registry.views['get-tasks']['over_budget'], 0)
+        self.assertGreater(metrics.registry.views['get-tasks']['template_seconds'], 0)
+
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        with self.settings(METRICS_TOKEN='secret'):
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer сек').status_code, 403)
+        self.assertEqual(response.status_code, 200)
+
+
+class TestSyntheticData(TestCase):
+    def test_generate_tiny_scale(self):
+        models.Category.objects.create(title='Существующая')
+        call_command('generate_data', '--scale', 'tiny', '--tasks', '40', stdout=StringIO())
+
+        scale = synthetic.SCALES['tiny']
+        self.assertEqual(models.Task.objects.count(), 40)
+        self.assertEqual(models.Project.objects.count(), scale.projects)
+        self.assertEqual(models.Report.objects.count(), scale.users * scale.reports_per_user)
+        self.assertEqual(models.Category.objects.count(), 1 + 2 + 4)
+        self.assertFalse(models.Project.objects.with_drift().exists())
+
+        # The hand-built nested sets match what django-mptt computes itself.
+        tree = list(models.Category.objects.values_list('pk', 'lft', 'rght', 'level', 'tree_id').order_by('pk'))
+        models.Category.objects.rebuild()
+        self.assertEqual(
+            tree, list(models.Category.objects.values_list('pk', 'lft', 'rght', 'level', 'tree_id').order_by('pk')))
+        leaf = models.Category.objects.get(title='Категория 2.1')
+        self.assertEqual([node.title for node in leaf.get_ancestors()], ['Категория 2'])
+
+
+class TestAvailability(TaskFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.staff = [User.objects.create(email=f'crew{i}@example.com') for i in range(30)]
+        self.user, self.other = self.staff[:2]
+        self.today = localdate()
+        self.vacation = models.Vacation.objects.create(user=self.user, status='planned',
+                                                       start_date=self.today + timedelta(days=2),
+                                                       end_date=self.today + timedelta(days=5))
+        models.Vacation.objects.create(user=self.other, status='cancelled', start_date=self.today,
+                                       end_date=self.today + timedelta(days=9))
+        self.project = self.create_project()
+
+    def task(self, user, days, **kwargs):
+        return models.Task(project=self.project, job=self.job, quantity=1, executor=user,
+                           expired_at=now() + timedelta(days=days), **kwargs)
+
+    def test_lookups_use_one_query(self):
+        with self.assertNumQueries(1):
+            availability = Availability.for_period(self.today, self.today + timedelta(days=30))
+        staff_ids = [user.pk for user in self.staff]
+        self.assertEqual(availability.busy_users(self.today, self.today + timedelta(days=3)), {self.user.pk})
+        self.assertEqual(availability.free_users(staff_ids, self.today, self.today + timedelta(days=1)), staff_ids)
+        self.assertNotIn(self.user.pk, availability.free_users(staff_ids, self.today + timedelta(days=5),
+                                                               self.today + timedelta(days=8)))
+        self.assertEqual(availability.vacation_on(self.user.pk, self.today + timedelta(days=3)), self.vacation)
+        self.assertTrue(availability.is_free(self.other.pk, self.today + timedelta(days=3)))
+        self.assertEqual(len(availability.days_away(self.user.pk, self.today, self.today + timedelta(days=3))), 2)
+
+        tasks = [self.task(self.user, 3), self.task(self.user, 10), self.task(self.other, 3)]
+        self.assertEqual(availability.task_conflicts(tasks), [(tasks[0], self.vacation)])
+
+    def test_validation(self):
+        overlapping = models.Vacation(user=self.user, status='planned', start_date=self.today + timedelta(days=5),
+                                      end_date=self.today + timedelta(days=7))
+        with self.assertRaises(ValidationError):
+            overlapping.full_clean()
+        overlapping.status = 'cancelled'
+        overlapping.full_clean()
+        with self.assertRaises(ValidationError):
+            models.Vacation(user=self.other, status='planned', start_date=self.today,
+                            end_date=self.today - timedelta(days=1)).full_clean()
+
+        with self.assertRaisesMessage(ValidationError, 'Исполнитель в отпуске'):
+            self.task(self.user, 3).full_clean()
+        self.task(self.user, 3, status='completed').full_clean()
+        self.task(self.other, 3).full_clean()
+
+    def test_executor_picker_labels_vacations(self):
+        field = forms.ExecutorChoiceField(User.objects.all())
+        with self.assertNumQueries(2):
+            labels = [label for _, label in field.choices]
+        self.assertIn(f'crew0@example.com (отпуск {self.vacation.start_date:%d.%m}–{self.vacation.end_date:%d.%m})',
+                      labels)
+        self.assertIn('crew1@example.com', labels)
+
+    def test_vacation_list_and_team_calendar(self):
+        self.user.set_password('12345')
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        self.task(self.user, 3).save()
+
+        response = self.client.get(reverse('vacations'))
+        self.assertEqual(response.context['next_vacation'], self.vacation)
+
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('team-calendar'), {'year': self.today.year, 'month': self.today.month})
+        self.assertEqual(len(response.context['rows']), 30)
+        cells = {cell['day']: cell for cell in response.context['rows'][0]['cells']}
+        day = localdate(now() + timedelta(days=3))
+        if day in cells:
+            self.assertTrue(cells[day]['conflict'])
+
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(reverse('team-calendar')).status_code, 302)
+
+
+class TestWorkload(TaskFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.staff = [User.objects.create(email=f'crew{i}@example.com') for i in range(3)]
+        self.today = localdate()
+        self.other_job = models.Job.objects.create(category=self.category, title='Доставка', type='рейс', price=100)
+        self.task_defaults = {'quantity': 20}
+
+    def task(self, user, days, **kwargs):
+        return self.create_task(now() + timedelta(days=days), executor=user, **kwargs)
+
+    def plan(self, days=13):
+        return workload.Workload.plan(self.today, self.today + timedelta(days=days),
+                                      [user.pk for user in self.staff])
+
+    @override_settings(WORKLOAD_DAILY_OUTPUT={'м2': 20})
+    def test_work_is_spread_over_free_days(self):
+        user = self.staff[0]
+        self.task(user, 3, quantity=40)  # two days of work over four days
+        self.task(user, 1, job=self.other_job, quantity=5)  # a unit without output counts as a day
+        self.task(user, 1, status='completed')
+        models.Vacation.objects.create(user=user, status='planned', start_date=self.today + timedelta(days=1),
+                                       end_date=self.today + timedelta(days=2))
+
+        with self.assertNumQueries(2):
+            plan = self.plan()
+        row = plan.load[plan.row(user.pk)]
+        self.assertEqual(list(plan.available[plan.row(user.pk), :4]), [True, False, False, True])
+        # The day of work due on the second day has a single free day left, the first one.
+        self.assertEqual(list(row[:5]), [2.0, 0.0, 0.0, 1.0, 0.0])
+        self.assertAlmostEqual(plan.load.sum(), 3.0)
+        self.assertEqual(plan.load[plan.row(self.staff[1].pk)].sum(), 0)
+
+    def test_overdue_and_unplaceable_work(self):
+        user = self.staff[0]
+        self.task(user, -3)
+        models.Vacation.objects.create(user=user, status='planned', start_date=self.today + timedelta(days=4),
+                                       end_date=self.today + timedelta(days=6))
+        self.task(user, 5)
+        self.task(user, 30)  # due after the plan: only its share of the period is counted
+
+        plan = self.plan()
+        row = plan.load[plan.row(user.pk)]
+        self.assertAlmostEqual(row[0], 1.0 + 1 / 4 + 1 / 28)
+        self.assertAlmostEqual(row[5], 0)
+        self.assertAlmostEqual(row[13], 1 / 28)
+
+    def test_weekly_totals_and_utilization(self):
+        self.task(self.staff[0], 13, quantity=20 * 14)
+        plan = self.plan()
+        weeks, load = plan.weekly()
+        self.assertEqual(weeks[0], self.today)
+        self.assertTrue(all(week.weekday() == 0 for week in weeks[1:]))
+        self.assertAlmostEqual(load[plan.row(self.staff[0].pk)].sum(), 14)
+        self.assertEqual(list(plan.utilization()), [1.0, 0.0, 0.0])
+
+    def test_least_loaded_executor(self):
+        busy, free, away = self.staff
+        self.task(busy, 3)
+        models.Vacation.objects.create(user=away, status='planned', start_date=self.today,
+                                       end_date=self.today + timedelta(days=30))
+        plan = self.plan()
+        self.assertEqual(plan.least_loaded(), free.pk)
+        self.assertEqual(plan.least_loaded(candidates=[busy.pk, away.pk]), busy.pk)
+        self.assertIsNone(plan.least_loaded(candidates=[away.pk]))
+        self.assertIsNone(workload.Workload.plan(executor_ids=[]).least_loaded())
+
+    def test_task_admin_suggests_least_loaded_executor(self):
+        User.objects.create_superuser('admin@example.com', '12345')
+        self.client.login(email='admin@example.com', password='12345')
+        User.objects.create(email='office@example.com')
+        for user in self.staff[:2]:
+            self.task(user, 3)
+        self.task(self.staff[2], -10, status='completed')
+
+        # The admin and the office have no tasks: they are not in the crew, however free they are.
+        self.assertEqual(workload.crew(), [user.pk for user in self.staff])
+        response = self.client.get(reverse('admin:core_task_add'))
+        self.assertEqual(response.context['adminform'].form.initial['executor'], self.staff[2].pk)
+
+    def test_plan_scales_to_a_year_of_a_large_team(self):
+        staff = User.objects.bulk_create(User(email=f'worker{i}@example.com') for i in range(500))
+        models.Task.objects.bulk_create(
+            models.Task(job=self.job, quantity=i % 50 + 1, executor=staff[i % 500],
+                        expired_at=now() + timedelta(days=i % 365)) for i in range(20_000)
+        )
+        plan = workload.Workload.plan(self.today, self.today + timedelta(days=364))
+        self.assertEqual(plan.load.shape, (503, 365))
+        self.assertAlmostEqual(plan.load.sum(), sum((i % 50 + 1) / 20 for i in range(20_000)), places=3)
+
+
+class TestDeployment(TestCase):
+    def test_health_needs_no_database(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('health'))
+        self.assertContains(response, 'ok')
+
+    @override_settings(ALLOWED_HOSTS=['todo.example.com'])
+    def test_health_skips_host_validation(self):
+        self.assertContains(self.client.get(reverse('health'), HTTP_HOST='127.0.0.1:8000'), 'ok')
+        self.assertEqual(self.client.get(reverse('index'), HTTP_HOST='127.0.0.1:8000').status_code, 400)
+
+    def test_sqlite_file_lock_is_exclusive(self):
+        with tempfile.TemporaryDirectory() as directory:
+            name = os.path.join(directory, 'db.sqlite3')
+            with mock.patch.dict(connection.settings_dict, {'NAME': name}), \
+                    mock.patch.object(connection, 'is_in_memory_db', return_value=False):
+                with database_lock('test'):
+                    with open(f'{name}.test.lock') as file:
+                        with self.assertRaises(BlockingIOError):
+                            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+class TestInitDeployment(TransactionTestCase):
+    # The SQLite schema editor can't run inside the transaction of a TestCase.
+    def test_init_deployment_creates_superuser_once(self):
+        env = {'SUPERUSER_EMAIL': 'root@example.com', 'SUPERUSER_PASSWORD': 'secret'}
+        with mock.patch.dict(os.environ, env):
+            call_command('init_deployment', stdout=StringIO())
+            call_command('init_deployment', stdout=StringIO())
+        self.assertTrue(User.objects.get(email='root@example.com').is_superuser)
+
+    def test_init_deployment_indexes_existing_rows(self):
+        client = models.Client.objects.create(title='Стройтрест')
+        models.SearchDocument.objects.all().delete()
+
+        call_command('init_deployment', stdout=StringIO())
+        self.assertEqual([document.object_id for document in search.search('стройтрест')], [client.pk])
+
+    def test_init_deployment_summarizes_existing_rows(self):
+        models.Item.objects.create(project=models.Project.objects.create(
+            title='Дом', client=models.Client.objects.create(title='Заказчик'), location='Город', status='new', price=0,
+        ), title='Краска', quantity=3, price=50)
+        models.AnalyticsChange.objects.all().delete()
+
+        call_command('init_deployment', stdout=StringIO())
+        self.assertEqual([row['revenue'] for row in analytics.summary('client')], [150])
+
+
+class TestStaticFiles(TestCase):
+    def test_variants_are_built_without_upscaling(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(STATIC_VARIANTS_ROOT=directory):
+            finder = staticfiles.ImageVariantFinder()
+            self.assertEqual(finder.find('images/index/service-1.jpg.960w.webp'), [])
+            location = finder.find('images/index/service-1.jpg.640w.webp')
+            with Image.open(location) as image:
+                self.assertEqual((image.format, image.width), ('WEBP', 640))
+
+    def test_picture_lists_webp_variants(self):
+        html = picture('images/index/hero-section.jpg')
+        self.assertIn('type="image/webp"', html)
+        for width in (480, 960, 1920):
+            self.assertIn(f'hero-section.jpg.{width}w.webp {width}w', html)
+        self.assertNotIn('<picture>', picture('images/404.png'))
+
+    @override_settings(WHITENOISE_USE_FINDERS=True, WHITENOISE_AUTOREFRESH=True)
+    def test_static_files_are_served_by_the_app_with_ranges(self):
+        response = self.client.get('/static/images/404.png', HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'\x89PNG\r\n\x1a\n\x00\x00')
+
+
+class TestSearch(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user@example.com', password='12345')
+        self.other = User.objects.create_user(email='other@example.com', password='12345')
+        customer = models.Client.objects.create(title='Заказчик')
+        self.project = models.Project.objects.create(title='Дом на набережной', client=customer, location='Город',
+                                                     status='new', price=0)
+
+    def titles(self, query, **kwargs):
+        return [document.title for document in search.search(query, **kwargs)]
+
+    def test_inflected_words_match_and_title_ranks_first(self):
+        models.Report.objects.create(creator=self.user, theme='Вопрос', content='Когда закончится ремонт крыши?')
+        models.Report.objects.create(creator=self.user, theme='Ремонт крыш', content='Нужна смета')
+        models.Report.objects.create(creator=self.user, theme='Отпуск', content='Прошу отпуск')
+        self.assertEqual(self.titles('ремонте крыша'), ['Ремонт крыш', 'Вопрос'])
+        self.assertEqual(self.titles('Ремо'), ['Ремонт крыш', 'Вопрос'])
+        self.assertEqual(self.titles('?!'), [])
+
+    def test_documents_follow_saves_and_deletes(self):
+        report = models.Report.objects.create(creator=self.user, theme='Протечка', content='Течёт кран')
+        report.answer = 'Сантехник придёт завтра'
+        report.save()
+        self.assertEqual(self.titles('сантехник'), ['Протечка'])
+        report.delete()
+        self.assertEqual(self.titles('протечка'), [])
+        self.assertEqual(sorted(models.SearchDocument.objects.values_list('title', flat=True)),
+                         ['Дом на набережной', 'Заказчик'])
+
+    def test_owner_sees_only_own_documents(self):
+        models.Report.objects.create(creator=self.other, theme='Чужое сообщение', content='Текст')
+        models.Item.objects.create(project=self.project, title='Сообщение на вывеске', price=10)
+        self.assertEqual(self.titles('сообщение', owner=self.user), [])
+        self.assertEqual(len(self.titles('сообщение')), 2)
+        self.assertEqual(self.titles('сообщение', restrict_to=[models.Item]), ['Сообщение на вывеске'])
+
+    def test_renamed_project_reindexes_its_items(self):
+        item = models.Item.objects.create(project=self.project, title='Краска', price=10)
+        self.project.title = 'Коттедж'
+        self.project.save()
+
+        admin = ItemAdmin(models.Item, site)
+        queryset, _ = admin.get_search_results(None, models.Item.objects.all(), 'коттеджи')
+        self.assertEqual(list(queryset), [item])
+        queryset, _ = admin.get_search_results(None, models.Item.objects.all(), 'набережная')
+        self.assertEqual(list(queryset), [])
+
+    def test_other_changes_keep_dependent_documents(self):
+        models.Item.objects.create(project=self.project, title='Краска', price=10)
+        project = models.Project.objects.get(pk=self.project.pk)
+        project.price = 500
+        with mock.patch.object(search, 'reindex') as reindex:
+            project.save()
+        reindex.assert_not_called()
+
+    def test_search_page(self):
+        report = models.Report.objects.create(creator=self.user, theme='Поставка кирпича', content='Текст')
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('search'), {'q': 'кирпич', 'format': 'json'})
+        self.assertEqual([(result['title'], result['url']) for result in response.json()['results']],
+                         [('Поставка кирпича', f'{reverse("report-detail")}?id={report.pk}')])
+        self.assertContains(self.client.get(reverse('search'), {'q': 'кирпичи'}), 'Поставка кирпича')
+
+    def test_rebuild_indexes_bulk_created_rows(self):
+        models.Report.objects.bulk_create([models.Report(creator=self.user, theme=f'Отчёт {i}', content='Текст')
+                                           for i in range(3)])
+        self.assertEqual(self.titles('отчет'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.titles('отчеты')), 3)
+        self.assertEqual(len(self.titles('набережной')), 1)
+
+
+class TestReportInbox(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(email='staff@example.com', password='12345', is_staff=True)
+        self.user = User.objects.create_user(email='user@example.com', password='12345')
+        self.reports = [models.Report.objects.create(creator=self.user, theme=f'Вопрос {i}', content='Текст')
+                        for i in range(3)]
+
+    def unanswered(self):
+        return caching.unanswered_reports(models.Report.objects.unanswered().count)
+
+    def test_counter_follows_changes(self):
+        self.assertEqual(self.unanswered(), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            report = models.Report.objects.create(creator=self.user, theme='Ещё вопрос', content='Текст')
+        self.assertEqual(self.unanswered(), 4)
+        with self.captureOnCommitCallbacks(execute=True):
+            report.answer = 'Ответ'
+            report.save()
+            self.reports[0].delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.unanswered(), 2)
+
+    def test_answer_updates_in_bulk(self):
+        self.unanswered()
+        first, second, third = self.reports
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            answered = models.Report.objects.unanswered().answer({first.pk: 'Готово', second.pk: 'Завтра'})
+        self.assertEqual(len(answered), 2)
+        self.assertEqual(sum(query['sql'].startswith('UPDATE "core_report"') for query in queries), 1)
+        first.refresh_from_db()
+        self.assertEqual((first.answer, first.is_answered), ('Готово', True))
+        self.assertGreater(first.updated_at, first.created_at)
+        self.assertEqual(self.unanswered(), 1)
+        self.assertEqual([document.title for document in search.search('завтра')], ['Вопрос 1'])
+
+    def test_inbox_answers_several_reports(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('report-inbox'))
+        self.assertContains(response, 'Вопрос 2')
+        first, second, _ = self.reports
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('report-inbox'), {
+                f'answer-{first.pk}': 'Ответ', f'answer-{second.pk}': '  ', 'answer-x': 'Ответ',
+            })
+        self.assertRedirects(response, reverse('report-inbox'))
+        self.assertEqual(list(models.Report.objects.unanswered().order_by('pk')), self.reports[1:])
+        self.assertContains(self.client.get(reverse('report-inbox')), '<span class="badge text-bg-warning">2</span>')
+
+
+class TestAnalytics(TaskFixtures, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.executor = User.objects.create(email='crew@example.com')
+        self.home, self.shop = (models.Client.objects.create(title=title) for title in ('Частник', 'Магазин'))
+        self.project = self.create_project(client=self.home)
+        self.job.category = models.Category.objects.create(title='Стены', parent=self.category)
+        self.job.save()
+        self.task_defaults = {'project': self.project, 'quantity': 2, 'executor': self.executor,
+                              'expired_at': make_aware(datetime(2024, 3, 10))}
+
+    def revenue(self, by):
+        return {row['label']: row['revenue'] for row in analytics.summary(by)}
+
+    def test_refresh_summarizes_the_logged_months(self):
+        self.create_task(status='completed')
+        self.create_task(status='cancelled')
+        self.create_task(project=None)
+        item = models.Item.objects.create(project=self.project, title='Краска', quantity=3, price=50)
+
+        self.assertEqual(analytics.refresh(), [date(2024, 3, 1), localdate(item.created_at).replace(day=1)])
+        self.assertFalse(models.AnalyticsChange.objects.exists())
+        self.assertEqual(analytics.refresh(), [])
+
+        self.assertEqual(self.revenue('client'), {'Частник': 550, 'Не указан': 200})
+        self.assertEqual(self.revenue('category'), {'Отделка > Стены': 600, 'Не указан': 150})
+        self.assertEqual(self.revenue('executor'), {'crew@example.com': 600, 'Не указан': 150})
+        march = analytics.summary('month', date(2024, 3, 1), date(2024, 3, 31))
+        self.assertEqual(len(march), 1)
+        self.assertEqual((march[0]['completed_total'], march[0]['cancelled_total'], march[0]['tasks']),
+                         (200, 200, 3))
+
+    def test_changes_are_logged_and_refreshed(self):
+        task = self.create_task()
+        analytics.refresh()
+
+        task.expired_at = make_aware(datetime(2024, 4, 2))
+        task.save()
+        models.Task.objects.filter(pk=task.pk).update(status='completed')
+        self.project.client = self.shop
+        self.project.save()
+        self.assertEqual(analytics.refresh(), [date(2024, 3, 1), date(2024, 4, 1)])
+        self.assertEqual(self.revenue('month'), {'04.2024': 200})
+        self.assertEqual(self.revenue('client'), {'Магазин': 200})
+        self.assertEqual(analytics.summary('client')[0]['completed_total'], 200)
+
+        task.delete()
+        analytics.refresh()
+        self.assertEqual(analytics.summary('month'), [])
+
+    def test_bulk_updates_log_grouped_months_of_tracked_fields_only(self):
+        for day in range(1, 21):
+            self.create_task(make_aware(datetime(2024, 3, day)))
+        self.create_task(make_aware(datetime(2024, 4, 5)))
+        models.AnalyticsChange.objects.all().delete()
+
+        with self.assertNumQueries(1):
+            models.Task.objects.update(coefficient=2)
+        self.assertFalse(models.AnalyticsChange.objects.exists())
+
+        with self.assertNumQueries(3):  # months, update, log
+            models.Task.objects.update(status='completed')
+        self.assertEqual(sorted(models.AnalyticsChange.objects.values_list('month', flat=True)),
+                         [date(2024, 3, 1), date(2024, 4, 1)])
+
+        models.AnalyticsChange.objects.all().delete()
+        models.Task.objects.filter(expired_at__month=4).update(expired_at=F('expired_at') + timedelta(days=30))
+        self.assertEqual(sorted(models.AnalyticsChange.objects.values_list('month', flat=True)),
+                         [date(2024, 4, 1), date(2024, 5, 1)])
+
+        models.AnalyticsChange.objects.all().delete()
+        models.Task.objects.filter(expired_at__month=5).update(expired_at=make_aware(datetime(2024, 6, 1)))
+        self.assertEqual(sorted(models.AnalyticsChange.objects.values_list('month', flat=True)),
+                         [date(2024, 5, 1), date(2024, 6, 1)])
+
+    def test_full_refresh_matches_incremental_one(self):
+        for month in range(1, 7):
+            self.create_task(make_aware(datetime(2024, month, 5)), status='completed' if month % 2 else 'created')
+        models.Task.objects.bulk_create([models.Task(job=self.job, quantity=1, total=100, executor=self.executor,
+                                                     expired_at=make_aware(datetime(2024, 7, 1)))])
+        analytics.refresh()
+        incremental = analytics.summary('month')
+        self.assertEqual(len(incremental), 7)
+        analytics.refresh(full=True)
+        self.assertEqual(analytics.summary('month'), incremental)
+
+    def test_months_are_grouped_outside_transactions(self):
+        self.create_task()
+        self.create_task(make_aware(datetime(2024, 4, 5)))
+        depth = len(connection.atomic_blocks)
+        grouped_at = []
+
+        def summary_rows(months):
+            grouped_at.append(len(connection.atomic_blocks))
+            return rows(months)
+
+        rows = analytics.summary_rows
+        with mock.patch.object(analytics, 'summary_rows', summary_rows):
+            analytics.refresh(full=True)
+        self.assertEqual(grouped_at, [depth, depth])
+        self.assertEqual(self.revenue('month'), {'03.2024': 200, '04.2024': 200})
+
+    def test_report_admin_and_export(self):
+        self.create_task()
+        call_command('run_scheduler', 'refresh_analytics', '--once', stdout=StringIO())
+        User.objects.create_superuser('admin@example.com', '12345')
+        self.client.login(email='admin@example.com', password='12345')
+
+        response = self.client.get(reverse('analytics'), {'by': 'client', 'start': '2024-01'})
+        self.assertEqual(response.context['rows'][0]['label'], 'Частник')
+        self.assertEqual(response.context['totals']['revenue'], 200)
+        self.assertEqual(self.client.get(reverse('analytics'), {'by': 'client', 'start': '2025-01'}).context['rows'],
+                         [])
+        json = self.client.get(reverse('analytics'), {'by': 'month', 'format': 'json'}).json()
+        self.assertEqual(json['rows'][0]['month'], '2024-03-01')
+        self.assertEqual(self.client.get(reverse('analytics'), {'start': 'март'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('analytics'), {'by': 'project'}).status_code, 404)
+
+        response = self.client.get(reverse('admin:core_revenuesummary_changelist'))
+        self.assertEqual(response.context['charts'][0]['rows'][0]['share'], 100)
+        self.assertContains(response, 'Крупнейшие заказчики')
+
+        response = self.client.get(reverse('export', args=['revenue']), {'project': self.project.pk})
+        rows = list(csv.reader(b''.join(response.streaming_content).decode('utf-8-sig').splitlines()))
+        self.assertEqual(rows[1][:5], ['2024-03-01', 'Частник', 'Отделка > Стены', 'crew@example.com', '200.00'])
+
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('analytics')).status_code, 302)
@@ -1,16 +1,33 @@
 import calendar
 from collections import defaultdict
-from datetime import datetime
+from contextlib import nullcontext
+from datetime import date, datetime
 
+from django.conf import settings
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.http import HttpResponseNotFound
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseNotFound, JsonResponse
+from django.template.loader import render_to_string
 from django.utils.translation import gettext as _
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, get_object_or_404, redirect
-from django.utils.timezone import now
+from django.urls import reverse
+from django.utils.timezone import localtime, make_aware, now
 
-from todo.apps.core import models, forms
+from todo.apps.core import analytics, caching, exports, heatmap, models, forms, search
+from todo.apps.core.availability import Availability
+from todo.apps.core.pagination import KeysetPaginator
+from todo.apps.custom_account.models import User
+from todo.db.routers import primary_reads, use_replica
+
+
+def health(request):
+    """Readiness probe: answers as soon as the process serves requests, without touching the database."""
+    return HttpResponse('ok', content_type='text/plain')
 
 
 def index(request):
@@ -18,22 +35,30 @@ def index(request):
     return render(request, 'index.html', context)
 
 
-@login_required
-def account(request):
-    tasks = models.Task.objects.filter(executor=request.user, status__in=['created', 'processed'])
-    created_tasks = tasks.order_by('-created_at')[:5]
-    expired_tasks = tasks.order_by('expired_at')[:5]
-    vacation = models.Vacation.objects.filter(user=request.user, status__in=['planned', 'processed']).first()
+def dashboard_context(user, version):
+    """
+    The context of the account dashboard, shared by the sync and async views.
+
+    The querysets are lazy: they only run when the template misses the cached
+    fragment, so the rows are fetched by the same check that decides to render.
+    """
+    tasks = models.Task.objects.filter(executor=user, status__in=['created', 'processed'])
+    return {'created_tasks': tasks.order_by('-created_at')[:5],
+            'expired_tasks': tasks.order_by('expired_at')[:5],
+            'vacations': models.Vacation.objects.filter(user=user, status__in=['planned', 'processed']),
+            'dashboard_version': version,
+            'dashboard_timeout': caching.DASHBOARD_TIMEOUT,
+            'today': now().date()}
 
-    context = {'created_tasks': created_tasks,
-               'expired_tasks': expired_tasks,
-               'vacation': vacation}
 
+@login_required
+def account(request):
+    context = dashboard_context(request.user, caching.dashboard_version(request.user.pk))
     return render(request, 'account/account.html', context)
 
 
-@login_required
-def get_tasks(request):
+def calendar_params(request):
+    """The month requested by the calendar buttons together with its neighbours."""
     n = now()
     year = int(request.GET.get('year', n.year))
     month = int(request.GET.get('month', n.month))
@@ -52,31 +77,76 @@ def get_tasks(request):
         previous_year = year
         next_year = year
 
-    previous_month = month - 1
-    next_month = month + 1
-
-    calendar_month = calendar.Calendar().monthdays2calendar(year, month)
-    tasks = models.Task.objects.filter(executor=request.user, expired_at__month=month, expired_at__year=year)
-    tasks_dict = defaultdict(list)
-    for task in tasks:
-        tasks_dict[task.expired_at.day].append(task)
-
-    month_name = _(calendar.month_name[month])
-    month_abbr = _(calendar.month_abbr[month])
-    context = {
+    return {
         'month': month,
         'year': year,
         'previous_year': previous_year,
         'next_year': next_year,
-        'previous_month': previous_month,
-        'next_month': next_month,
-        'calendar_month': calendar_month,
-        'tasks_dict': tasks_dict,
-        'month_name': month_name,
-        'month_abbr': month_abbr
+        'previous_month': month - 1,
+        'next_month': month + 1,
     }
 
-    return render(request, 'htmx/task_calendar.html', context)
+
+def calendar_tasks(user, year, month):
+    # Half-open range so the (executor, expired_at) index can serve the lookup.
+    month_start = make_aware(datetime(year, month, 1))
+    month_end = make_aware(datetime(year + month // 12, month % 12 + 1, 1))
+    return (models.Task.objects
+            .filter(executor=user, expired_at__gte=month_start, expired_at__lt=month_end)
+            .select_related('job')
+            .order_by('expired_at'))
+
+
+def url_template(name, kwarg):
+    """
+    The URL of ``name`` as a ``str.format`` template with ``{}`` for its
+    integer ``kwarg``: one reverse() for many URLs that only differ in the id.
+    """
+    marker = '9876543210'
+    head, _, tail = reverse(name, kwargs={kwarg: int(marker)}).rpartition(marker)
+    return f'{head}{{}}{tail}'
+
+
+def calendar_context(params, tasks):
+    """
+    Everything the calendar fragment shows, precomputed per day.
+
+    ``weeks`` holds the month grid (``None`` for the padding days) and ``days``
+    the same day entries in order, each with its task count and task rows, so
+    the template does no lookups of its own.
+    """
+    year, month = params['year'], params['month']
+    days = [{'day': day, 'count': 0, 'tasks': []} for day in range(1, calendar.monthrange(year, month)[1] + 1)]
+    statuses = dict(models.Task.STATUS_CHOICES)
+    # One reverse() for the month instead of one per task.
+    detail_url = url_template('task-detail', 'uuid')
+    for task in tasks:
+        entry = days[localtime(task.expired_at).day - 1]
+        entry['count'] += 1
+        entry['tasks'].append({'title': task.job.title, 'status': statuses.get(task.status, task.status),
+                               'url': detail_url.format(task.pk)})
+
+    return {
+        **params,
+        'weeks': [[days[day - 1] if day else None for day in week]
+                  for week in calendar.Calendar().monthdayscalendar(year, month)],
+        'days': days,
+        'month_name': _(calendar.month_name[month]),
+        'month_abbr': _(calendar.month_abbr[month]),
+    }
+
+
+@login_required
+def get_tasks(request):
+    params = calendar_params(request)
+    cache_key = caching.calendar_key(request.user.pk, params['year'], params['month'])
+    content = cache.get(cache_key)
+    if content is None:
+        tasks = calendar_tasks(request.user, params['year'], params['month'])
+        content = render_to_string('htmx/task_calendar.html', calendar_context(params, tasks), request,
+                                   using=settings.FRAGMENT_TEMPLATE_ENGINE)
+        cache.set(cache_key, content, caching.CALENDAR_TIMEOUT)
+    return HttpResponse(content)
 
 
 @login_required
@@ -97,48 +167,172 @@ def task_detail(request, uuid):
 
 
 @login_required
+@use_replica
 def vacation_list(request):
-    vacations = models.Vacation.objects.filter(user=request.user).order_by('start_date')
-    next_vacation = vacations.filter(status='planned').first()
+    # One query, split by status here.
+    vacations_by_status = defaultdict(list)
+    for vacation in models.Vacation.objects.filter(user=request.user).order_by('start_date'):
+        vacations_by_status[vacation.status].append(vacation)
+    next_vacation = next(iter(vacations_by_status['planned']), None)
     days_vacation = None
     if next_vacation:
         days_vacation = (next_vacation.end_date - next_vacation.start_date).days
-    completed_vacations = vacations.filter(status='completed')
-    cancelled_vacations = vacations.filter(status='cancelled')
 
     context = {
         'next_vacation': next_vacation,
         'days_vacation': days_vacation,
-        'completed_vacations': completed_vacations,
-        'cancelled_vacations': cancelled_vacations
+        'completed_vacations': vacations_by_status['completed'],
+        'cancelled_vacations': vacations_by_status['cancelled'],
     }
 
     return render(request, 'vacation_list.html', context)
 
 
+def team_rows(users, availability, task_counts, days):
+    """Per user and day of the month: on leave, number of tasks due, and whether the two collide."""
+    rows = []
+    for user in users:
+        away = availability.days_away(user.pk, days[0], days[-1])
+        cells = []
+        for day in days:
+            count = task_counts.get((user.pk, day), 0)
+            cells.append({'day': day, 'away': day in away, 'tasks': count, 'conflict': count and day in away})
+        rows.append({'user': user, 'cells': cells, 'conflicts': sum(bool(cell['conflict']) for cell in cells)})
+    return rows
+
+
+HEATMAP_MAX_DAYS = 366 * 2
+
+
+def heatmap_executors(request):
+    """
+    Ids of the executors asked for by ``executor`` (repeated), the user by
+    default; only staff may ask for others, or for everyone with ``all``.
+    """
+    requested = request.GET.getlist('executor')
+    if not requested or requested == [str(request.user.pk)]:
+        return [request.user.pk]
+    if not request.user.is_staff:
+        raise PermissionDenied('Нет доступа к задачам других исполнителей')
+    if requested == ['all']:
+        return list(User.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True))
+    return sorted({int(executor) for executor in requested})
+
+
+@login_required
+@use_replica
+def task_heatmap(request):
+    """
+    Per-day task counts by status from ``start`` to ``end`` (the current year
+    by default) as JSON; ``by=executor`` adds the counts of every executor.
+    """
+    today = now().date()
+    try:
+        start = date.fromisoformat(request.GET.get('start') or f'{today.year}-01-01')
+        end = date.fromisoformat(request.GET.get('end') or f'{today.year}-12-31')
+        executor_ids = heatmap_executors(request)
+    except ValueError:
+        return JsonResponse({'error': 'Неверные даты или исполнители'}, status=400)
+    if not 0 <= (end - start).days < HEATMAP_MAX_DAYS:
+        return JsonResponse({'error': f'Период должен быть не длиннее {HEATMAP_MAX_DAYS} дней'}, status=400)
+
+    counts = heatmap.task_counts(executor_ids, start, end)
+    data = {
+        'start': start,
+        'end': end,
+        'statuses': [status for status, _ in models.Task.STATUS_CHOICES],
+        'days': {day.isoformat(): statuses for day, statuses in heatmap.totals(counts).items()},
+    }
+    if request.GET.get('by') == 'executor':
+        data['executors'] = {str(executor_id): {day.isoformat(): statuses for day, statuses in days.items()}
+                             for executor_id, days in counts.items()}
+    return JsonResponse(data)
+
+
+@staff_member_required
+@use_replica
+def team_calendar(request):
+    params = calendar_params(request)
+    year, month = params['year'], params['month']
+    days = [date(year, month, day) for day in range(1, calendar.monthrange(year, month)[1] + 1)]
+
+    users = list(User.objects.filter(is_active=True).order_by('last_name', 'first_name', 'email'))
+    availability = Availability.for_period(days[0], days[-1])
+    month_start = make_aware(datetime(year, month, 1))
+    month_end = make_aware(datetime(year + month // 12, month % 12 + 1, 1))
+    task_counts = {
+        (row['executor'], row['day']): row['count']
+        for row in models.Task.objects.open()
+        .filter(executor__isnull=False, expired_at__gte=month_start, expired_at__lt=month_end)
+        .annotate(day=TruncDate('expired_at')).order_by()
+        .values('executor', 'day').annotate(count=Count('pk'))
+    }
+
+    context = {
+        **params,
+        'days': days,
+        'rows': team_rows(users, availability, task_counts, days),
+        'month_name': _(calendar.month_name[month]),
+    }
+    return render(request, 'team_calendar.html', context)
+
+
+REPORTS_PER_PAGE = 25
+# Set by send_report for the redirect that follows: the new report may not be on the replica yet.
+REPORT_SENT_SESSION_KEY = 'core:report-sent'
+
+
+def report_as_dict(report):
+    return {
+        'id': report.id,
+        'theme': report.theme,
+        'content': report.content,
+        'answer': report.answer,
+        'is_answered': report.is_answered,
+        'created_at': report.created_at,
+        'updated_at': report.updated_at,
+    }
+
+
+def reports_page_response(request, page_obj):
+    """The HTMX "load more" fragment or the full page for a page of reports."""
+    context = {'page_obj': page_obj}
+    if request.headers.get('HX-Request') and request.GET.get('cursor'):
+        return render(request, 'reports/report_list_page.html', context, using=settings.FRAGMENT_TEMPLATE_ENGINE)
+    if page_obj.object_list:
+        context['last_report'] = page_obj.object_list[0]
+    return render(request, 'reports/report_list.html', context)
+
+
 @login_required
 def report_detail(request):
     try:
         _id = int(request.GET.get('id', None))
-    except ValueError:
+    except (TypeError, ValueError):
         return HttpResponseNotFound('Объект не найден!')
     report = get_object_or_404(models.Report, id=_id, creator=request.user)
+    if request.GET.get('format') == 'json':
+        return JsonResponse(report_as_dict(report))
     context = {'obj': report}
     return render(request, 'reports/report_detail.html', context)
 
 
 @login_required
+@use_replica
 def report_list(request):
     reports = models.Report.objects.filter(creator=request.user)
-    paginator = Paginator(reports, 25)
+    with primary_reads() if request.session.pop(REPORT_SENT_SESSION_KEY, False) else nullcontext():
+        page_obj = KeysetPaginator(reports, REPORTS_PER_PAGE).get_page(request.GET.get('cursor'))
+        return reports_page_response(request, page_obj)
 
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    context = {'page_obj': page_obj}
-    if len(page_obj.object_list) > 0:
-        last_report = page_obj.object_list[0]
-        context['last_report'] = last_report
-    return render(request, 'reports/report_list.html', context)
+
+@login_required
+@use_replica
+def report_api(request):
+    reports = models.Report.objects.filter(creator=request.user)
+    page_obj = KeysetPaginator(reports, REPORTS_PER_PAGE).get_page(request.GET.get('cursor'))
+    return JsonResponse({'results': [report_as_dict(report) for report in page_obj],
+                         'next': page_obj.next_cursor})
 
 
 @login_required
@@ -149,9 +343,104 @@ def send_report(request):
             report = report_form.save(commit=False)
             report.creator = request.user
             report.save()
+            request.session[REPORT_SENT_SESSION_KEY] = True
             messages.success(request, 'Вы успешно отправили письмо!')
             return redirect('reports')
     else:
         report_form = forms.ReportForm()
     context = {'report_form': report_form}
     return render(request, 'reports/send_report.html', context)
+
+
+INBOX_PER_PAGE = 25
+
+
+def inbox_answers(data):
+    """``{report id: answer}`` from the non-empty ``answer-<id>`` fields of the inbox form."""
+    answers = {}
+    for name, value in data.items():
+        report_id = name.removeprefix('answer-')
+        if name.startswith('answer-') and report_id.isdigit() and value.strip():
+            answers[int(report_id)] = value.strip()
+    return answers
+
+
+@staff_member_required
+def report_inbox(request):
+    """Unanswered reports, newest first, answered in batches with one bulk UPDATE."""
+    if request.method == 'POST':
+        answers = inbox_answers(request.POST)
+        if answers:
+            # Reports answered meanwhile by someone else are left as they are.
+            answered = models.Report.objects.unanswered().answer(answers)
+            messages.success(request, f'Отправлено ответов: {len(answered)}')
+        return redirect('report-inbox')
+
+    reports = models.Report.objects.unanswered().select_related('creator')
+    page_obj = KeysetPaginator(reports, INBOX_PER_PAGE, key='created_at').get_page(request.GET.get('cursor'))
+    context = {
+        'page_obj': page_obj,
+        'unanswered': caching.unanswered_reports(models.Report.objects.unanswered().count),
+    }
+    return render(request, 'reports/inbox.html', context)
+
+
+SEARCH_RESULTS = 50
+
+
+@login_required
+@use_replica
+def search_page(request):
+    """Ranked full-text search: the user's own reports and tasks, everything for staff."""
+    query = request.GET.get('q', '').strip()[:200]
+    owner = None if request.user.is_staff else request.user
+    results = search.search(query, owner=owner, limit=SEARCH_RESULTS) if query else []
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'query': query, 'results': [
+            {'type': result.label, 'title': result.title, 'url': result.get_absolute_url(), 'score': result.score}
+            for result in results
+        ]})
+    return render(request, 'search.html', {'query': query, 'results': results})
+
+
+@staff_member_required
+@use_replica
+def analytics_report(request):
+    """Revenue across all projects by client, month, category or executor, read from the summary tables."""
+    by = request.GET.get('by', 'client')
+    if by not in analytics.DIMENSIONS:
+        raise Http404('Отчёт не найден')
+    try:
+        start = analytics.parse_month(request.GET.get('start'))
+        end = analytics.parse_month(request.GET.get('end'))
+    except ValueError:
+        return HttpResponseBadRequest('Месяцы задаются как ГГГГ-ММ')
+    rows = analytics.summary(by, start, end)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'by': by, 'rows': rows})
+
+    peak = max((row['revenue'] for row in rows), default=0)
+    for row in rows:
+        row['share'] = round(row['revenue'] / peak * 100) if peak else 0
+    context = {
+        'by': by,
+        'rows': rows,
+        'dimensions': {dimension: title for dimension, (title, _) in analytics.DIMENSIONS.items()},
+        'start': start,
+        'end': end,
+        'totals': {total: sum(row[total] for row in rows) for total in ('revenue', *analytics.TOTALS)},
+    }
+    return render(request, 'analytics.html', context)
+
+
+@staff_member_required
+def export(request, name):
+    export_class = exports.EXPORTS.get(name)
+    file_format = request.GET.get('format', 'csv')
+    if export_class is None or file_format not in exports.FORMATS:
+        raise Http404('Выгрузка не найдена')
+    queryset = export_class.model.objects.all()
+    project = request.GET.get('project')
+    if project and project.isdigit() and export_class.project_lookup:
+        queryset = queryset.filter(**{export_class.project_lookup: project})
+    return exports.export_response(export_class(), file_format, queryset)
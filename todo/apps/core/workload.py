@@ -0,0 +1,203 @@
+"""
+How loaded every executor is, per day or week, from the open tasks.
+
+A task is ``quantity`` of its job's unit (``Job.type``), and
+``WORKLOAD_DAILY_OUTPUT`` says how much of a unit one executor does in a
+day, so the task is worth ``quantity / output`` days of work; a task in a
+unit that is not listed counts as one day. The plan looks forward: the
+work is spread evenly over the days from the start of the plan to the
+deadline on which the executor is not on leave. Overdue work lands on the
+first day of the plan, and work with no free day left lands on the
+deadline, where it shows up as overload.
+
+Everything is array math over the executor × day grid: vacations and tasks
+become ``+1/-1`` marks on their first and past-the-last day, and a
+``cumsum`` along the days turns the marks into intervals, so the cost is
+one pass over the tasks and vacations plus a few operations on the grid,
+whatever the length of the intervals.
+"""
+from datetime import datetime, time, timedelta, timezone
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.utils.timezone import get_current_timezone, localdate, make_aware
+
+from todo.apps.core import models
+from todo.apps.core.availability import BLOCKING_STATUSES
+from todo.apps.custom_account.models import User
+
+# Deadlines further away than this are planned as if they were due on its last day.
+MAX_DAYS = 366 * 2
+# Users with tasks due in this many past days, or later, make up the crew.
+CREW_DAYS = 90
+
+
+def crew(today=None):
+    """
+    Ids of the active users with tasks due from ``CREW_DAYS`` ago on: the
+    executors to suggest, without the office staff who have no tasks and
+    would always look the least loaded.
+    """
+    since = (today or localdate()) - timedelta(days=CREW_DAYS)
+    executors = (models.Task.objects.filter(expired_at__gte=make_aware(datetime.combine(since, time())))
+                 .values('executor'))
+    return list(User.objects.filter(is_active=True, pk__in=executors).order_by('pk').values_list('pk', flat=True))
+
+
+def task_work(quantities, units):
+    """Days of work of tasks with these ``quantities`` of ``units``."""
+    output = getattr(settings, 'WORKLOAD_DAILY_OUTPUT', {})
+    rates = np.array([output.get(unit, 0) for unit in units], dtype=float)
+    quantities = np.asarray(quantities, dtype=float)
+    return np.divide(quantities, rates, out=np.ones_like(quantities), where=rates > 0)
+
+
+def _fetch(queryset):
+    """
+    The rows of a ``values_list`` queryset straight from the cursor: Django's
+    per-row converters cost more than the rest of the plan together.
+    """
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:  # e.g. no executors at all
+        return []
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _ordinals(days):
+    return np.fromiter((day.toordinal() for day in days), dtype=np.int64, count=len(days))
+
+
+def _local_ordinals(moments):
+    """
+    Day ordinals of the UTC ``moments`` (naive from SQLite, aware from
+    PostgreSQL) in the current time zone, converted once per distinct hour.
+    """
+    hours = np.fromiter((moment.toordinal() * 24 + moment.hour for moment in moments), dtype=np.int64,
+                        count=len(moments))
+    unique, inverse = np.unique(hours, return_inverse=True)
+    tz = get_current_timezone()
+    local = _ordinals([(datetime.fromordinal(hour // 24) + timedelta(hours=hour % 24))
+                       .replace(tzinfo=timezone.utc).astimezone(tz) for hour in unique.tolist()])
+    return local[inverse]
+
+
+def _day_index(ordinals, start, size):
+    """Positions of the day ``ordinals`` on the grid starting at ``start``, clipped to it."""
+    return np.clip(ordinals - start.toordinal(), 0, size - 1)
+
+
+def _intervals(rows, first, last, values, shape):
+    """``values`` on every day from ``first`` to ``last`` (inclusive) of their ``rows``, summed per cell."""
+    marks = np.zeros((shape[0], shape[1] + 1))
+    np.add.at(marks, (rows, first), values)
+    np.add.at(marks, (rows, last + 1), -np.asarray(values, dtype=float))
+    return np.cumsum(marks, axis=1)[:, :-1]
+
+
+class Workload:
+    """
+    ``load[i, d]`` is the days of work executor ``executor_ids[i]`` has on
+    ``start + d``; ``available[i, d]`` is False on the days they are on leave.
+    """
+
+    def __init__(self, executor_ids, start, load, available):
+        self.executor_ids = list(executor_ids)
+        self.start = start
+        self.load = load
+        self.available = available
+        self._rows = {executor_id: row for row, executor_id in enumerate(self.executor_ids)}
+
+    @classmethod
+    def plan(cls, start=None, end=None, executor_ids=None):
+        """
+        The workload from ``start`` (today) to ``end`` (four weeks later) of
+        ``executor_ids`` (every active user), in three queries.
+        """
+        start = start or localdate()
+        end = end or start + timedelta(weeks=4)
+        if executor_ids is None:
+            executor_ids = User.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True)
+        executor_ids = list(executor_ids)
+        rows = {executor_id: row for row, executor_id in enumerate(executor_ids)}
+
+        tasks = _fetch(models.Task.objects.open().filter(executor__in=executor_ids).order_by()
+                       .values_list('executor_id', 'expired_at', 'quantity', 'job__type'))
+        if tasks:
+            task_executors, due, quantities, units = zip(*tasks)
+            due = _local_ordinals(due)
+        # The grid runs to the furthest deadline, so that the work due after ``end`` is spread correctly.
+        horizon = max(end.toordinal(), int(due.max())) if tasks else end.toordinal()
+        size = min(horizon - start.toordinal(), MAX_DAYS) + 1
+        shape = (len(executor_ids), size)
+
+        vacations = list(models.Vacation.objects
+                         .filter(user__in=executor_ids, status__in=BLOCKING_STATUSES, end_date__gte=start,
+                                 start_date__lt=start + timedelta(days=size))
+                         .order_by().values_list('user_id', 'start_date', 'end_date'))
+        if vacations:
+            users, first_days, last_days = zip(*vacations)
+            away = _intervals([rows[user_id] for user_id in users],
+                              _day_index(_ordinals(first_days), start, size),
+                              _day_index(_ordinals(last_days), start, size),
+                              np.ones(len(vacations)), shape)
+            available = away == 0
+        else:
+            available = np.ones(shape, dtype=bool)
+
+        load = np.zeros(shape)
+        if tasks:
+            task_rows = np.array([rows[executor_id] for executor_id in task_executors])
+            due = _day_index(due, start, size)
+            work = task_work(quantities, units)
+
+            # Free days up to every task's deadline from the running count of free days per executor.
+            free_days = np.cumsum(available, axis=1)[task_rows, due]
+            spread = free_days > 0
+            rate = np.divide(work, free_days, out=np.zeros_like(work), where=spread)
+            load = _intervals(task_rows[spread], np.zeros(spread.sum(), dtype=np.int64), due[spread],
+                              rate[spread], shape) * available
+            np.add.at(load, (task_rows[~spread], due[~spread]), work[~spread])
+
+        days = (end - start).days + 1
+        return cls(executor_ids, start, load[:, :days], available[:, :days])
+
+    @property
+    def days(self):
+        return [self.start + timedelta(days=day) for day in range(self.load.shape[1])]
+
+    def row(self, executor_id):
+        return self._rows[executor_id]
+
+    def _slice(self, start, end):
+        return slice(max((start - self.start).days, 0), (end - self.start).days + 1)
+
+    def weekly(self):
+        """``(week starts, load)``: the load summed per week, weeks starting on Monday."""
+        days = self.days
+        starts = [0] + [index for index, day in enumerate(days) if day.weekday() == 0 and index]
+        return [days[index] for index in starts], np.add.reduceat(self.load, starts, axis=1)
+
+    def utilization(self, start=None, end=None):
+        """
+        Per executor, days of work per free day from ``start`` to ``end`` (the
+        whole plan): 1 is fully booked, ``inf`` is on leave for the whole period.
+        """
+        period = self._slice(start or self.start, end or self.days[-1])
+        load, free = self.load[:, period].sum(axis=1), self.available[:, period].sum(axis=1)
+        return np.divide(load, free, out=np.full(load.shape, np.inf), where=free > 0)
+
+    def least_loaded(self, start=None, end=None, candidates=None):
+        """The executor with the lowest utilization who has a free day in the period, or None."""
+        utilization = self.utilization(start, end)
+        if candidates is not None:
+            allowed = np.isin(self.executor_ids, list(candidates))
+            utilization = np.where(allowed, utilization, np.inf)
+        if not len(utilization) or np.isinf(utilization.min()):
+            return None
+        return self.executor_ids[int(np.argmin(utilization))]
+
@@ -1,8 +1,14 @@
 from django.contrib import admin
 
 from todo.apps.custom_account.models import User
+from todo.apps.custom_account.templatetags.avatars import avatar
 
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
     username = None
+    readonly_fields = ('avatar_preview',)
+
+    @admin.display(description='Превью аватара')
+    def avatar_preview(self, obj):
+        return avatar(obj, 64)
@@ -5,3 +5,6 @@ class CustomAccountConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'todo.apps.custom_account'
     verbose_name = 'Пользователи'
+
+    def ready(self):
+        from todo.apps.custom_account import signals  # noqa: F401
@@ -0,0 +1,102 @@
+"""
+Avatar renditions, generated once per upload in a background thread.
+
+Every size is stored as WEBP and JPEG under a name derived from the
+content hash of the source image, so the files never change and can be
+served with far-future cache headers by the web server or the storage.
+Avatars uploaded before the renditions existed are processed by the
+``build_avatar_renditions`` command.
+"""
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+
+from todo.apps.core import caching
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = 'avatars/renditions'
+FORMATS = {'webp': ('WEBP', {'quality': 80, 'method': 6}), 'jpeg': ('JPEG', {'quality': 85, 'optimize': True})}
+
+_executor = None
+
+
+def get_sizes():
+    return getattr(settings, 'AVATAR_SIZES', (64, 128, 256))
+
+
+def _render(image, size, image_format, options):
+    from PIL import Image, ImageOps
+
+    buffer = BytesIO()
+    ImageOps.fit(image, (size, size), Image.LANCZOS).save(buffer, image_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def build_renditions(user):
+    """Writes the renditions of ``user.avatar`` and returns their description."""
+    # Pillow is imported on first use only, it is not needed to serve requests.
+    from PIL import Image, ImageOps
+
+    with user.avatar.open('rb') as file:
+        content = file.read()
+    digest = hashlib.sha256(content).hexdigest()[:16]
+    image = ImageOps.exif_transpose(Image.open(BytesIO(content))).convert('RGB')
+
+    sizes = {}
+    for size in get_sizes():
+        sizes[str(size)] = {}
+        for extension, (image_format, options) in FORMATS.items():
+            name = f'{RENDITIONS_DIR}/{digest}-{size}.{extension}'
+            if not default_storage.exists(name):
+                default_storage.save(name, _render(image, size, image_format, options))
+            sizes[str(size)][extension] = name
+    return {'source': user.avatar.name, 'sizes': sizes}
+
+
+def update_renditions(user):
+    """Builds and stores the renditions of ``user.avatar``, returns whether they were saved."""
+    from todo.apps.custom_account.models import User
+
+    renditions = build_renditions(user)
+    # Skip the write if another upload replaced the avatar meanwhile.
+    if User.objects.filter(pk=user.pk, avatar=renditions['source']).update(avatar_renditions=renditions):
+        caching.invalidate_dashboards([user.pk])
+        return True
+    return False
+
+
+def process_avatar(user_pk):
+    from todo.apps.custom_account.models import User
+
+    try:
+        user = User.objects.filter(pk=user_pk).only('avatar').first()
+        if user is None or not user.avatar:
+            return
+        update_renditions(user)
+    except Exception:
+        logger.exception('Не удалось обработать аватар пользователя %s', user_pk)
+    finally:
+        close_old_connections()
+
+
+def schedule_avatar_processing(user):
+    """
+    Queues the renditions of a freshly uploaded avatar once the upload is committed.
+
+    ``AVATAR_WORKERS = 0`` processes the avatar synchronously instead.
+    """
+    global _executor
+    workers = getattr(settings, 'AVATAR_WORKERS', 2)
+    if not workers:
+        transaction.on_commit(lambda: process_avatar(user.pk))
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='avatars')
+    transaction.on_commit(lambda: _executor.submit(process_avatar, user.pk))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from todo.apps.custom_account import avatars
+from todo.apps.custom_account.models import User
+
+
+class Command(BaseCommand):
+    help = 'Создаёт копии аватаров, загруженных до появления копий или с тех пор изменённых'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='пересоздать копии всех аватаров')
+
+    def handle(self, *args, **options):
+        built = failed = 0
+        for user in User.objects.exclude(avatar='').only('avatar', 'avatar_renditions').order_by('pk').iterator():
+            if not options['all'] and user.avatar_renditions.get('source') == user.avatar.name:
+                continue
+            try:
+                built += avatars.update_renditions(user)
+            except Exception as error:
+                failed += 1
+                self.stderr.write(f'Пользователь №{user.pk}: {error}')
+
+        self.stdout.write(self.style.SUCCESS(f'Обработано аватаров: {built}'))
+        if failed:
+            self.stdout.write(self.style.WARNING(f'Не удалось обработать: {failed}'))
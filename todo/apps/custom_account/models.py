@@ -4,8 +4,6 @@ from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils.translation import gettext as _
-from imagekit.models import ImageSpecField
-from pilkit.processors import ResizeToFill
 
 
 class UserManager(BaseUserManager):
@@ -52,10 +50,8 @@ class User(AbstractUser):
     position = models.CharField(max_length=200)
 
     avatar = models.ImageField(upload_to='avatars')
-    avatar_thumbnail = ImageSpecField(source='avatar',
-                                      processors=[ResizeToFill(100, 50)],
-                                      format='WEBP',
-                                      options={'quality': 50})
+    # Filled in by avatars.process_avatar after every upload.
+    avatar_renditions = models.JSONField(default=dict, blank=True, editable=False)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from todo.apps.custom_account import avatars
+from todo.apps.custom_account.models import User
+
+
+@receiver(post_save, sender=User)
+def process_new_avatar(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'avatar' not in update_fields:
+        return
+    if instance.avatar and instance.avatar_renditions.get('source') != instance.avatar.name:
+        avatars.schedule_avatar_processing(instance)
+    elif not instance.avatar and instance.avatar_renditions:
+        User.objects.filter(pk=instance.pk).update(avatar_renditions={})
@@ -0,0 +1,37 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from todo.apps.custom_account import avatars
+
+register = template.Library()
+
+
+def _srcset(sizes, extension):
+    return ', '.join(f'{default_storage.url(formats[extension])} {size}w'
+                     for size, formats in sizes.items())
+
+
+@register.simple_tag
+def avatar(user, size=128, css_class='', alt='Аватар пользователя'):
+    """
+    Renders ``<picture>`` for the pre-generated renditions of the user's avatar.
+
+    Falls back to the original upload until the renditions are ready.
+    """
+    sizes = user.avatar_renditions.get('sizes') if user.avatar else None
+    if not sizes:
+        src = user.avatar.url if user.avatar else static('images/404.png')
+        return format_html('<img src="{}" width="{}" height="{}" class="{}" alt="{}" style="object-fit: cover;">',
+                           src, size, size, css_class, alt)
+
+    fallback = min(sizes.items(), key=lambda item: abs(int(item[0]) - size))[1]
+    sources = format_html_join('', '<source type="image/{}" srcset="{}" sizes="{}px">', (
+        (extension, _srcset(sizes, extension), size) for extension in avatars.FORMATS
+    ))
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}px" width="{}" height="{}" class="{}" alt="{}" '
+        'style="object-fit: cover;" loading="lazy" decoding="async"></picture>',
+        sources, default_storage.url(fallback['jpeg']), _srcset(sizes, 'jpeg'), size, size, size, css_class, alt,
+    )
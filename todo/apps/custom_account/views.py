@@ -1,3 +1,14 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.views.static import serve
 
-# Create your views here.
+from todo.apps.custom_account import avatars
+
+# Rendition names contain the content hash, so they can be cached forever.
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def avatar_rendition(request, path):
+    """Serves a rendition with the headers the web server sets in production, for ``DEBUG`` only."""
+    response = serve(request, f'{avatars.RENDITIONS_DIR}/{path}', document_root=settings.MEDIA_ROOT)
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
@@ -0,0 +1,44 @@
+"""
+SQLite tuned for a small single-node deployment.
+
+Extra ``OPTIONS`` understood on top of the stock backend:
+
+* ``pragmas`` — ``{name: value}`` run on every new connection,
+  ``PRAGMAS`` by default;
+* ``transaction_mode`` — ``'IMMEDIATE'`` takes the write lock when an
+  ``atomic()`` block starts, so concurrent writers wait up to the stock
+  ``timeout`` option instead of failing with ``database is locked`` on lock
+  upgrade.
+
+``timeout`` is the only busy timeout: the ``sqlite3`` module turns it into
+SQLite's ``busy_timeout``, so ``PRAGMAS`` leaves that pragma alone.
+"""
+from django.db.backends.sqlite3 import base
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -20000,  # KiB, about 20 MB per connection
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.pragmas = kwargs.pop('pragmas', PRAGMAS)
+        self.transaction_mode = kwargs.pop('transaction_mode', 'IMMEDIATE')
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
+        else:
+            super()._start_transaction_under_autocommit()
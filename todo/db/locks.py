@@ -0,0 +1,40 @@
+"""
+A lock shared by every process using the same database, for one-off jobs
+that must not run twice at the same time (see the ``init_deployment``
+command).
+"""
+import fcntl
+import zlib
+from contextlib import contextmanager
+
+from django.db import connections
+
+
+@contextmanager
+def database_lock(name, using='default'):
+    """
+    Blocks until no other process holds the lock ``name`` on the ``using`` database.
+
+    PostgreSQL gets a session advisory lock; SQLite, which is only shared
+    between processes of one host, an exclusive lock on a file next to the
+    database file.
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        key = zlib.crc32(name.encode())
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_lock(%s)', [key])
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [key])
+    elif connection.vendor == 'sqlite' and not connection.is_in_memory_db():
+        with open(f'{connection.settings_dict["NAME"]}.{name}.lock', 'w') as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+    else:
+        yield
@@ -0,0 +1,15 @@
+from django.template.defaultfilters import date, truncatechars
+from django.templatetags.static import static
+from django.urls import reverse
+from jinja2 import Environment
+
+
+def url(name, *args, **kwargs):
+    return reverse(name, args=args or None, kwargs=kwargs or None)
+
+
+def environment(**options):
+    env = Environment(**options)
+    env.globals.update({'url': url, 'static': static})
+    env.filters.update({'date': date, 'truncatechars': truncatechars})
+    return env
@@ -0,0 +1,189 @@
+"""
+Opt-in per-view instrumentation: SQL queries, SQL time, template render time,
+response size and latency, grouped by the resolved URL name.
+
+Enabled by ``METRICS=1`` (see settings.py), which installs ``MetricsMiddleware``
+and the ``MetricsDjangoTemplates`` backend. The numbers are kept per process
+and served in the Prometheus text format by the ``metrics`` view; with
+``METRICS_LOG=1`` every request is also logged as a JSON line.
+
+``QUERY_BUDGETS`` maps URL names to the maximum number of queries a request
+may run. Going over the budget logs a warning, or raises
+``QueryBudgetExceeded`` when ``QUERY_BUDGETS_STRICT`` is on, which makes the
+offending test fail in CI.
+"""
+import hmac
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import connections
+from django.http import HttpResponse
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('metrics_request', default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@dataclass
+class RequestMetrics:
+    view: str = ''
+    queries: int = 0
+    sql_seconds: float = 0.0
+    template_seconds: float = 0.0
+    response_bytes: int = 0
+    seconds: float = 0.0
+    status: int = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # A database execute wrapper, see connection.execute_wrapper().
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+class Registry:
+    """Counters of all the finished requests of this process, by view."""
+    counters = ('requests', 'queries', 'sql_seconds', 'template_seconds', 'response_bytes', 'seconds',
+                'over_budget')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.views = defaultdict(lambda: dict.fromkeys(self.counters, 0))
+        self.max_queries = defaultdict(int)
+
+    def add(self, metrics, over_budget):
+        with self._lock:
+            view = self.views[metrics.view]
+            view['requests'] += 1
+            view['over_budget'] += over_budget
+            for name in ('queries', 'sql_seconds', 'template_seconds', 'response_bytes', 'seconds'):
+                view[name] += getattr(metrics, name)
+            self.max_queries[metrics.view] = max(self.max_queries[metrics.view], metrics.queries)
+
+    def render(self):
+        series = [
+            ('todo_requests_total', 'counter', 'Requests served', 'requests'),
+            ('todo_request_seconds_total', 'counter', 'Time spent in the view and middleware', 'seconds'),
+            ('todo_db_queries_total', 'counter', 'SQL queries run', 'queries'),
+            ('todo_db_seconds_total', 'counter', 'Time spent in SQL queries', 'sql_seconds'),
+            ('todo_template_seconds_total', 'counter', 'Time spent rendering templates', 'template_seconds'),
+            ('todo_response_bytes_total', 'counter', 'Size of non-streaming responses', 'response_bytes'),
+            ('todo_query_budget_exceeded_total', 'counter', 'Requests over their query budget', 'over_budget'),
+        ]
+        with self._lock:
+            views = {name: dict(values) for name, values in sorted(self.views.items())}
+            max_queries = dict(self.max_queries)
+
+        lines = []
+        for metric, kind, help_text, key in series:
+            lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {kind}']
+            lines += [f'{metric}{{view="{view}"}} {values[key]:g}' for view, values in views.items()]
+        lines += ['# HELP todo_db_queries_max Most SQL queries run by one request', '# TYPE todo_db_queries_max gauge']
+        lines += [f'todo_db_queries_max{{view="{view}"}} {max_queries[view]}' for view in views]
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def get_budget(view):
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(view)
+
+
+def record(metrics):
+    budget = get_budget(metrics.view)
+    over_budget = budget is not None and metrics.queries > budget
+    registry.add(metrics, over_budget)
+    if getattr(settings, 'METRICS_LOG', False):
+        logger.info(json.dumps(asdict(metrics)))
+    if over_budget:
+        message = f'{metrics.view}: {metrics.queries} SQL-запросов при бюджете {budget}'
+        if getattr(settings, 'QUERY_BUDGETS_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class MetricsMiddleware:
+    """Should go first in MIDDLEWARE to see the queries of the other middleware too."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        metrics.seconds = time.perf_counter() - start
+
+        match = request.resolver_match
+        metrics.view = match.view_name if match else 'unresolved'
+        metrics.status = response.status_code
+        if not response.streaming:
+            metrics.response_bytes = len(response.content)
+        record(metrics)
+        return response
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return self.template.render(context, request)
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            metrics.template_seconds += time.perf_counter() - start
+
+
+class MetricsDjangoTemplates(DjangoTemplates):
+    """The stock Django template backend that also reports its render time."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def metrics(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    # compare_digest keeps the comparison time independent of how much of the token matches.
+    authorized = (token and hmac.compare_digest(request.headers.get('Authorization', '').encode(),
+                                                f'Bearer {token}'.encode())
+                  or request.user.is_active and request.user.is_staff)
+    if not authorized:
+        raise PermissionDenied
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -10,21 +10,29 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 import os
+from importlib.util import find_spec
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
 
-# SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-nfz2w-y&py@sqc)u&xg&yh%p(_x_g7_*ef%!x5dw0+ta1x)n2#'
-
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# The production image sets DEBUG=0; development keeps the default.
+DEBUG = os.getenv('DEBUG', '1') == '1'
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = os.getenv('SECRET_KEY')
+if not SECRET_KEY:
+    if not DEBUG:
+        raise ImproperlyConfigured('SECRET_KEY must be set when DEBUG is off')
+    SECRET_KEY = 'django-insecure-nfz2w-y&py@sqc)u&xg&yh%p(_x_g7_*ef%!x5dw0+ta1x)n2#'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.getenv('ALLOWED_HOSTS', '').split(',') if host]
 
 # Application definition
 
@@ -34,10 +42,11 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    'whitenoise.runserver_nostatic',
     'django.contrib.staticfiles',
     'allauth',
     'allauth.account',
-    'imagekit',
+    'mptt',
     'crispy_forms',
     'crispy_bootstrap5',
     'todo.apps.core',
@@ -45,7 +54,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so that the health check of the container passes without a host from ALLOWED_HOSTS.
+    'todo.apps.core.middleware.health_check_middleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -55,14 +67,32 @@ MIDDLEWARE = [
     'allauth.account.middleware.AccountMiddleware',
 ]
 
+# Per-view query, SQL, template and response size counters, see todo/metrics.py.
+METRICS = os.getenv('METRICS') == '1'
+METRICS_LOG = os.getenv('METRICS_LOG') == '1'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+if METRICS:
+    MIDDLEWARE.insert(0, 'todo.metrics.MetricsMiddleware')
+
+# The most SQL queries a request to the view may run. Over the budget a warning is logged,
+# with QUERY_BUDGETS_STRICT=1 (in CI) the request fails.
+QUERY_BUDGETS = {
+    'account': 5,
+    'get-tasks': 3,
+    'reports': 3,
+    'report-api': 3,
+    'report-detail': 3,
+    'vacations': 5,
+    'tasks': 2,
+}
+QUERY_BUDGETS_STRICT = os.getenv('QUERY_BUDGETS_STRICT') == '1'
+
 ROOT_URLCONF = 'todo.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [BASE_DIR / 'templates']
-        ,
-        'APP_DIRS': True,
+        'BACKEND': 'todo.metrics.MetricsDjangoTemplates' if METRICS else 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [BASE_DIR / 'templates'],
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -70,21 +100,120 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Templates are parsed once per process; under DEBUG the cache is dropped when a file changes.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+            'debug': DEBUG,
         },
     },
 ]
 
+# Render the HTMX fragments (calendar, report pages) with Jinja2 from the jinja2/ directory.
+JINJA2_FRAGMENTS = os.getenv('JINJA2_FRAGMENTS') == '1' and find_spec('jinja2') is not None
+if JINJA2_FRAGMENTS:
+    TEMPLATES.append({
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'DIRS': [BASE_DIR / 'jinja2'],
+        'OPTIONS': {'environment': 'todo.jinja2.environment', 'auto_reload': DEBUG},
+    })
+FRAGMENT_TEMPLATE_ENGINE = 'jinja2' if JINJA2_FRAGMENTS else None
+
 WSGI_APPLICATION = 'todo.wsgi.application'
 
+# Serve the calendar, dashboard and reports with the coroutine views of core/async_views.py.
+# Only worth it under an ASGI server, see docs/deployment.md.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS') == '1'
+
+# Periodic jobs, see todo/apps/core/jobs.py and `manage.py run_scheduler`.
+TASK_EXPIRED_STATUS = os.getenv('TASK_EXPIRED_STATUS', 'cancelled')
+TASK_SWEEP_INTERVAL = int(os.getenv('TASK_SWEEP_INTERVAL', 60))
+ANALYTICS_REFRESH_INTERVAL = int(os.getenv('ANALYTICS_REFRESH_INTERVAL', 300))
+
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+if os.environ.get('DATABASE') == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('SQL_DATABASE', 'todo'),
+            'USER': os.environ.get('SQL_USER', 'todo'),
+            'PASSWORD': os.environ.get('SQL_PASSWORD', ''),
+            'HOST': os.environ.get('SQL_HOST', 'localhost'),
+            'PORT': os.environ.get('SQL_PORT', '5432'),
+            # Persistent connections, checked before reuse so a restarted server is not noticed by users.
+            'CONN_MAX_AGE': int(os.environ.get('SQL_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            # PgBouncer in transaction mode can't keep server-side cursors open between transactions.
+            'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('SQL_POOL') == 'pgbouncer',
+        }
+    }
+    if os.environ.get('SQL_REPLICA_HOST'):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'HOST': os.environ['SQL_REPLICA_HOST'],
+            'PORT': os.environ.get('SQL_REPLICA_PORT', DATABASES['default']['PORT']),
+            'TEST': {'MIRROR': 'default'},
+        }
+elif os.environ.get('SQLITE_TUNED', '1') == '0':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQL_DATABASE', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+else:
+    # WAL journal, tuned pragmas and BEGIN IMMEDIATE, see todo/db/backends/sqlite3/base.py.
+    DATABASES = {
+        'default': {
+            'ENGINE': 'todo.db.backends.sqlite3',
+            'NAME': os.environ.get('SQL_DATABASE', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                'timeout': 20,
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+
+DATABASE_ROUTERS = ['todo.db.routers.ReplicaRouter']
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# locmem is per process, so invalidation would reach only the worker that wrote: it is the default
+# only under DEBUG, production gets redis with REDIS_URL and the file cache shared by the workers otherwise.
+# The heatmap keeps an entry per executor and past month, far more than the default limit of 300.
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 20_000))
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND',
+                               'redis' if os.environ.get('REDIS_URL') else 'locmem' if DEBUG else 'file')
+if CACHE_BACKEND == 'redis':
+    if not find_spec('redis'):
+        raise ImproperlyConfigured('CACHE_BACKEND=redis requires the redis package')
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', BASE_DIR / '.cache'),
+            'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+        }
     }
-}
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -119,17 +248,47 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = '/static/'
-if DEBUG:
-    STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
-else:
-    STATICFILES_DIRS = []
-    STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+STATICFILES_FINDERS = [
+    'django.contrib.staticfiles.finders.FileSystemFinder',
+    'django.contrib.staticfiles.finders.AppDirectoriesFinder',
+    'todo.staticfiles.ImageVariantFinder',
+]
+
+# Collected files get hashed names and .gz/.br copies and are served by WhiteNoise,
+# see todo/staticfiles.py. In development they are served from the finders.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+        else 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Resized WEBP variants of the large images, built into STATIC_VARIANTS_ROOT and collected with the rest.
+STATIC_IMAGE_VARIANTS = {
+    'images/index/*.jpg': (480, 960, 1920),
+}
+STATIC_VARIANTS_ROOT = os.path.join(BASE_DIR, '.cache', 'static-variants')
 
 # Media files
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Avatar renditions are built in a thread pool after upload, 0 builds them in the request.
+AVATAR_SIZES = (64, 128, 256)
+AVATAR_WORKERS = int(os.getenv('AVATAR_WORKERS', 2))
+
+# How much of a job's unit (Job.type) one executor does in a day; tasks in other units count as a day each.
+WORKLOAD_DAILY_OUTPUT = {
+    'шт': 10,
+    'м2': 20,
+    'м': 30,
+    'ч': 8,
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
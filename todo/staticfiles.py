@@ -0,0 +1,117 @@
+"""
+Resized WEBP variants of the large static images, collected and
+fingerprinted like any other static file.
+
+In production ``collectstatic`` stores every file under a content-hashed
+name with ``.gz`` and ``.br`` copies next to it (WhiteNoise's
+``CompressedManifestStaticFilesStorage``, brotli needs the ``Brotli``
+package), and ``WhiteNoiseMiddleware`` serves them from the app with
+far-future ``Cache-Control`` and range support.
+
+``ImageVariantFinder`` adds ``<image>.<width>w.webp`` for every image
+matched by ``STATIC_IMAGE_VARIANTS``. The variants are built once into
+``STATIC_VARIANTS_ROOT`` and rebuilt when the source image changes; the
+``picture`` template tag (``core/templatetags/images.py``) lists them in
+``srcset``.
+"""
+import os
+import re
+from fnmatch import fnmatch
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.files.storage import FileSystemStorage
+
+VARIANT_RE = re.compile(r'^(?P<source>.+)\.(?P<width>\d+)w\.webp$')
+WEBP_QUALITY = 80
+
+
+def variant_widths(path):
+    """The widths configured for the static image ``path``, empty if it has no variants."""
+    for pattern, widths in getattr(settings, 'STATIC_IMAGE_VARIANTS', {}).items():
+        if fnmatch(path, pattern):
+            return tuple(sorted(widths))
+    return ()
+
+
+def variant_path(path, width):
+    return f'{path}.{width}w.webp'
+
+
+@lru_cache(maxsize=None)
+def image_size(absolute_path, mtime):
+    from PIL import Image
+
+    with Image.open(absolute_path) as image:
+        return image.size
+
+
+def variants(path):
+    """
+    ``(width, variant path)`` for the static image ``path``, narrowest first.
+
+    Images are never upscaled: the widths wider than the source are replaced
+    by a single variant of the source width.
+    """
+    widths = variant_widths(path)
+    source = finders.find(path) if widths else None
+    if not source:
+        return []
+    width, _ = image_size(source, os.path.getmtime(source))
+    fitting = [size for size in widths if size < width]
+    if len(fitting) < len(widths):
+        fitting.append(width)
+    return [(size, variant_path(path, size)) for size in fitting]
+
+
+def build_variant(source, destination, width):
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        image.save(destination, 'WEBP', quality=WEBP_QUALITY)
+
+
+class ImageVariantFinder(finders.BaseFinder):
+    """Finds, and builds when missing or stale, the WEBP variants of ``STATIC_IMAGE_VARIANTS``."""
+
+    def __init__(self, app_names=None, *args, **kwargs):
+        self.storage = FileSystemStorage(location=settings.STATIC_VARIANTS_ROOT)
+
+    def check(self, **kwargs):
+        return []
+
+    def _sources(self):
+        # The images themselves come from the other finders.
+        for finder in finders.get_finders():
+            if isinstance(finder, ImageVariantFinder):
+                continue
+            for path, storage in finder.list([]):
+                if variant_widths(path):
+                    yield path, storage.path(path)
+
+    def _build(self, path, source):
+        built = []
+        for width, name in variants(path):
+            destination = self.storage.path(name)
+            if not os.path.exists(destination) or os.path.getmtime(destination) < os.path.getmtime(source):
+                build_variant(source, destination, width)
+            built.append(name)
+        return built
+
+    def find(self, path, all=False):
+        match = VARIANT_RE.match(path)
+        if not match or path not in dict(variants(match['source'])).values():
+            return []
+        self._build(match['source'], finders.find(match['source']))
+        location = self.storage.path(path)
+        return [location] if all else location
+
+    def list(self, ignore_patterns):
+        for path, source in self._sources():
+            for name in self._build(path, source):
+                yield name, self.storage
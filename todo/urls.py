@@ -16,30 +16,50 @@ Including another URLconf
 """
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.contrib.staticfiles.urls import staticfiles_urlpatterns
 from django.urls import path, include
 
-from todo import settings
-from todo.apps.core import views
+from todo import metrics, settings
+from todo.apps.core import async_views, views
+from todo.apps.custom_account import views as account_views
+
+# Under ASGI the hottest read-only pages are served by coroutine views.
+read_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('allauth.urls')),
     path('', views.index, name='index'),
-    path('account/', views.account, name='account'),
+    path('health/', views.health, name='health'),
+    path('account/', read_views.account, name='account'),
 
-    path('reports/', views.report_list, name='reports'),
+    path('reports/', read_views.report_list, name='reports'),
     path('reports/send/', views.send_report, name='send-report'),
-    path('api/report/', views.report_detail, name='report-detail'),
+    path('api/report/', read_views.report_detail, name='report-detail'),
+    path('api/reports/', views.report_api, name='report-api'),
+    path('reports/inbox/', views.report_inbox, name='report-inbox'),
 
     path('tasks/', views.task_list, name='tasks'),
     path('tasks/<int:uuid>/', views.task_detail, name='task-detail'),
 
     path('vacations/', views.vacation_list, name='vacations'),
+    path('team/', views.team_calendar, name='team-calendar'),
+
+    path('api/tasks/', read_views.get_tasks, name='get-tasks'),
+    path('api/tasks/heatmap/', views.task_heatmap, name='task-heatmap'),
+
+    path('search/', views.search_page, name='search'),
 
-    path('api/tasks/', views.get_tasks, name='get-tasks'),
+    path('analytics/', views.analytics_report, name='analytics'),
+    path('export/<str:name>/', views.export, name='export'),
+
+    path('metrics/', metrics.metrics, name='metrics'),
 
 ]
 
-urlpatterns += staticfiles_urlpatterns()
+# Like static() below, for development only: in production the web server or
+# the storage serves media files, see docs/deployment.md.
+if settings.DEBUG:
+    urlpatterns.append(path('media/avatars/renditions/<path:path>', account_views.avatar_rendition,
+                            name='avatar-rendition'))
+
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)